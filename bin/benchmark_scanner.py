@@ -0,0 +1,598 @@
+#!/usr/bin/env python3
+# Copyright (c) 2014-2021 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Benchmark collection scanner against a synthetic library:
+#   python3 bin/benchmark_scanner.py --artists 50 --albums 4 --tracks 12
+# Each scan runs headless in a child process with its own XDG directories
+# and in memory settings, user collection is never touched.
+
+import gi
+gi.require_version("Gst", "1.0")
+gi.require_version("GdkPixbuf", "2.0")
+from gi.repository import Gst, GdkPixbuf
+
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import cpu_count
+from random import Random
+from threading import Lock
+from time import perf_counter
+from zlib import crc32
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SCENARIOS = ("full", "noop", "incremental", "rebuild")
+
+
+class LibraryGenerator:
+    """
+        Generate a tree of tiny tagged audio files with covers
+        Same parameters give same library
+    """
+    __ENCODERS = {"flac": "flacenc name=tagger",
+                  "ogg": "vorbisenc name=tagger ! oggmux",
+                  "mp3": "lamemp3enc ! id3v2mux name=tagger"}
+    __GENRES = ["Rock", "Jazz", "Electronic", "Classical", "Hip-Hop",
+                "Folk", "Metal", "Pop", "Soul", "Ambient"]
+    __WORDS = ["Blue", "Night", "River", "Electric", "Silent", "Golden",
+               "Stone", "Echo", "Paper", "Northern", "Glass", "Summer",
+               "Ghost", "Velvet", "Iron", "Wild", "Neon", "Hollow"]
+    __MANIFEST = ".benchmark.json"
+
+    def __init__(self, path, artists, albums, tracks, formats, seed):
+        """
+            Init generator
+            @param path as str
+            @param artists as int
+            @param albums as int => albums per artist
+            @param tracks as int => tracks per album
+            @param formats as [str]
+            @param seed as int
+        """
+        self.__path = path
+        self.__parameters = {"artists": artists, "albums": albums,
+                             "tracks": tracks, "formats": formats,
+                             "seed": seed}
+        self.__specs = self.__get_specs()
+
+    @property
+    def files_count(self):
+        """
+            Get audio files count
+            @return int
+        """
+        return len(self.__specs)
+
+    def generate(self):
+        """
+            Generate library if missing, changed or modified
+            @return bool => True if generated
+        """
+        manifest = self.__read_manifest()
+        if manifest == self.__parameters:
+            return False
+        shutil.rmtree(self.__path, ignore_errors=True)
+        os.makedirs(self.__path)
+        covers = set([os.path.dirname(spec[0]) for spec in self.__specs])
+        for directory in covers:
+            self.__write_cover(directory)
+        self.__encode_all(self.__specs)
+        self.__write_manifest(self.__parameters)
+        return True
+
+    def modify(self, ratio):
+        """
+            Retag some files and add a new album, like a user would do
+            Next generate() call will restore library
+            @param ratio as float => ratio of files to retag
+            @return int => changed files count
+        """
+        self.__write_manifest(dict(self.__parameters, modified=True))
+        rng = Random(self.__parameters["seed"] + 1)
+        count = max(1, int(len(self.__specs) * ratio))
+        specs = []
+        for (path, fmt, tags, buffers) in rng.sample(self.__specs, count):
+            tags = [(name, kind, value + " (Remastered)")
+                    if name == "title" else (name, kind, value)
+                    for (name, kind, value) in tags]
+            specs.append((path, fmt, tags, buffers))
+        artist = self.__specs[0][2][3][2]
+        directory = os.path.join(self.__path, artist, "2021 - Additions")
+        os.makedirs(directory, exist_ok=True)
+        self.__write_cover(directory)
+        for number in range(1, self.__parameters["tracks"] + 1):
+            title = "Addition %s" % number
+            tags = self.__get_tags(title, artist, "Additions", artist,
+                                   "Rock", number,
+                                   self.__parameters["tracks"], 2021)
+            path = os.path.join(directory, "%02d - %s.flac" % (number, title))
+            specs.append((path, "flac", tags, 2))
+        self.__encode_all(specs)
+        return len(specs)
+
+#######################
+# PRIVATE             #
+#######################
+    def __get_specs(self):
+        """
+            Get files to generate
+            @return [(str, str, [(str, str, str/int)], int)]:
+                path, format, tags, buffers
+        """
+        rng = Random(self.__parameters["seed"])
+        formats = self.__parameters["formats"]
+        specs = []
+        for i in range(0, self.__parameters["artists"]):
+            artist = "%s %s %03d" % (rng.choice(self.__WORDS),
+                                     rng.choice(self.__WORDS), i)
+            genre = rng.choice(self.__GENRES)
+            for j in range(0, self.__parameters["albums"]):
+                album = "%s %s" % (rng.choice(self.__WORDS),
+                                   rng.choice(self.__WORDS))
+                year = rng.randint(1960, 2020)
+                # Some compilations
+                compilation = (i * self.__parameters["albums"] + j) % 10 == 9
+                album_artist = "Various Artists" if compilation else artist
+                fmt = formats[(i + j) % len(formats)]
+                directory = os.path.join(self.__path, album_artist,
+                                         "%s - %s" % (year, album))
+                count = self.__parameters["tracks"]
+                for number in range(1, count + 1):
+                    title = " ".join(rng.sample(self.__WORDS, 3))
+                    track_artist = "%s %s" % (rng.choice(self.__WORDS),
+                                              rng.choice(self.__WORDS))\
+                        if compilation else artist
+                    tags = self.__get_tags(title, track_artist, album,
+                                           album_artist, genre, number,
+                                           count, year)
+                    path = os.path.join(directory, "%02d - %s.%s" % (
+                        number, title, fmt))
+                    specs.append((path, fmt, tags, rng.randint(1, 4)))
+        return specs
+
+    def __get_tags(self, title, artist, album, album_artist, genre,
+                   number, count, year):
+        """
+            Get tags for a track
+            @return [(str, str, str/int)]: name, type, value
+        """
+        return [("title", "string", title),
+                ("artist", "string", artist),
+                ("album", "string", album),
+                ("album-artist", "string", album_artist),
+                ("genre", "string", genre),
+                ("track-number", "uint", number),
+                ("track-count", "uint", count),
+                ("album-disc-number", "uint", 1),
+                ("datetime", "datetime", str(year))]
+
+    def __get_taglist(self, tags):
+        """
+            Get a Gst.TagList for tags
+            @param tags as [(str, str, str/int)]
+            @return Gst.TagList
+        """
+        values = []
+        for (name, kind, value) in tags:
+            if kind == "string":
+                value = '"%s"' % value.replace("\\", "\\\\").replace(
+                    '"', '\\"')
+            values.append("%s=(%s)%s" % (name, kind, value))
+        return Gst.TagList.new_from_string("taglist, %s" % ", ".join(values))
+
+    def __encode_all(self, specs):
+        """
+            Encode files in parallel
+            @param specs as [(str, str, [(str, str, str/int)], int)]
+        """
+        with ThreadPoolExecutor(max_workers=cpu_count()) as executor:
+            for result in executor.map(lambda spec: self.__encode(*spec),
+                                       specs):
+                pass
+
+    def __encode(self, path, fmt, tags, buffers):
+        """
+            Encode a short tone, written next to path then renamed
+            @param path as str
+            @param fmt as str
+            @param tags as [(str, str, str/int)]
+            @param buffers as int => 0.1 second each
+        """
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = os.path.join(directory, ".%s" % os.path.basename(path))
+        pipeline = Gst.parse_launch(
+            "audiotestsrc num-buffers=%s samplesperbuffer=4410 ! "
+            "audioconvert ! %s ! filesink name=sink" % (
+                buffers, self.__ENCODERS[fmt]))
+        pipeline.get_by_name("sink").set_property("location", tmp_path)
+        pipeline.get_by_name("tagger").merge_tags(
+            self.__get_taglist(tags), Gst.TagMergeMode.REPLACE_ALL)
+        pipeline.set_state(Gst.State.PLAYING)
+        message = pipeline.get_bus().timed_pop_filtered(
+            Gst.CLOCK_TIME_NONE,
+            Gst.MessageType.EOS | Gst.MessageType.ERROR)
+        pipeline.set_state(Gst.State.NULL)
+        if message.type == Gst.MessageType.ERROR:
+            raise Exception("%s: %s" % (path,
+                                        message.parse_error()[0].message))
+        os.replace(tmp_path, path)
+
+    def __write_cover(self, directory):
+        """
+            Write a cover.jpg in directory
+            @param directory as str
+        """
+        os.makedirs(directory, exist_ok=True)
+        color = crc32(directory.encode("utf-8")) & 0xffffff00 | 0xff
+        pixbuf = GdkPixbuf.Pixbuf.new(GdkPixbuf.Colorspace.RGB,
+                                      False, 8, 500, 500)
+        pixbuf.fill(color)
+        pixbuf.savev(os.path.join(directory, "cover.jpg"),
+                     "jpeg", ["quality"], ["90"])
+
+    def __read_manifest(self):
+        """
+            Read generated library parameters
+            @return {}/None
+        """
+        try:
+            with open(os.path.join(self.__path, self.__MANIFEST)) as f:
+                return json.load(f)
+        except Exception:
+            return None
+
+    def __write_manifest(self, parameters):
+        """
+            Write generated library parameters
+            @param parameters as {}
+        """
+        with open(os.path.join(self.__path, self.__MANIFEST), "w") as f:
+            json.dump(parameters, f)
+
+
+class HeadlessProgress:
+    """
+        Progress bar replacement, keeps last fraction
+    """
+
+    def __init__(self):
+        """
+            Init progress
+        """
+        self.fraction = 0
+
+    def add(self, obj):
+        """
+            Add a progress owner
+            @param obj as GObject.Object
+        """
+        pass
+
+    def set_fraction(self, fraction, obj):
+        """
+            Set progress fraction
+            @param fraction as float
+            @param obj as GObject.Object
+        """
+        self.fraction = fraction
+
+
+class HeadlessContainer:
+    """
+        Window container replacement
+    """
+
+    def __init__(self):
+        """
+            Init container
+        """
+        self.progress = HeadlessProgress()
+
+
+class HeadlessWindow:
+    """
+        Window replacement, scanner only needs progress
+    """
+
+    def __init__(self):
+        """
+            Init window
+        """
+        self.container = HeadlessContainer()
+
+
+class HeadlessNotify:
+    """
+        Notifications are printed
+    """
+
+    def send(self, title, body=""):
+        """
+            Print message
+            @param title as str
+            @param body as str
+        """
+        print("%s: %s" % (title, body), file=sys.stderr)
+
+
+class QueryCounter:
+    """
+        Count statements run by SQLite connections
+    """
+
+    def __init__(self):
+        """
+            Init counter
+        """
+        self.count = 0
+        self.__lock = Lock()
+
+    def wrap(self, get_cursor):
+        """
+            Trace connections returned by get_cursor
+            @param get_cursor as function
+            @return function
+        """
+        def wrapper():
+            connection = get_cursor()
+            connection.set_trace_callback(self.__on_statement)
+            return connection
+        return wrapper
+
+    def __on_statement(self, statement):
+        """
+            Count statement
+            @param statement as str
+        """
+        with self.__lock:
+            self.count += 1
+
+
+def run_scan(library, processes, deep):
+    """
+        Run a collection scan headless, environment must be ready
+        @param library as str
+        @param processes as int
+        @param deep as bool
+        @return {}
+    """
+    gi.require_version("Gtk", "3.0")
+    gi.require_version("GstPbutils", "1.0")
+    from gi.repository import GLib, Gio
+    Gst.init(None)
+    from lollypop.define import ScanType
+    from lollypop.settings import Settings
+    from lollypop.sqlpool import SqlPool
+    from lollypop.database import Database
+    from lollypop.database_tag_cache import TagCacheDatabase
+    from lollypop.database_albums import AlbumsDatabase
+    from lollypop.database_artists import ArtistsDatabase
+    from lollypop.database_genres import GenresDatabase
+    from lollypop.database_tracks import TracksDatabase
+    from lollypop.database_fts import FtsDatabase
+    from lollypop.database_directories import DirectoriesDatabase
+    from lollypop.playlists import Playlists
+    from lollypop.helper_task import TaskHelper
+    from lollypop.artwork import Artwork
+    from lollypop.artwork_album import AlbumArtwork
+    from lollypop.ws_director import DirectorWebService
+    from lollypop.collection_scanner import CollectionScanner
+
+    # Lollypop objects use App() => Gio.Application.get_default()
+    app = Gio.Application.new(None, Gio.ApplicationFlags.NON_UNIQUE)
+    app.set_default()
+    for name in ["update_db", "deep_update_db"]:
+        app.add_action(Gio.SimpleAction.new(name, None))
+    app.debug = False
+    app.cursors = SqlPool()
+    app.settings = Settings.new()
+    app.settings.set_value("music-uris", GLib.Variant(
+        "as", [GLib.filename_to_uri(library)]))
+    app.settings.set_value("auto-update", GLib.Variant("b", False))
+    app.settings.set_value("network-access", GLib.Variant("b", False))
+    app.settings.set_value("scan-processes", GLib.Variant("i", processes))
+    app.window = HeadlessWindow()
+    app.notify = HeadlessNotify()
+    app.db = Database()
+    queries = QueryCounter()
+    app.db.get_cursor = queries.wrap(app.db.get_cursor)
+    if app.db.wal:
+        app.db.writer.start()
+    app.tag_cache = TagCacheDatabase()
+    app.playlists = Playlists()
+    app.albums = AlbumsDatabase(app.db)
+    app.artists = ArtistsDatabase(app.db)
+    app.genres = GenresDatabase(app.db)
+    app.tracks = TracksDatabase(app.db)
+    app.fts = FtsDatabase(app.db)
+    app.directories = DirectoriesDatabase(app.db)
+    app.task_helper = TaskHelper()
+    app.art = Artwork()
+    app.album_art = AlbumArtwork()
+    app.ws_director = DirectorWebService()
+    app.scanner = CollectionScanner()
+    # Connections opened while initializing are not traced
+    app.cursors.close()
+    queries.count = 0
+
+    loop = GLib.MainLoop()
+
+    # Scan may fail without emitting scan-finished
+    def on_timeout():
+        if app.scanner.is_locked():
+            return True
+        loop.quit()
+
+    start_time = perf_counter()
+    app.scanner.update(ScanType.FULL, [], deep)
+    GLib.timeout_add(100, on_timeout)
+    loop.run()
+    elapsed = perf_counter() - start_time
+    if app.db.wal:
+        app.db.writer.stop()
+    tracks = app.tracks.count()
+    app.cursors.close()
+    # Linux: KiB
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return {"elapsed": elapsed,
+            "tracks": tracks,
+            "queries": queries.count,
+            "rss": rss // 1024,
+            "children_rss": children_rss // 1024,
+            "timings": app.scanner.timings}
+
+
+def get_environment(workdir):
+    """
+        Get environment for a throwaway Lollypop profile
+        @param workdir as str
+        @return {}
+    """
+    schemas = os.path.join(workdir, "schemas")
+    os.makedirs(schemas, exist_ok=True)
+    shutil.copy(os.path.join(ROOT, "data", "org.gnome.Lollypop.gschema.xml"),
+                schemas)
+    subprocess.run(["glib-compile-schemas", schemas], check=True)
+    profile = os.path.join(workdir, "profile")
+    env = dict(os.environ)
+    env.update({"XDG_DATA_HOME": os.path.join(profile, "data"),
+                "XDG_CACHE_HOME": os.path.join(profile, "cache"),
+                "XDG_CONFIG_HOME": os.path.join(profile, "config"),
+                "GSETTINGS_BACKEND": "memory",
+                "GSETTINGS_SCHEMA_DIR": schemas})
+    return env
+
+
+def run_scenario(scenario, args, env):
+    """
+        Run a scan in a child process
+        @param scenario as str
+        @param args as argparse.Namespace
+        @param env as {}
+        @return {}
+    """
+    result_path = os.path.join(args.workdir, "result.json")
+    command = [sys.executable, os.path.abspath(__file__),
+               "--child", "--workdir", args.workdir,
+               "--processes", str(args.processes)]
+    if args.deep:
+        command.append("--deep")
+    output = None if args.verbose else subprocess.DEVNULL
+    subprocess.run(command, env=env, stdout=output, check=True)
+    with open(result_path) as f:
+        result = json.load(f)
+    os.remove(result_path)
+    result["scenario"] = scenario
+    return result
+
+
+def print_report(results, files_count):
+    """
+        Print results table
+        @param results as [{}]
+        @param files_count as int
+    """
+    stages = ["load", "walk", "read", "finalize"]
+    header = "%-12s %7s %8s %8s %8s %9s %9s" % (
+        "scenario", "tracks", "time(s)", "files/s", "queries",
+        "rss(MiB)", "pool(MiB)")
+    header += "".join([" %8s" % stage for stage in stages])
+    print(header)
+    for result in results:
+        line = "%-12s %7d %8.2f %8.0f %8d %9d %9d" % (
+            result["scenario"], result["tracks"], result["elapsed"],
+            files_count / result["elapsed"], result["queries"],
+            result["rss"], result["children_rss"])
+        line += "".join([" %8.2f" % result["timings"].get(stage, 0)
+                         for stage in stages])
+        print(line)
+
+
+def main():
+    """
+        Generate library then run scenarios, or a scan in child process
+    """
+    parser = argparse.ArgumentParser(
+        description="Benchmark Lollypop collection scanner")
+    parser.add_argument("--workdir", default="/tmp/lollypop-benchmark",
+                        help="library, profile and results directory")
+    parser.add_argument("--artists", type=int, default=20)
+    parser.add_argument("--albums", type=int, default=3,
+                        help="albums per artist")
+    parser.add_argument("--tracks", type=int, default=10,
+                        help="tracks per album")
+    parser.add_argument("--formats", default="flac,ogg,mp3")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help="comma separated: %s" % ", ".join(SCENARIOS))
+    parser.add_argument("--changes", type=float, default=0.05,
+                        help="ratio of files retagged by incremental")
+    parser.add_argument("--processes", type=int, default=0,
+                        help="scan-processes setting")
+    parser.add_argument("--deep", action="store_true",
+                        help="do not skip unchanged directories")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--verbose", action="store_true",
+                        help="show Lollypop logs")
+    parser.add_argument("--child", action="store_true",
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    args.workdir = os.path.abspath(args.workdir)
+    library = os.path.join(args.workdir, "library")
+
+    if args.child:
+        result = run_scan(library, args.processes, args.deep)
+        with open(os.path.join(args.workdir, "result.json"), "w") as f:
+            json.dump(result, f)
+        return
+
+    Gst.init(None)
+    generator = LibraryGenerator(library, args.artists, args.albums,
+                                 args.tracks, args.formats.split(","),
+                                 args.seed)
+    start_time = perf_counter()
+    if generator.generate():
+        print("Generated %s files in %.1fs" % (
+            generator.files_count, perf_counter() - start_time))
+    env = get_environment(args.workdir)
+    shutil.rmtree(os.path.join(args.workdir, "profile"), ignore_errors=True)
+    database = os.path.join(env["XDG_DATA_HOME"], "lollypop", "lollypop.db")
+    results = []
+    for scenario in args.scenarios.split(","):
+        if scenario not in SCENARIOS:
+            parser.error("unknown scenario: %s" % scenario)
+        elif scenario == "incremental":
+            generator.modify(args.changes)
+        elif scenario == "rebuild":
+            # Database reset, tags cache is kept
+            for suffix in ["", "-wal", "-shm"]:
+                if os.path.exists(database + suffix):
+                    os.remove(database + suffix)
+        results.append(run_scenario(scenario, args, env))
+    print_report(results, generator.files_count)
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
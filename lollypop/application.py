@@ -36,11 +36,15 @@ from lollypop.inhibitor import Inhibitor
 from lollypop.artwork import Artwork
 from lollypop.artwork_album import AlbumArtwork
 from lollypop.artwork_artist import ArtistArtwork
+from lollypop.artwork_pack import ArtworkPack
 from lollypop.logger import Logger
 from lollypop.ws_director import DirectorWebService
 from lollypop.sqlcursor import SqlCursor
+from lollypop.sqlpool import SqlPool
+from lollypop.database_fts import FtsDatabase
+from lollypop.database_directories import DirectoriesDatabase
 from lollypop.settings import Settings
-from lollypop.database_cache import CacheDatabase
+from lollypop.database_tag_cache import TagCacheDatabase
 from lollypop.database_albums import AlbumsDatabase
 from lollypop.database_artists import ArtistsDatabase
 from lollypop.database_genres import GenresDatabase
@@ -50,6 +54,7 @@ from lollypop.playlists import Playlists
 from lollypop.helper_task import TaskHelper
 from lollypop.helper_art import ArtHelper
 from lollypop.collection_scanner import CollectionScanner
+from lollypop.loudness_analyzer import LoudnessAnalyzer
 
 
 class Application(Gtk.Application, ApplicationActions, ApplicationCmdline):
@@ -90,7 +95,7 @@ class Application(Gtk.Application, ApplicationActions, ApplicationCmdline):
             # Set /tmp for GLib, /tmp not accessible in flatpak
             tmp = GLib.environ_getenv(GLib.get_environ(), "XDG_RUNTIME_DIR")
             GLib.setenv("TMPDIR", "%s/app/org.gnome.Lollypop" % tmp, True)
-        self.cursors = {}
+        self.cursors = SqlPool()
         self.shown_sidebar_tooltip = False
         self.__window = None
         self.__fs_window = None
@@ -141,20 +146,26 @@ class Application(Gtk.Application, ApplicationActions, ApplicationCmdline):
             styleContext.add_provider_for_screen(
                 screen, cssProvider, Gtk.STYLE_PROVIDER_PRIORITY_USER + 1)
         self.db = Database()
-        self.cache = CacheDatabase()
+        if self.db.wal:
+            self.db.writer.start()
+        self.tag_cache = TagCacheDatabase()
         self.playlists = Playlists()
         self.albums = AlbumsDatabase(self.db)
         self.artists = ArtistsDatabase(self.db)
         self.genres = GenresDatabase(self.db)
         self.tracks = TracksDatabase(self.db)
+        self.fts = FtsDatabase(self.db)
+        self.directories = DirectoriesDatabase(self.db)
         self.player = Player()
         self.inhibitor = Inhibitor()
         self.scanner = CollectionScanner()
+        self.loudness_analyzer = LoudnessAnalyzer()
         self.notify = NotificationManager()
         self.task_helper = TaskHelper()
         self.art_helper = ArtHelper()
         self.art = Artwork()
         self.art.update_art_size()
+        self.art_pack = ArtworkPack()
         self.album_art = AlbumArtwork()
         self.artist_art = ArtistArtwork()
         self.ws_director = DirectorWebService()
@@ -205,12 +216,18 @@ class Application(Gtk.Application, ApplicationActions, ApplicationCmdline):
             return
         self.album_art.cancellable.cancel()
         self.artist_art.cancellable.cancel()
+        self.loudness_analyzer.stop()
+        # Let scanner save a checkpoint before closing connections
+        self.scanner.stop(5)
         if self.settings.get_value("save-state"):
             self.__window.container.stack.save_history()
+        # Flush pending writes
+        self.db.writer.stop()
         # Then vacuum db
         if vacuum:
             self.__vacuum()
             self.art.clean_artwork()
+        self.cursors.close()
         Gio.Application.quit(self)
         if GLib.environ_getenv(GLib.get_environ(), "DEBUG_LEAK") is not None:
             import gc
@@ -358,11 +375,12 @@ class Application(Gtk.Application, ApplicationActions, ApplicationCmdline):
             self.artists.clean(False)
             self.genres.clean(False)
             SqlCursor.remove(self.db)
-            self.cache.clean(True)
 
             with SqlCursor(self.db) as sql:
                 sql.isolation_level = None
                 sql.execute("VACUUM")
+                # Keep planner statistics in sync with collection
+                sql.execute("ANALYZE")
                 sql.isolation_level = ""
             with SqlCursor(self.playlists) as sql:
                 sql.isolation_level = None
@@ -34,6 +34,11 @@ class ApplicationActions:
         update_action.connect("activate", self.__on_update_db_activate)
         App().add_action(update_action)
 
+        deep_update_action = Gio.SimpleAction.new("deep_update_db", None)
+        deep_update_action.connect("activate",
+                                   self.__on_deep_update_db_activate)
+        App().add_action(deep_update_action)
+
         fullscreen_action = Gio.SimpleAction.new("fullscreen", None)
         fullscreen_action = Gio.SimpleAction.new_stateful(
                     "fullscreen",
@@ -153,6 +158,8 @@ class ApplicationActions:
                                     ["<Shift><Alt>l"])
         App().set_accels_for_action("app.shortcut::next_album", ["<Control>n"])
         App().set_accels_for_action("app.update_db", ["<Control>u"])
+        App().set_accels_for_action("app.deep_update_db",
+                                    ["<Control><Shift>u"])
         App().set_accels_for_action("app.settings", ["<Control>comma"])
         App().set_accels_for_action("app.fullscreen", ["F11", "F7"])
         App().set_accels_for_action("app.mini", ["<Control>m"])
@@ -174,6 +181,13 @@ class ApplicationActions:
         if App().window:
             App().scanner.update(ScanType.FULL)
 
+    def __on_deep_update_db_activate(self, *ignore):
+        """
+            Search for new music, do not skip unchanged directories
+        """
+        if App().window:
+            App().scanner.update(ScanType.FULL, [], True)
+
     def __on_about_activate_response(self, dialog, response_id):
         """
             Destroy about dialog when closed
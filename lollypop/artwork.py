@@ -17,7 +17,7 @@ from hashlib import md5
 from lollypop.artwork_manager import ArtworkManager
 from lollypop.logger import Logger
 from lollypop.define import CACHE_PATH, ALBUMS_WEB_PATH, ALBUMS_PATH
-from lollypop.define import ARTISTS_PATH, TimeStamp
+from lollypop.define import ARTISTS_PATH, TimeStamp, App
 from lollypop.utils import emit_signal
 from lollypop.utils_file import remove_oldest, create_dir
 
@@ -121,6 +121,7 @@ class Artwork(ArtworkManager):
             Remove old artwork from disk
         """
         try:
+            App().art_pack.compact(App().albums.get_lp_album_ids())
             remove_oldest(CACHE_PATH, TimeStamp.ONE_YEAR)
             remove_oldest(ARTISTS_PATH, TimeStamp.THREE_YEAR)
             remove_oldest(ALBUMS_PATH, TimeStamp.THREE_YEAR)
@@ -145,6 +146,7 @@ class Artwork(ArtworkManager):
             Remove all covers from cache
         """
         try:
+            App().art_pack.clear()
             from pathlib import Path
             extension = self.extension_str
             for p in Path(CACHE_PATH).glob("*.%s" % extension):
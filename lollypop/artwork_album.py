@@ -67,7 +67,10 @@ class AlbumArtwork(ArtworkManager, AlbumArtworkDownloader):
             if f.query_exists():
                 return cache_path
             else:
-                self.get(album, width, height, 1)
+                pixbuf = self.get(album, width, height, 1)
+                # Thumbnails are cached in pack, caller wants a file
+                if pixbuf is not None and not f.query_exists():
+                    self.save_pixbuf(pixbuf, cache_path)
                 if f.query_exists():
                     return cache_path
         except Exception as e:
@@ -186,10 +189,13 @@ class AlbumArtwork(ArtworkManager, AlbumArtworkDownloader):
         cache_path = self.add_extension(cache_path)
         pixbuf = None
         try:
-            # Look in cache
-            f = Gio.File.new_for_path(cache_path)
-            if not behaviour & ArtBehaviour.NO_CACHE and f.query_exists():
-                pixbuf = GdkPixbuf.Pixbuf.new_from_file(cache_path)
+            # Look in cache, thumbnails are in pack
+            if not behaviour & ArtBehaviour.NO_CACHE:
+                if App().art_pack.can_store(w, h):
+                    pixbuf = App().art_pack.get(album.lp_album_id, w, h)
+                elif Gio.File.new_for_path(cache_path).query_exists():
+                    pixbuf = GdkPixbuf.Pixbuf.new_from_file(cache_path)
+            if pixbuf is not None:
                 if optimized_blur:
                     pixbuf = self.load_behaviour(pixbuf,
                                                  width, height, behaviour)
@@ -236,7 +242,9 @@ class AlbumArtwork(ArtworkManager, AlbumArtworkDownloader):
                 return None
             pixbuf = self.load_behaviour(pixbuf,
                                          width, height, behaviour)
-            if behaviour & ArtBehaviour.CACHE:
+            if behaviour & ArtBehaviour.CACHE and\
+                    not App().art_pack.add(album.lp_album_id,
+                                           width, height, pixbuf):
                 self.save_pixbuf(pixbuf, cache_path)
             return pixbuf
         except Exception as e:
@@ -289,6 +297,7 @@ class AlbumArtwork(ArtworkManager, AlbumArtworkDownloader):
         """
         try:
             from pathlib import Path
+            App().art_pack.remove(album.lp_album_id, width, height)
             if width == -1 or height == -1:
                 if self.extension == StoreExtention.PNG:
                     extension = "png"
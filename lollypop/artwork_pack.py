@@ -0,0 +1,258 @@
+# Copyright (c) 2014-2021 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from gi.repository import GLib, GdkPixbuf
+
+import os
+import struct
+from threading import Lock
+
+from lollypop.define import CACHE_PATH
+from lollypop.logger import Logger
+
+
+class ArtworkPack:
+    """
+        Album thumbnails stored as raw pixels in a single pack file
+        Pack file is append only and memory mapped: pixbufs use mapped
+        pixels, no file lookup and no image decoding
+    """
+    __PACK_PATH = "%s/thumbnails_v1.pack" % CACHE_PATH
+    __INDEX_PATH = "%s/thumbnails_v1.index" % CACHE_PATH
+    # Index entry: album id length, then album id and
+    # requested width, height, offset, length,
+    # pixbuf width, height, rowstride, has alpha
+    # An entry with length 0 removes thumbnail
+    __ID = struct.Struct("<H")
+    __ENTRY = struct.Struct("<IIQQIIIB")
+    # Bigger artwork is cached as an image file
+    __MAX_PIXELS = 400 * 400
+
+    def __init__(self):
+        """
+            Init pack, load index
+        """
+        self.__lock = Lock()
+        # {(lp_album_id, width, height):
+        #      (offset, length, width, height, rowstride, has_alpha)}
+        self.__index = {}
+        # Mapped pack as GLib.Bytes
+        self.__mapped = None
+        self.__load_index()
+
+    def can_store(self, width, height):
+        """
+            True if thumbnail size can be stored in pack
+            @param width as int
+            @param height as int
+            @return bool
+        """
+        return width * height <= self.__MAX_PIXELS
+
+    def get(self, lp_album_id, width, height):
+        """
+            Get thumbnail for album
+            @param lp_album_id as str
+            @param width as int
+            @param height as int
+            @return GdkPixbuf.Pixbuf/None
+            @thread safe
+        """
+        try:
+            with self.__lock:
+                entry = self.__index.get((lp_album_id, width, height), None)
+                if entry is None:
+                    return None
+                (offset, length, pixbuf_width, pixbuf_height,
+                 rowstride, has_alpha) = entry
+                mapped = self.__get_mapped(offset + length)
+            # Pixbuf keeps a reference on mapped file
+            pixels = GLib.Bytes.new_from_bytes(mapped, offset, length)
+            return GdkPixbuf.Pixbuf.new_from_bytes(pixels,
+                                                   GdkPixbuf.Colorspace.RGB,
+                                                   has_alpha,
+                                                   8,
+                                                   pixbuf_width,
+                                                   pixbuf_height,
+                                                   rowstride)
+        except Exception as e:
+            Logger.error("ArtworkPack::get(): %s", e)
+        return None
+
+    def add(self, lp_album_id, width, height, pixbuf):
+        """
+            Add thumbnail for album
+            @param lp_album_id as str
+            @param width as int
+            @param height as int
+            @param pixbuf as GdkPixbuf.Pixbuf
+            @return bool => False if not stored
+            @thread safe
+        """
+        if not self.can_store(width, height) or\
+                pixbuf.get_bits_per_sample() != 8:
+            return False
+        try:
+            data = pixbuf.read_pixel_bytes().get_data()
+            with self.__lock:
+                with open(self.__PACK_PATH, "ab") as f:
+                    offset = f.tell()
+                    f.write(data)
+                entry = (offset, len(data),
+                         pixbuf.get_width(), pixbuf.get_height(),
+                         pixbuf.get_rowstride(), pixbuf.get_has_alpha())
+                self.__write_entries([((lp_album_id, width, height), entry)])
+                self.__index[(lp_album_id, width, height)] = entry
+            return True
+        except Exception as e:
+            Logger.error("ArtworkPack::add(): %s", e)
+        return False
+
+    def remove(self, lp_album_id, width=-1, height=-1):
+        """
+            Remove thumbnails for album
+            @param lp_album_id as str
+            @param width as int
+            @param height as int
+            @thread safe
+        """
+        try:
+            with self.__lock:
+                if width == -1 or height == -1:
+                    keys = [key for key in self.__index.keys()
+                            if key[0] == lp_album_id]
+                elif (lp_album_id, width, height) in self.__index.keys():
+                    keys = [(lp_album_id, width, height)]
+                else:
+                    keys = []
+                if not keys:
+                    return
+                self.__write_entries([(key, (0, 0, 0, 0, 0, False))
+                                      for key in keys])
+                for key in keys:
+                    del self.__index[key]
+        except Exception as e:
+            Logger.error("ArtworkPack::remove(): %s", e)
+
+    def clear(self):
+        """
+            Remove all thumbnails
+            @thread safe
+        """
+        try:
+            with self.__lock:
+                self.__index = {}
+                self.__mapped = None
+                # Existing pixbufs keep unlinked file mapped
+                for path in [self.__INDEX_PATH, self.__PACK_PATH]:
+                    if os.path.exists(path):
+                        os.remove(path)
+        except Exception as e:
+            Logger.error("ArtworkPack::clear(): %s", e)
+
+    def compact(self, lp_album_ids):
+        """
+            Rewrite pack without removed thumbnails and thumbnails for
+            albums not in collection anymore
+            @param lp_album_ids as set(str)
+            @thread safe
+        """
+        try:
+            with self.__lock:
+                size = os.path.getsize(self.__PACK_PATH)\
+                    if os.path.exists(self.__PACK_PATH) else 0
+                entries = [(key, entry)
+                           for (key, entry) in self.__index.items()
+                           if key[0] in lp_album_ids]
+                used = sum([entry[1] for (key, entry) in entries])
+                if used == size:
+                    return
+                mapped = self.__get_mapped(size)
+                index = {}
+                with open(self.__PACK_PATH + ".new", "wb") as f:
+                    for (key, entry) in entries:
+                        (offset, length) = entry[0:2]
+                        index[key] = (f.tell(),) + entry[1:]
+                        f.write(GLib.Bytes.new_from_bytes(
+                            mapped, offset, length).get_data())
+                # No index is better than an index on wrong pack
+                if os.path.exists(self.__INDEX_PATH):
+                    os.remove(self.__INDEX_PATH)
+                os.replace(self.__PACK_PATH + ".new", self.__PACK_PATH)
+                self.__mapped = None
+                self.__index = {}
+                self.__write_entries(list(index.items()))
+                self.__index = index
+        except Exception as e:
+            Logger.error("ArtworkPack::compact(): %s", e)
+
+#######################
+# PRIVATE             #
+#######################
+    def __load_index(self):
+        """
+            Load index, entries out of pack are ignored
+        """
+        try:
+            if not os.path.exists(self.__INDEX_PATH):
+                return
+            size = os.path.getsize(self.__PACK_PATH)\
+                if os.path.exists(self.__PACK_PATH) else 0
+            with open(self.__INDEX_PATH, "rb") as f:
+                data = f.read()
+            position = 0
+            while position + self.__ID.size <= len(data):
+                (id_length,) = self.__ID.unpack_from(data, position)
+                position += self.__ID.size
+                end = position + id_length + self.__ENTRY.size
+                # Interrupted write
+                if end > len(data):
+                    break
+                lp_album_id = data[position:position + id_length].decode(
+                    "utf-8")
+                (width, height, *entry) = self.__ENTRY.unpack_from(
+                    data, position + id_length)
+                position = end
+                key = (lp_album_id, width, height)
+                if entry[1] == 0 or entry[0] + entry[1] > size:
+                    self.__index.pop(key, None)
+                else:
+                    entry[5] = bool(entry[5])
+                    self.__index[key] = tuple(entry)
+        except Exception as e:
+            Logger.error("ArtworkPack::__load_index(): %s", e)
+
+    def __write_entries(self, entries):
+        """
+            Append entries to index, lock must be held
+            @param entries as [((str, int, int),
+                                (int, int, int, int, int, bool))]
+        """
+        data = b""
+        for ((lp_album_id, width, height), entry) in entries:
+            encoded = lp_album_id.encode("utf-8")
+            data += self.__ID.pack(len(encoded)) + encoded
+            data += self.__ENTRY.pack(width, height, *entry)
+        with open(self.__INDEX_PATH, "ab") as f:
+            f.write(data)
+
+    def __get_mapped(self, size):
+        """
+            Get mapped pack, map it again if smaller than size
+            Lock must be held
+            @param size as int
+            @return GLib.Bytes
+        """
+        if self.__mapped is None or self.__mapped.get_size() < size:
+            mapped_file = GLib.MappedFile.new(self.__PACK_PATH, False)
+            self.__mapped = mapped_file.get_bytes()
+        return self.__mapped
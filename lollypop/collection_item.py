@@ -31,7 +31,7 @@ class CollectionItem:
                  discnumber=1, discname="", track_mtime=0, track_pop=0,
                  track_rate=0, track_loved=False, track_ltime=0, bpm=0,
                  compilation=False,
-                 storage_type=0):
+                 storage_type=0, fingerprint=None):
         """
             Init item
             @param track_id as int
@@ -77,6 +77,7 @@ class CollectionItem:
             @param bpm as int
             @param compilation as bool
             @param storage_type as StorageType
+            @param fingerprint as str
         """
         self.track_id = track_id
         self.album_id = album_id
@@ -121,3 +122,4 @@ class CollectionItem:
         self.bpm = bpm
         self.compilation = compilation
         self.storage_type = storage_type
+        self.fingerprint = fingerprint
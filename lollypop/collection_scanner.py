@@ -13,47 +13,47 @@
 
 from gi.repository import GLib, GObject, Gio, Gtk
 
-from gi.repository.Gio import FILE_ATTRIBUTE_STANDARD_NAME, \
-                              FILE_ATTRIBUTE_STANDARD_TYPE, \
-                              FILE_ATTRIBUTE_STANDARD_IS_HIDDEN,\
-                              FILE_ATTRIBUTE_STANDARD_IS_SYMLINK,\
-                              FILE_ATTRIBUTE_STANDARD_SYMLINK_TARGET,\
-                              FILE_ATTRIBUTE_TIME_MODIFIED,\
-                              FILE_ATTRIBUTE_STANDARD_CONTENT_TYPE
+from gi.repository.Gio import FILE_ATTRIBUTE_STANDARD_CONTENT_TYPE
 
+import itertools
+from collections import Counter
 from gettext import gettext as _
-from time import time, sleep
+from time import time
+from queue import Queue, Empty
 from urllib.parse import urlparse
 from multiprocessing import cpu_count
+from threading import Lock
 
 from lollypop.collection_item import CollectionItem
+from lollypop.collection_walker import CollectionWalker
 from lollypop.inotify import Inotify
 from lollypop.define import App, ScanType, Type, StorageType, ScanUpdate
 from lollypop.define import FileType
 from lollypop.sqlcursor import SqlCursor
-from lollypop.tagreader import TagReader, Discoverer
+from lollypop.tagreader import TagReader
+from lollypop.tagreader_file import FileDiscoverer
 from lollypop.logger import Logger
 from lollypop.database_history import History
 from lollypop.objects_track import Track
-from lollypop.utils_file import is_audio, is_pls, get_mtime, get_file_type
+from lollypop.utils_file import is_audio, is_pls, get_file_type
+from lollypop.utils_file import get_fingerprint
 from lollypop.utils_album import tracks_to_albums
-from lollypop.utils import emit_signal, profile, split_list
+from lollypop.utils import emit_signal, profile
 from lollypop.utils import get_lollypop_album_id, get_lollypop_track_id
 
 
-SCAN_QUERY_INFO = "{},{},{},{},{},{}".format(
-                                       FILE_ATTRIBUTE_STANDARD_NAME,
-                                       FILE_ATTRIBUTE_STANDARD_TYPE,
-                                       FILE_ATTRIBUTE_STANDARD_IS_HIDDEN,
-                                       FILE_ATTRIBUTE_STANDARD_IS_SYMLINK,
-                                       FILE_ATTRIBUTE_STANDARD_SYMLINK_TARGET,
-                                       FILE_ATTRIBUTE_TIME_MODIFIED)
-
-
 class CollectionScanner(GObject.GObject, TagReader):
     """
         Scan user music collection
     """
+    # Files saved to DB per write batch
+    __SAVE_BATCH_SIZE = 250
+    # Max delay before saving a batch (seconds)
+    __SAVE_DELAY = 1
+    # Max files and tags waiting in scan queues
+    __QUEUE_SIZE = 500
+    # Delay between walked directories checkpoints (seconds)
+    __CHECKPOINT_DELAY = 10
     __gsignals__ = {
         "scan-finished": (GObject.SignalFlags.RUN_FIRST, None, (bool,)),
         "updated": (GObject.SignalFlags.RUN_FIRST, None,
@@ -65,15 +65,39 @@ class CollectionScanner(GObject.GObject, TagReader):
             Init collection scanner
         """
         GObject.GObject.__init__(self)
+        TagReader.__init__(self)
         self.__thread = None
-        self.__tags = {}
+        self.__files_count = 0
+        # Directories from last scan {uri: (parent, mtime, count)}
+        self.__directories = {}
+        # Subdirectories from last scan {uri: [uri]}
+        self.__children = {}
+        # Tracks count in DB per directory {uri: int}
+        self.__db_counts = {}
+        # Audio files saved or unchanged per directory {uri: int}
+        self.__saved_counts = Counter()
+        self.__saved_lock = Lock()
+        self.__walker = CollectionWalker(False)
+        # Tracks fingerprints {uri: fingerprint}
+        self.__fingerprints = {}
+        # Moved files candidates {fingerprint: uri}
+        self.__fingerprint_uris = {}
+        # Moved files {uri: old uri}
+        self.__moved = {}
+        # Tag cache keys of files being read {uri: (size, mtime, advanced)}
+        self.__cache_keys = {}
         self.__items = []
         self.__notified_ids = []
         self.__pending_new_artist_ids = []
+        # Albums with removed tracks, cleaned once by next scan
+        # {album_id: ([artist ids], [genre ids])}
+        self.__removed = {}
         self.__history = History()
         self.__progress_total = 1
         self.__progress_count = 0
         self.__progress_fraction = 0
+        # Last scan duration per stage {str: float}
+        self.__timings = {}
         self.__disable_compilations = not App().settings.get_value(
                 "show-compilations")
         if App().settings.get_value("auto-update"):
@@ -82,23 +106,25 @@ class CollectionScanner(GObject.GObject, TagReader):
             self.__inotify = None
         App().albums.update_max_count()
 
-    def update(self, scan_type, uris=[]):
+    def update(self, scan_type, uris=[], deep=False):
         """
             Update database
             @param scan_type as ScanType
             @param uris as [str]
+            @param deep as bool => do not skip unchanged directories
         """
         self.__disable_compilations = not App().settings.get_value(
                 "show-compilations")
         App().lookup_action("update_db").set_enabled(False)
+        App().lookup_action("deep_update_db").set_enabled(False)
         # Stop previous scan
         if self.is_locked() and scan_type != ScanType.EXTERNAL:
             self.stop()
-            GLib.timeout_add(250, self.update, scan_type, uris)
+            GLib.timeout_add(250, self.update, scan_type, uris, deep)
             return
         elif App().ws_director.collection_ws is not None and\
                 not App().ws_director.collection_ws.stop():
-            GLib.timeout_add(250, self.update, scan_type, uris)
+            GLib.timeout_add(250, self.update, scan_type, uris, deep)
             return
         else:
             if scan_type == ScanType.FULL:
@@ -111,42 +137,15 @@ class CollectionScanner(GObject.GObject, TagReader):
                 App().window.container.progress.set_fraction(0, self)
             Logger.info("Scan started")
             # Launch scan in a separate thread
-            self.__thread = App().task_helper.run(self.__scan, scan_type, uris)
+            self.__thread = App().task_helper.run(self.__scan, scan_type,
+                                                  uris, deep)
 
     def save_album(self, item):
         """
             Add album to DB
             @param item as CollectionItem
         """
-        Logger.debug("CollectionScanner::save_album(): "
-                     "Add album artists %s" % item.album_artists)
-        (item.new_album_artist_ids,
-         item.album_artist_ids) = self.add_artists(item.album_artists,
-                                                   item.aa_sortnames,
-                                                   item.mb_album_artist_id)
-        # We handle artists already created by any previous save_track()
-        for artist_id in item.album_artist_ids:
-            if artist_id in self.__pending_new_artist_ids:
-                item.new_album_artist_ids.append(artist_id)
-                self.__pending_new_artist_ids.remove(artist_id)
-
-        item.lp_album_id = get_lollypop_album_id(item.album_name,
-                                                 item.album_artists,
-                                                 item.year)
-        Logger.debug("CollectionScanner::save_track(): Add album: "
-                     "%s, %s" % (item.album_name, item.album_artist_ids))
-        (item.new_album, item.album_id) = self.add_album(
-                                               item.album_name,
-                                               item.mb_album_id,
-                                               item.lp_album_id,
-                                               item.album_artist_ids,
-                                               item.uri,
-                                               item.album_loved,
-                                               item.album_pop,
-                                               item.album_rate,
-                                               item.album_synced,
-                                               item.album_mtime,
-                                               item.storage_type)
+        self.__add_album(item)
         if item.year is not None:
             App().albums.set_year(item.album_id, item.year)
             App().albums.set_timestamp(item.album_id, item.timestamp)
@@ -156,55 +155,15 @@ class CollectionScanner(GObject.GObject, TagReader):
             Add track to DB
             @param item as CollectionItem
         """
-        Logger.debug(
-            "CollectionScanner::save_track(): Add artists %s" % item.artists)
-        (item.new_artist_ids,
-         item.artist_ids) = self.add_artists(item.artists,
-                                             item.a_sortnames,
-                                             item.mb_artist_id)
-
-        self.__pending_new_artist_ids += item.new_artist_ids
-        missing_artist_ids = list(
-            set(item.album_artist_ids) - set(item.artist_ids))
-        # Special case for broken tags
-        # If all artist album tags are missing
-        # Can't do more because don't want to break split album behaviour
-        if len(missing_artist_ids) == len(item.album_artist_ids):
-            item.artist_ids += missing_artist_ids
-
-        if item.genres is None:
-            (item.new_genre_ids, item.genre_ids) = ([], [Type.WEB])
-        else:
-            (item.new_genre_ids, item.genre_ids) = self.add_genres(item.genres)
-
-        item.lp_track_id = get_lollypop_track_id(item.track_name,
-                                                 item.artists,
-                                                 item.album_name)
-
+        self.__add_track_artists_genres(item)
         # Add track to db
         Logger.debug("CollectionScanner::save_track(): Add track")
-        item.track_id = App().tracks.add(item.track_name,
-                                         item.uri,
-                                         item.duration,
-                                         item.tracknumber,
-                                         item.discnumber,
-                                         item.discname,
-                                         item.album_id,
-                                         item.original_year,
-                                         item.original_timestamp,
-                                         item.track_pop,
-                                         item.track_rate,
-                                         item.track_loved,
-                                         item.track_ltime,
-                                         item.track_mtime,
-                                         item.mb_track_id,
-                                         item.lp_track_id,
-                                         item.bpm,
-                                         item.storage_type)
+        item.track_id = App().tracks.add(*self.__get_track_row(item))
         Logger.debug("CollectionScanner::save_track(): Update track")
         self.update_track(item)
         Logger.debug("CollectionScanner::save_track(): Update album")
         self.update_album(item)
+        App().albums.update_stats([item.album_id])
 
     def update_album(self, item):
         """
@@ -213,34 +172,10 @@ class CollectionScanner(GObject.GObject, TagReader):
             different artists
             @param item as CollectionItem
         """
-        if item.album_artist_ids and not item.compilation:
-            App().albums.set_artist_ids(item.album_id, item.album_artist_ids)
-        # Set artist ids based on content
-        else:
-            if item.compilation:
-                new_album_artist_ids = [Type.COMPILATIONS]
-            else:
-                new_album_artist_ids = App().albums.calculate_artist_ids(
-                    item.album_id, self.__disable_compilations)
-            App().albums.set_artist_ids(item.album_id, new_album_artist_ids)
-            # We handle artists already created by any previous save_track()
-            item.new_album_artist_ids = []
-            for artist_id in new_album_artist_ids:
-                if artist_id in self.__pending_new_artist_ids:
-                    item.new_album_artist_ids.append(artist_id)
-                    self.__pending_new_artist_ids.remove(artist_id)
-        # Update lp_album_id
-        lp_album_id = get_lollypop_album_id(item.album_name,
-                                            item.album_artists,
-                                            item.year)
-        if lp_album_id != item.lp_album_id:
-            App().album_art.move(item.lp_album_id, lp_album_id)
-            App().albums.set_lp_album_id(item.album_id, lp_album_id)
-            item.lp_album_id = lp_album_id
+        self.__update_album_artists(item)
         # Update album genres
         for genre_id in item.genre_ids:
             App().albums.add_genre(item.album_id, genre_id)
-        App().cache.clear_durations(item.album_id)
 
     def update_track(self, item):
         """
@@ -283,35 +218,28 @@ class CollectionScanner(GObject.GObject, TagReader):
                                    track_ltime, album_mtime, track_loved,
                                    album_loved, album_pop, album_rate,
                                    album_synced)
-            App().tracks.remove(track_id)
             genre_ids = App().tracks.get_genre_ids(track_id)
-            App().albums.clean()
-            App().genres.clean()
-            App().artists.clean()
-            App().cache.clear_durations(album_id)
-            SqlCursor.commit(App().db)
-            item = CollectionItem(album_id=album_id)
-            if not App().albums.get_name(album_id):
-                item.artist_ids = []
-                for artist_id in album_artist_ids + artist_ids:
-                    if not App().artists.get_name(artist_id):
-                        item.artist_ids.append(artist_id)
-                item.genre_ids = []
-                for genre_id in genre_ids:
-                    if not App().genres.get_name(genre_id):
-                        item.genre_ids.append(genre_id)
-                emit_signal(self, "updated", item, ScanUpdate.REMOVED)
-            else:
-                # Force genre for album
-                genre_ids = App().tracks.get_album_genre_ids(album_id)
-                App().albums.set_genre_ids(album_id, genre_ids)
-                emit_signal(self, "updated", item, ScanUpdate.MODIFIED)
+            App().tracks.remove(track_id)
+            App().albums.update_stats([album_id])
+            # Albums, artists and genres are cleaned by __clean_removed()
+            if album_id not in self.__removed.keys():
+                self.__removed[album_id] = ([], [])
+            self.__removed[album_id][0].extend(album_artist_ids + artist_ids)
+            self.__removed[album_id][1].extend(genre_ids)
             return (track_pop, track_rate, track_ltime, album_mtime,
                     track_loved, album_loved, album_pop, album_rate)
         except Exception as e:
             Logger.error("CollectionScanner::del_from_db: %s" % e)
         return (0, 0, 0, 0, False, False, 0, 0)
 
+    @property
+    def timings(self):
+        """
+            Get last scan duration per stage, walk is done while reading
+            @return {str: float}: load, walk, read, finalize (seconds)
+        """
+        return self.__timings
+
     def is_locked(self):
         """
             True if db locked
@@ -319,11 +247,15 @@ class CollectionScanner(GObject.GObject, TagReader):
         """
         return self.__thread is not None and self.__thread.is_alive()
 
-    def stop(self):
+    def stop(self, timeout=0):
         """
             Stop scan
+            @param timeout as float => wait for scan end (seconds)
         """
+        thread = self.__thread
         self.__thread = None
+        if timeout and thread is not None:
+            thread.join(timeout)
 
     def reset_database(self):
         """
@@ -350,6 +282,114 @@ class CollectionScanner(GObject.GObject, TagReader):
 #######################
 # PRIVATE             #
 #######################
+    def __add_album(self, item):
+        """
+            Add album and album artists to DB
+            @param item as CollectionItem
+        """
+        Logger.debug("CollectionScanner::save_album(): "
+                     "Add album artists %s" % item.album_artists)
+        (item.new_album_artist_ids,
+         item.album_artist_ids) = self.add_artists(item.album_artists,
+                                                   item.aa_sortnames,
+                                                   item.mb_album_artist_id)
+        # We handle artists already created by any previous save_track()
+        for artist_id in item.album_artist_ids:
+            if artist_id in self.__pending_new_artist_ids:
+                item.new_album_artist_ids.append(artist_id)
+                self.__pending_new_artist_ids.remove(artist_id)
+
+        item.lp_album_id = get_lollypop_album_id(item.album_name,
+                                                 item.album_artists,
+                                                 item.year)
+        Logger.debug("CollectionScanner::save_track(): Add album: "
+                     "%s, %s" % (item.album_name, item.album_artist_ids))
+        (item.new_album, item.album_id) = self.add_album(
+                                               item.album_name,
+                                               item.mb_album_id,
+                                               item.lp_album_id,
+                                               item.album_artist_ids,
+                                               item.uri,
+                                               item.album_loved,
+                                               item.album_pop,
+                                               item.album_rate,
+                                               item.album_synced,
+                                               item.album_mtime,
+                                               item.storage_type)
+
+    def __add_track_artists_genres(self, item):
+        """
+            Add track artists and genres to DB
+            @param item as CollectionItem
+        """
+        Logger.debug(
+            "CollectionScanner::save_track(): Add artists %s" % item.artists)
+        (item.new_artist_ids,
+         item.artist_ids) = self.add_artists(item.artists,
+                                             item.a_sortnames,
+                                             item.mb_artist_id)
+
+        self.__pending_new_artist_ids += item.new_artist_ids
+        missing_artist_ids = list(
+            set(item.album_artist_ids) - set(item.artist_ids))
+        # Special case for broken tags
+        # If all artist album tags are missing
+        # Can't do more because don't want to break split album behaviour
+        if len(missing_artist_ids) == len(item.album_artist_ids):
+            item.artist_ids += missing_artist_ids
+
+        if item.genres is None:
+            (item.new_genre_ids, item.genre_ids) = ([], [Type.WEB])
+        else:
+            (item.new_genre_ids, item.genre_ids) = self.add_genres(item.genres)
+
+        item.lp_track_id = get_lollypop_track_id(item.track_name,
+                                                 item.artists,
+                                                 item.album_name)
+
+    def __get_track_row(self, item):
+        """
+            Get TracksDatabase.add() params for item
+            @param item as CollectionItem
+            @return tuple
+        """
+        return (item.track_name, item.uri, item.duration, item.tracknumber,
+                item.discnumber, item.discname, item.album_id,
+                item.original_year, item.original_timestamp, item.track_pop,
+                item.track_rate, item.track_loved, item.track_ltime,
+                item.track_mtime, item.mb_track_id, item.lp_track_id,
+                item.bpm, item.storage_type, item.fingerprint)
+
+    def __update_album_artists(self, item):
+        """
+            Update album artists and lollypop id
+            @param item as CollectionItem
+        """
+        if item.album_artist_ids and not item.compilation:
+            App().albums.set_artist_ids(item.album_id, item.album_artist_ids)
+        # Set artist ids based on content
+        else:
+            if item.compilation:
+                new_album_artist_ids = [Type.COMPILATIONS]
+            else:
+                new_album_artist_ids = App().albums.calculate_artist_ids(
+                    item.album_id, self.__disable_compilations)
+            App().albums.set_artist_ids(item.album_id, new_album_artist_ids)
+            # We handle artists already created by any previous save_track()
+            item.new_album_artist_ids = []
+            for artist_id in new_album_artist_ids:
+                if artist_id in self.__pending_new_artist_ids:
+                    item.new_album_artist_ids.append(artist_id)
+                    self.__pending_new_artist_ids.remove(artist_id)
+        # Update lp_album_id
+        lp_album_id = get_lollypop_album_id(item.album_name,
+                                            item.album_artists,
+                                            item.year)
+        if lp_album_id != item.lp_album_id:
+            App().album_art.move(item.lp_album_id, lp_album_id)
+            App().albums.set_lp_album_id(item.album_id, lp_album_id)
+            item.lp_album_id = lp_album_id
+
     def __reset_database(self):
         """
             Reset database
@@ -370,17 +410,52 @@ class CollectionScanner(GObject.GObject, TagReader):
             self.__update_progress(i, count, 0.01)
             i += 1
         App().tracks.del_persistent(False)
+        self.__removed = {}
         App().tracks.clean(False)
         App().albums.clean(False)
         App().artists.clean(False)
         App().genres.clean(False)
-        App().cache.clear_table("duration")
+        App().fts.clean(False)
+        App().directories.clear()
         SqlCursor.commit(App().db)
         SqlCursor.remove(App().db)
         SqlCursor.commit(self.__history)
         SqlCursor.remove(self.__history)
         GLib.idle_add(update_ui)
 
+    def __clean_removed(self):
+        """
+            Clean albums, artists and genres of removed tracks and notify
+        """
+        removed = self.__removed
+        self.__removed = {}
+        if not removed:
+            return
+        artist_ids = list(set(itertools.chain(
+            *[ids[0] for ids in removed.values()])))
+        genre_ids = list(set(itertools.chain(
+            *[ids[1] for ids in removed.values()])))
+        App().albums.clean(True, list(removed.keys()))
+        App().genres.clean(True, genre_ids)
+        App().artists.clean(True, artist_ids)
+        for (album_id, (artist_ids, genre_ids)) in removed.items():
+            item = CollectionItem(album_id=album_id)
+            if not App().albums.get_name(album_id):
+                item.artist_ids = []
+                for artist_id in set(artist_ids):
+                    if not App().artists.get_name(artist_id):
+                        item.artist_ids.append(artist_id)
+                item.genre_ids = []
+                for genre_id in set(genre_ids):
+                    if not App().genres.get_name(genre_id):
+                        item.genre_ids.append(genre_id)
+                emit_signal(self, "updated", item, ScanUpdate.REMOVED)
+            else:
+                # Force genre for album
+                genre_ids = App().tracks.get_album_genre_ids(album_id)
+                App().albums.set_genre_ids(album_id, genre_ids)
+                emit_signal(self, "updated", item, ScanUpdate.MODIFIED)
+
     def __update_progress(self, current, total, allowed_diff):
         """
             Update progress bar status
@@ -404,13 +479,12 @@ class CollectionScanner(GObject.GObject, TagReader):
         self.__thread = None
         Logger.info("Scan finished")
         App().lookup_action("update_db").set_enabled(True)
+        App().lookup_action("deep_update_db").set_enabled(True)
         App().window.container.progress.set_fraction(1.0, self)
         self.stop()
         emit_signal(self, "scan-finished", track_ids)
         # Update max count value
         App().albums.update_max_count()
-        # Update featuring
-        App().artists.update_featuring()
         if App().ws_director.collection_ws is not None:
             App().ws_director.collection_ws.start()
 
@@ -429,20 +503,15 @@ class CollectionScanner(GObject.GObject, TagReader):
             if d.startswith("file://"):
                 self.__inotify.add_monitor(d)
 
-    @profile
-    def __get_objects_for_uris(self, scan_type, uris):
+    def __get_uris_to_walk(self, uris, scan_type):
         """
-            Get all tracks and dirs in uris
+            Split uris in uris to walk and streams
+            @param uris as [str]
             @param scan_type as ScanType
-            @param uris as string
-            @return ([(int, str)], [str], [str])
-                    ([(mtime, file)], [dir], [stream])
+            @return ([str], [str])/None if a collection is missing
         """
-        files = []
-        dirs = []
-        streams = []
         walk_uris = []
-        # Check collection exists
+        streams = []
         for uri in uris:
             parsed = urlparse(uri)
             if parsed.scheme in ["http", "https"]:
@@ -451,63 +520,79 @@ class CollectionScanner(GObject.GObject, TagReader):
                 f = Gio.File.new_for_uri(uri)
                 if f.query_exists():
                     walk_uris.append(uri)
+                # Deleted file, removed by __remove_old_tracks()
+                elif scan_type == ScanType.NEW_FILES:
+                    continue
                 else:
-                    return ([], [], [])
+                    return None
+        return (walk_uris, streams)
 
-        while walk_uris:
-            uri = walk_uris.pop(0)
-            try:
-                # Directly add files, walk through directories
-                f = Gio.File.new_for_uri(uri)
-                info = f.query_info(SCAN_QUERY_INFO,
-                                    Gio.FileQueryInfoFlags.NONE,
-                                    None)
-                if info.get_file_type() == Gio.FileType.DIRECTORY:
-                    dirs.append(uri)
-                    infos = f.enumerate_children(SCAN_QUERY_INFO,
-                                                 Gio.FileQueryInfoFlags.NONE,
-                                                 None)
-                    for info in infos:
-                        f = infos.get_child(info)
-                        child_uri = f.get_uri()
-                        if info.get_is_hidden():
-                            continue
-                        # User do not want internal symlinks
-                        elif info.get_is_symlink() and\
-                                App().settings.get_value("ignore-symlinks"):
-                            continue
-                        walk_uris.append(child_uri)
-                    infos.close(None)
-                # Only happens if files passed as args
-                else:
-                    mtime = get_mtime(info)
-                    files.append((mtime, uri))
-            except Exception as e:
-                Logger.error("CollectionScanner::__get_objects_for_uris(): %s"
-                             % e)
-        files.sort(reverse=True)
-        return (files, dirs, streams)
+    def __get_unchanged_children(self, uri, parent, mtime):
+        """
+            Get children of directory if its files did not change
+            @param uri as str
+            @param parent as str
+            @param mtime as int
+            @return [str]/None
+        """
+        count = self.__db_counts.get(uri, 0)
+        if self.__directories.get(uri, None) != (parent, mtime, count):
+            return None
+        # Files are already in DB, show them as scanned
+        self.__files_count += count
+        self.__progress_total += count * 2
+        self.__progress_count += count * 2
+        self.__update_progress(self.__progress_count,
+                               self.__progress_total,
+                               0.001)
+        return self.__children.get(uri, [])
+
+    def __walk(self, walker, walk_uris, files_queue, count, scan_type):
+        """
+            Walk uris and queue files for readers
+            @param walker as CollectionWalker
+            @param walk_uris as [str]
+            @param files_queue as Queue
+            @param count as int => readers count
+            @param scan_type as ScanType
+            @thread safe
+        """
+        try:
+            for (mtime, uri, size) in walker.walk(walk_uris):
+                # Handle a stop request
+                if self.__thread is None and\
+                        scan_type != ScanType.EXTERNAL:
+                    break
+                self.__files_count += 1
+                # * 2 => Scan + Save
+                self.__progress_total += 2
+                files_queue.put((mtime, uri, size))
+        except Exception as e:
+            Logger.warning("CollectionScanner::__walk(): %s", e)
+        # One end mark per reader
+        for i in range(0, count):
+            files_queue.put(None)
 
     @profile
-    def __scan(self, scan_type, uris):
+    def __scan(self, scan_type, uris, deep):
         """
             Scan music collection for music files
+            Walking, tags reading and saving run at the same time
             @param scan_type as ScanType
             @param uris as [str]
+            @param deep as bool => do not skip unchanged directories
             @thread safe
         """
         try:
+            started = time()
+            self.__timings = {}
             self.__items = []
             App().art.clean_rounded()
-            (files, dirs, streams) = self.__get_objects_for_uris(
-                scan_type, uris)
-            if len(uris) != len(streams) and not files:
-                self.__flatpak_migration()
-                App().notify.send("Lollypop",
-                                  _("Scan disabled, missing collection"))
-                App().settings.set_value("flatpak-access-migration",
-                                         GLib.Variant("b", True))
+            result = self.__get_uris_to_walk(uris, scan_type)
+            if result is None:
+                self.__disable_scan()
                 return
+            (walk_uris, streams) = result
             if scan_type == ScanType.NEW_FILES:
                 db_uris = App().tracks.get_uris(uris)
             else:
@@ -515,53 +600,185 @@ class CollectionScanner(GObject.GObject, TagReader):
 
             # Get mtime of all tracks to detect which has to be updated
             db_mtimes = App().tracks.get_mtimes()
-            # * 2 => Scan + Save
-            self.__progress_total = len(files) * 2 + len(streams)
+            # Get fingerprint of all tracks to detect moved files
+            if scan_type == ScanType.EXTERNAL:
+                self.__fingerprints = {}
+            else:
+                self.__fingerprints = App().tracks.get_fingerprints()
+            self.__fingerprint_uris = dict(
+                [(fingerprint, uri)
+                 for (uri, fingerprint) in self.__fingerprints.items()
+                 if fingerprint is not None])
+            self.__moved = {}
+            self.__cache_keys = {}
+            self.__saved_counts = Counter()
+            # Files are added by walker
+            self.__progress_total = len(streams)
             self.__progress_count = 0
             self.__progress_fraction = 0
-            # Min: 1 thread, Max: 5 threads
-            count = max(1, min(5, cpu_count() // 2))
-            split_files = split_list(files, count)
-            self.__tags = {}
+            self.__files_count = 0
+            if scan_type == ScanType.EXTERNAL:
+                self.__directories = {}
+            else:
+                self.__directories = dict(
+                    [(row[0], tuple(row[1:]))
+                     for row in App().directories.get()])
+            if deep or scan_type == ScanType.EXTERNAL:
+                get_unchanged_children = None
+            else:
+                self.__load_unchanged_directories(db_mtimes)
+                get_unchanged_children = self.__get_unchanged_children
+            self.__walker = CollectionWalker(
+                App().settings.get_value("ignore-symlinks"),
+                get_unchanged_children)
             self.__notified_ids = []
             self.__pending_new_artist_ids = []
-            threads = []
-            for files in split_files:
-                thread = App().task_helper.run(self.__scan_files,
-                                               files, db_mtimes,
-                                               scan_type)
-                threads.append(thread)
-            while threads:
-                sleep(0.1)
-                thread = threads[0]
-                if not thread.is_alive():
-                    threads.remove(thread)
-
             SqlCursor.add(App().db)
+            self.start_cache()
+            loaded = time()
+            files_queue = Queue(self.__QUEUE_SIZE)
+            tags_queue = Queue(self.__QUEUE_SIZE)
+            processes = App().settings.get_value(
+                "scan-processes").get_int32()
+            if processes > 0:
+                readers = [App().task_helper.run(
+                    self.__scan_files_in_processes, files_queue, tags_queue,
+                    db_mtimes, scan_type, processes)]
+            else:
+                # Min: 1 thread, Max: 5 threads
+                count = max(1, min(5, cpu_count() // 2))
+                readers = [App().task_helper.run(self.__scan_files,
+                                                 files_queue, tags_queue,
+                                                 db_mtimes, scan_type)
+                           for i in range(0, count)]
+            walker = App().task_helper.run(self.__walk, self.__walker,
+                                           walk_uris, files_queue,
+                                           len(readers), scan_type)
             if scan_type == ScanType.EXTERNAL:
                 storage_type = StorageType.EXTERNAL
             else:
                 storage_type = StorageType.COLLECTION
-            self.__items += self.__save_in_db(storage_type)
+            self.__items += self.__save_in_db(tags_queue, len(readers),
+                                              scan_type, storage_type)
+            walker.join()
+            for reader in readers:
+                reader.join()
+            if walk_uris and self.__files_count == 0 and\
+                    scan_type != ScanType.NEW_FILES:
+                self.__disable_scan()
+                raise Exception("empty collection")
             # Add streams to DB, only happening on command line/m3u files
             self.__items += self.__save_streams_in_db(streams, storage_type)
+            self.stop_cache()
+            read = time()
 
             self.__remove_old_tracks(db_uris, scan_type)
+            if scan_type != ScanType.EXTERNAL:
+                self.__save_directories(scan_type)
+            if scan_type == ScanType.FULL:
+                SqlCursor.commit(App().db)
+                App().tag_cache.clean()
+            album_ids = list(set([item.album_id for item in self.__items] +
+                                 list(self.__removed.keys())))
+            artist_ids = set()
+            for item in self.__items:
+                artist_ids |= set(item.artist_ids + item.album_artist_ids)
+            for (removed_artist_ids, genre_ids) in self.__removed.values():
+                artist_ids |= set(removed_artist_ids)
+            self.__clean_removed()
+            # Update featuring and full text index for touched albums
+            App().artists.update_featuring(album_ids)
+            App().fts.update_albums(album_ids)
+            App().fts.update_artists(list(artist_ids))
+            App().fts.clean()
+            self.__timings = {"load": loaded - started,
+                              "walk": self.__walker.elapsed,
+                              "read": read - loaded,
+                              "finalize": time() - read}
 
             if scan_type == ScanType.EXTERNAL:
                 albums = tracks_to_albums(
                     [Track(item.track_id) for item in self.__items])
                 App().player.play_albums(albums)
             else:
-                self.__add_monitor(dirs)
+                self.__add_monitor(
+                    list(self.__walker.walked_directories.keys()) +
+                    list(self.__walker.skipped_directories))
                 GLib.idle_add(self.__finish, self.__items)
-            self.__tags = {}
             self.__items = []
             self.__pending_new_artist_ids = []
         except Exception as e:
             Logger.warning("CollectionScanner::__scan(): %s", e)
+        self.stop_cache()
         SqlCursor.remove(App().db)
 
+    def __load_unchanged_directories(self, db_mtimes):
+        """
+            Load data needed to detect unchanged directories
+            @param db_mtimes as {str: int}
+        """
+        self.__children = {}
+        for (uri, (parent, mtime, count)) in self.__directories.items():
+            if parent not in self.__children.keys():
+                self.__children[parent] = []
+            self.__children[parent].append(uri)
+        self.__db_counts = Counter([uri.rsplit("/", 1)[0]
+                                    for uri in db_mtimes.keys()])
+
+    def __save_directories(self, scan_type):
+        """
+            Save walked directories for next scan
+            @param scan_type as ScanType
+        """
+        walked = self.__walker.walked_directories
+        App().directories.set([(uri,) + values
+                               for (uri, values) in walked.items()])
+        # Remove directories not found anymore
+        removed = []
+        for (uri, (parent, mtime, count)) in self.__directories.items():
+            if uri in walked.keys() or\
+                    uri in self.__walker.skipped_directories:
+                continue
+            if scan_type == ScanType.FULL or parent in walked.keys():
+                removed.append(uri)
+        App().directories.remove(removed)
+
+    def __add_saved(self, uris):
+        """
+            Count audio files in DB per directory for checkpoints
+            @param uris as [str]
+            @thread safe
+        """
+        uris = [uri for uri in uris if get_file_type(uri) == FileType.AUDIO]
+        with self.__saved_lock:
+            for uri in uris:
+                self.__saved_counts[uri.rsplit("/", 1)[0]] += 1
+
+    def __save_checkpoint(self):
+        """
+            Save directories with whole tree walked and saved, an
+            interrupted scan will skip them
+        """
+        try:
+            with self.__saved_lock:
+                saved_counts = self.__saved_counts.copy()
+            complete = self.__walker.get_complete_directories(saved_counts)
+            App().directories.set([(uri,) + values
+                                   for (uri, values) in complete.items()])
+            SqlCursor.commit(App().db)
+        except Exception as e:
+            Logger.error("CollectionScanner::__save_checkpoint(): %s", e)
+
+    def __disable_scan(self):
+        """
+            Disable scan, collection is missing
+        """
+        self.__flatpak_migration()
+        App().notify.send("Lollypop",
+                          _("Scan disabled, missing collection"))
+        App().settings.set_value("flatpak-access-migration",
+                                 GLib.Variant("b", True))
+
     def __scan_to_handle(self, uri):
         """
             Check if file has to be handle by scanner
@@ -590,79 +807,365 @@ class CollectionScanner(GObject.GObject, TagReader):
             Logger.error("CollectionScanner::__scan_to_handle(): %s" % e)
         return False
 
-    def __scan_files(self, files, db_mtimes, scan_type):
+    def __scan_files(self, files_queue, tags_queue, db_mtimes, scan_type):
         """
-            Scan music collection for new audio files
-            @param files as [str]
+            Read tags for queued files
+            @param files_queue as Queue
+            @param tags_queue as Queue
             @param db_mtimes as {}
             @param scan_type as ScanType
             @thread safe
         """
-        discoverer = Discoverer()
+        files = self.__get_queued(files_queue)
+        self.__read_files(files, tags_queue, db_mtimes, scan_type)
+        # Stopped, consume queue so walker is not blocked
+        for value in files:
+            pass
+        tags_queue.put(None)
+
+    def __scan_files_in_processes(self, files_queue, tags_queue,
+                                  db_mtimes, scan_type, count):
+        """
+            Read tags for queued files in worker processes
+            @param files_queue as Queue
+            @param tags_queue as Queue
+            @param db_mtimes as {}
+            @param scan_type as ScanType
+            @param count as int => worker processes
+            @thread safe
+        """
+        def get_uris():
+            for (mtime, uri, fingerprint) in self.__get_files_to_read(
+                    files, tags_queue, db_mtimes, scan_type):
+                mtimes[uri] = (mtime, fingerprint)
+                yield uri
+
+        from lollypop.tagreader_pool import TagReaderPool
+        from concurrent.futures.process import BrokenProcessPool
+        files = self.__get_queued(files_queue)
+        mtimes = {}
+        failed = []
+        advanced_artists = App().settings.get_value(
+            "import-advanced-artist-tags").get_boolean()
         try:
-            # Scan new files
-            for (mtime, uri) in files:
-                # Handle a stop request
-                if self.__thread is None and scan_type != ScanType.EXTERNAL:
-                    raise Exception("cancelled")
+            pool = TagReaderPool(count)
+            for (uri, file_tags) in pool.read(get_uris(), advanced_artists):
+                (mtime, fingerprint) = mtimes.pop(uri)
+                if file_tags is None:
+                    failed.append((mtime, uri, None))
+                else:
+                    self.__add_tags(tags_queue, uri, file_tags,
+                                    mtime, fingerprint)
+        except BrokenProcessPool as e:
+            Logger.warning(
+                "CollectionScanner::__scan_files_in_processes(): %s", e)
+        except Exception as e:
+            Logger.warning(
+                "CollectionScanner::__scan_files_in_processes(): %s", e)
+        # Retry reads that failed in workers, then remaining files
+        failed += [(mtime, uri, None) for (uri, (mtime, fingerprint))
+                   in mtimes.items()]
+        self.__read_files(failed, tags_queue, {}, scan_type)
+        self.__read_files(files, tags_queue, db_mtimes, scan_type)
+        # Stopped, consume queue so walker is not blocked
+        for value in files:
+            pass
+        tags_queue.put(None)
+
+    def __read_files(self, files, tags_queue, db_mtimes, scan_type):
+        """
+            Read tags for files
+            @param files as iterable of (int, str, int/None)
+            @param tags_queue as Queue
+            @param db_mtimes as {}
+            @param scan_type as ScanType
+        """
+        discoverer = FileDiscoverer()
+        advanced_artists = App().settings.get_value(
+            "import-advanced-artist-tags")
+        try:
+            for (mtime, uri, fingerprint) in self.__get_files_to_read(
+                    files, tags_queue, db_mtimes, scan_type):
                 try:
-                    if not self.__scan_to_handle(uri):
-                        self.__progress_count += 2
-                        continue
-                    db_mtime = db_mtimes.get(uri, 0)
-                    if mtime > db_mtime:
-                        # Do not use mtime if not intial scan
-                        if db_mtimes:
-                            mtime = int(time())
-                        self.__tags[uri] = self.__get_tags(discoverer,
-                                                           uri, mtime)
-                        self.__progress_count += 1
-                        self.__update_progress(self.__progress_count,
-                                               self.__progress_total,
-                                               0.001)
-                    else:
-                        # We want to play files, so put them in items
-                        if scan_type == ScanType.EXTERNAL:
-                            track_id = App().tracks.get_id_by_uri(uri)
-                            item = CollectionItem(track_id=track_id)
-                            self.__items.append(item)
-                        self.__progress_count += 2
-                        self.__update_progress(self.__progress_count,
-                                               self.__progress_total,
-                                               0.1)
+                    info = discoverer.get_info(uri)
+                    name = Gio.File.new_for_uri(uri).get_basename()
+                    file_tags = self.get_file_tags(info, name,
+                                                   advanced_artists)
+                    self.__add_tags(tags_queue, uri, file_tags,
+                                    mtime, fingerprint)
                 except Exception as e:
                     Logger.error("Scanning file: %s, %s" % (uri, e))
         except Exception as e:
-            Logger.warning("CollectionScanner::__scan_files(): % s" % e)
+            Logger.warning("CollectionScanner::__read_files(): %s", e)
+
+    def __get_queued(self, queue):
+        """
+            Get queued values until end mark
+            @param queue as Queue
+            @return generator of values
+        """
+        while True:
+            value = queue.get()
+            if value is None:
+                return
+            yield value
 
-    def __save_in_db(self, storage_type):
+    def __get_files_to_read(self, files, tags_queue, db_mtimes, scan_type):
         """
-            Save current tags into DB
+            Get files with tags to read, others are skipped
+            Moved files, cached tags and missing fingerprints are
+            directly queued
+            @param files as iterable of (int, str, int/None):
+                   (mtime, uri, size), no size for retried files
+            @param tags_queue as Queue
+            @param db_mtimes as {}
+            @param scan_type as ScanType
+            @return generator of (int, str, str): (mtime, uri, fingerprint)
+        """
+        advanced_artists = App().settings.get_value(
+            "import-advanced-artist-tags").get_boolean()
+        for (mtime, uri, size) in files:
+            # Handle a stop request
+            if self.__thread is None and scan_type != ScanType.EXTERNAL:
+                raise Exception("cancelled")
+            try:
+                if not self.__scan_to_handle(uri):
+                    self.__progress_count += 2
+                    continue
+                db_mtime = db_mtimes.get(uri, 0)
+                if mtime > db_mtime:
+                    fingerprint = get_fingerprint(uri)
+                    old_uri = self.__get_moved_uri(uri, fingerprint)
+                    # Content did not change, do not read tags again
+                    if old_uri is not None and\
+                            mtime <= db_mtimes.get(old_uri, 0):
+                        self.__add_tags(tags_queue, uri, None,
+                                        mtime, fingerprint)
+                        continue
+                    file_mtime = mtime
+                    # Do not use mtime if not intial scan
+                    if db_mtimes:
+                        mtime = int(time())
+                    if size is None:
+                        yield (mtime, uri, fingerprint)
+                        continue
+                    file_tags = App().tag_cache.get(uri, size, file_mtime,
+                                                    advanced_artists)
+                    if file_tags is not None:
+                        self.__add_tags(tags_queue, uri, file_tags,
+                                        mtime, fingerprint)
+                        continue
+                    if scan_type != ScanType.EXTERNAL:
+                        self.__cache_keys[uri] = (size, file_mtime,
+                                                  advanced_artists)
+                    yield (mtime, uri, fingerprint)
+                else:
+                    # We want to play files, so put them in items
+                    if scan_type == ScanType.EXTERNAL:
+                        track_id = App().tracks.get_id_by_uri(uri)
+                        item = CollectionItem(track_id=track_id)
+                        self.__items.append(item)
+                    # Track saved without a fingerprint
+                    elif uri in self.__fingerprints.keys() and\
+                            self.__fingerprints[uri] is None:
+                        self.__add_tags(tags_queue, uri, None,
+                                        mtime, get_fingerprint(uri))
+                        continue
+                    else:
+                        self.__add_saved([uri])
+                    self.__progress_count += 2
+                    self.__update_progress(self.__progress_count,
+                                           self.__progress_total,
+                                           0.1)
+            except Exception as e:
+                Logger.error("Scanning file: %s, %s" % (uri, e))
+
+    def __get_moved_uri(self, uri, fingerprint):
+        """
+            Get previous uri of a moved file
+            @param uri as str
+            @param fingerprint as str/None
+            @return str/None
+        """
+        if fingerprint is None or uri in self.__fingerprints.keys():
+            return None
+        old_uri = self.__fingerprint_uris.pop(fingerprint, None)
+        # File copied, not moved
+        if old_uri is None or Gio.File.new_for_uri(old_uri).query_exists():
+            return None
+        Logger.info("File moved: %s -> %s", old_uri, uri)
+        self.__moved[uri] = old_uri
+        return old_uri
+
+    def __add_tags(self, tags_queue, uri, file_tags, mtime, fingerprint):
+        """
+            Queue tags for uri, they will be saved by __save_in_db()
+            @param tags_queue as Queue
+            @param uri as str
+            @param file_tags as TagReader.get_file_tags() result/None =>
+                   only update track uri and fingerprint
+            @param mtime as int
+            @param fingerprint as str/None
+        """
+        tags_queue.put((uri, file_tags, mtime, fingerprint))
+        self.__progress_count += 1
+        self.__update_progress(self.__progress_count,
+                               self.__progress_total,
+                               0.001)
+
+    def __save_in_db(self, tags_queue, count, scan_type, storage_type):
+        """
+            Save queued tags into DB until readers are done
+            @param tags_queue as Queue
+            @param count as int => readers count
+            @param scan_type as ScanType
             @param storage_type as StorageType
             @return [CollectionItem]
         """
         items = []
-        for uri in list(self.__tags.keys()):
-            # Handle a stop request
-            if self.__thread is None:
-                raise Exception("cancelled")
-            Logger.debug("Adding file: %s" % uri)
-            tags = self.__tags[uri]
-            item = self.__add2db(uri, *tags, storage_type)
-            items.append(item)
-            self.__progress_count += 1
-            self.__update_progress(self.__progress_count,
-                                   self.__progress_total,
-                                   0.001)
-            if item.album_id not in self.__notified_ids:
-                self.__notified_ids.append(item.album_id)
-                self.__notify_ui(item)
-            del self.__tags[uri]
+        batch = []
+        moves = []
+        cached = []
+        error = None
+        saved = checkpointed = time()
+        while count > 0:
+            try:
+                # Do not keep a batch waiting for slow readers
+                timeout = self.__SAVE_DELAY if batch else None
+                value = tags_queue.get(timeout=timeout)
+                if value is None:
+                    count -= 1
+                # Handle a stop request or a failed save, consume queue
+                # so readers are not blocked
+                elif self.__thread is not None and error is None:
+                    (uri, file_tags, mtime, fingerprint) = value
+                    if file_tags is None:
+                        moves.append((uri, fingerprint,
+                                      self.__moved.get(uri, uri)))
+                    else:
+                        Logger.debug("Adding file: %s" % uri)
+                        tags = self.__get_tags(uri, file_tags, mtime)
+                        item = self.__get_item(uri, *tags, storage_type)
+                        item.fingerprint = fingerprint
+                        batch.append(item)
+                        key = self.__cache_keys.pop(uri, None)
+                        if key is not None:
+                            cached.append((uri, *key, file_tags))
+            except Empty:
+                pass
+            except Exception as e:
+                Logger.error("CollectionScanner::__save_in_db(): %s", e)
+            # Tracks in batch are already removed from DB, always save
+            pending = len(batch) + len(moves)
+            if error is None and pending and (
+                    pending >= self.__SAVE_BATCH_SIZE or
+                    time() - saved > self.__SAVE_DELAY or
+                    count == 0):
+                try:
+                    if batch:
+                        self.__save_items(batch)
+                        self.__add_saved([item.uri for item in batch])
+                    if moves:
+                        self.__save_moves(moves)
+                        self.__add_saved([move[0] for move in moves])
+                    if cached:
+                        App().tag_cache.set(cached)
+                    items += batch
+                    saved = time()
+                    if scan_type != ScanType.EXTERNAL and\
+                            saved - checkpointed > self.__CHECKPOINT_DELAY:
+                        self.__save_checkpoint()
+                        checkpointed = saved
+                except Exception as e:
+                    Logger.error("CollectionScanner::__save_in_db(): %s", e)
+                    # Stop readers, then wait for their end marks
+                    error = e
+                    self.stop()
+                batch = []
+                moves = []
+                cached = []
+        # No checkpoint, DB may be missing saved files
+        if error is not None:
+            raise error
         # Handle a stop request
         if self.__thread is None:
+            if scan_type != ScanType.EXTERNAL:
+                self.__save_checkpoint()
             raise Exception("cancelled")
         return items
 
+    def __save_items(self, items):
+        """
+            Save items into DB, writes are grouped by table
+            @param items as [CollectionItem]
+        """
+        # Albums and artists: items need their ids
+        album_years = {}
+        for item in items:
+            self.__add_album(item)
+            self.__add_track_artists_genres(item)
+            if item.year is not None:
+                album_years[item.album_id] = (item.album_id, item.year,
+                                              item.timestamp)
+        App().albums.set_years(list(album_years.values()))
+        # Tracks
+        track_ids = App().tracks.add_many(
+            [self.__get_track_row(item) for item in items])
+        track_artist_ids = []
+        track_genre_ids = []
+        album_genre_ids = []
+        album_items = {}
+        # First item of album holds new_album and new ids
+        first_items = {}
+        for item in items:
+            item.track_id = track_ids[item.uri]
+            track_artist_ids += [(item.track_id, artist_id)
+                                 for artist_id in set(item.artist_ids)]
+            track_genre_ids += [(item.track_id, genre_id)
+                                for genre_id in set(item.genre_ids)]
+            album_genre_ids += [(item.album_id, genre_id)
+                                for genre_id in item.genre_ids]
+            album_items[item.album_id] = item
+            if item.album_id not in first_items.keys():
+                first_items[item.album_id] = item
+        App().tracks.add_artists(track_artist_ids)
+        App().tracks.add_genres(track_genre_ids)
+        # Albums: needs track artists, last item of album wins
+        for item in album_items.values():
+            self.__update_album_artists(item)
+        App().albums.add_genres(list(set(album_genre_ids)))
+        App().albums.update_stats(list(album_items.keys()))
+        SqlCursor.commit(App().db)
+        for item in first_items.values():
+            if item.album_id not in self.__notified_ids:
+                self.__notified_ids.append(item.album_id)
+                self.__notify_ui(item)
+        self.__progress_count += len(items)
+        self.__update_progress(self.__progress_count,
+                               self.__progress_total,
+                               0.001)
+
+    def __save_moves(self, moves):
+        """
+            Update uri and fingerprint for tracks, keep album uri in sync
+            @param moves as [(str, str, str)]: (uri, fingerprint, old uri)
+        """
+        App().tracks.update_uris(moves)
+        for (uri, fingerprint, old_uri) in moves:
+            parent_uri = uri.rsplit("/", 1)[0]
+            old_parent_uri = old_uri.rsplit("/", 1)[0]
+            if parent_uri == old_parent_uri:
+                continue
+            track_id = App().tracks.get_id_by_uri(uri)
+            album_id = App().tracks.get_album_id(track_id)
+            if App().albums.get_uri(album_id) == old_parent_uri:
+                App().albums.set_uri(album_id, parent_uri)
+        SqlCursor.commit(App().db)
+        self.__progress_count += len(moves)
+        self.__update_progress(self.__progress_count,
+                               self.__progress_total,
+                               0.001)
+
     def __save_streams_in_db(self, streams, storage_type):
         """
             Save http stream to DB
@@ -687,7 +1190,6 @@ class CollectionScanner(GObject.GObject, TagReader):
             Notify UI for item
             @param items as CollectionItem
         """
-        SqlCursor.commit(App().db)
         if item.new_album:
             emit_signal(self, "updated", item, ScanUpdate.ADDED)
         else:
@@ -704,10 +1206,14 @@ class CollectionScanner(GObject.GObject, TagReader):
                 collections = App().settings.get_music_uris()
             else:
                 collections = None
+            moved_uris = set(self.__moved.values())
             for uri in uris:
                 # Handle a stop request
                 if self.__thread is None:
                     raise Exception("cancelled")
+                # Track uri updated or track already removed
+                if uri in moved_uris:
+                    continue
                 in_collection = True
                 if collections is not None:
                     in_collection = False
@@ -715,6 +1221,10 @@ class CollectionScanner(GObject.GObject, TagReader):
                         if collection in uri:
                             in_collection = True
                             break
+                # Files did not change in directory
+                if in_collection and uri.rsplit("/", 1)[0] in\
+                        self.__walker.skipped_directories:
+                    continue
                 f = Gio.File.new_for_uri(uri)
                 if not in_collection:
                     Logger.warning(
@@ -725,22 +1235,25 @@ class CollectionScanner(GObject.GObject, TagReader):
                     Logger.warning("Removed, file has been deleted: %s", uri)
                     self.del_from_db(uri, True)
 
-    def __get_tags(self, discoverer, uri, track_mtime):
+    def __get_tags(self, uri, file_tags, track_mtime):
         """
-            Read track tags
-            @param discoverer as Discoverer
+            Get track tags with restored stats
             @param uri as string
+            @param file_tags as TagReader.get_file_tags() result
             @param track_mtime as int
             @return ()
         """
+        (title, artists, genres, a_sortnames, aa_sortnames,
+         album_artists, album_name, discname, discnumber, year,
+         timestamp, original_year, original_timestamp,
+         mb_album_id, mb_track_id, mb_artist_id, mb_album_artist_id,
+         tracknumber, popm, bpm, duration, compilation) = file_tags
         f = Gio.File.new_for_uri(uri)
-        info = discoverer.get_info(uri)
-        tags = info.get_tags()
         name = f.get_basename()
-        duration = int(info.get_duration() / 1000000)
         Logger.debug("CollectionScanner::add2db(): Restore stats")
-        # Restore stats
-        track_id = App().tracks.get_id_by_uri(uri)
+        # Restore stats, from previous uri if file moved
+        old_uri = self.__moved.get(uri, uri)
+        track_id = App().tracks.get_id_by_uri(old_uri)
         if track_id is None:
             track_id = App().tracks.get_id_by_basename_duration(name,
                                                                 duration)
@@ -753,55 +1266,13 @@ class CollectionScanner(GObject.GObject, TagReader):
         else:
             (track_pop, track_rate, track_ltime,
              album_mtime, track_loved, album_loved,
-             album_pop, album_rate) = self.del_from_db(uri, False)
-
-        Logger.debug("CollectionScanner::add2db(): Read tags")
-        title = self.get_title(tags, name)
-        version = self.get_version(tags)
-        if version != "":
-            title += " (%s)" % version
-        artists = self.get_artists(tags)
-        a_sortnames = self.get_artist_sortnames(tags)
-        aa_sortnames = self.get_album_artist_sortnames(tags)
-        album_artists = self.get_album_artists(tags)
-        album_name = self.get_album_name(tags)
+             album_pop, album_rate) = self.del_from_db(old_uri, False)
         album_synced = 0
-        mb_album_id = self.get_mb_album_id(tags)
-        mb_track_id = self.get_mb_track_id(tags)
-        mb_artist_id = self.get_mb_artist_id(tags)
-        mb_album_artist_id = self.get_mb_album_artist_id(tags)
-        genres = self.get_genres(tags)
-        discnumber = self.get_discnumber(tags)
-        discname = self.get_discname(tags)
-        tracknumber = self.get_tracknumber(tags, name)
         # We have popm in tags, override history one
-        tag_track_rate = self.get_popm(tags)
-        if tag_track_rate > 0:
-            track_rate = tag_track_rate
+        if popm > 0:
+            track_rate = popm
         if album_mtime == 0:
             album_mtime = track_mtime
-        bpm = self.get_bpm(tags)
-        compilation = self.get_compilation(tags)
-        (original_year, original_timestamp) = self.get_original_year(tags)
-        (year, timestamp) = self.get_year(tags)
-        if year is None:
-            (year, timestamp) = (original_year, original_timestamp)
-        elif original_year is None:
-            (original_year, original_timestamp) = (year, timestamp)
-        # If no artists tag, use album artist
-        if artists == "":
-            artists = album_artists
-        if App().settings.get_value("import-advanced-artist-tags"):
-            composers = self.get_composers(tags)
-            conductors = self.get_conductors(tags)
-            performers = self.get_performers(tags)
-            remixers = self.get_remixers(tags)
-            artists += ";%s" % performers if performers != "" else ""
-            artists += ";%s" % conductors if conductors != "" else ""
-            artists += ";%s" % composers if composers != "" else ""
-            artists += ";%s" % remixers if remixers != "" else ""
-        if artists == "":
-            artists = _("Unknown")
         return (title, artists, genres, a_sortnames, aa_sortnames,
                 album_artists, album_name, discname, album_loved, album_mtime,
                 album_synced, album_rate, album_pop, discnumber, year,
@@ -826,6 +1297,36 @@ class CollectionScanner(GObject.GObject, TagReader):
             @param storage_type as StorageType
             @return CollectionItem
         """
+        item = self.__get_item(uri, name, artists, genres, a_sortnames,
+                               aa_sortnames, album_artists, album_name,
+                               discname, album_loved, album_mtime,
+                               album_synced, album_rate, album_pop,
+                               discnumber, year, timestamp, original_year,
+                               original_timestamp, mb_album_id, mb_track_id,
+                               mb_artist_id, mb_album_artist_id, tracknumber,
+                               track_pop, track_rate, bpm, track_mtime,
+                               track_ltime, track_loved, duration,
+                               compilation, storage_type)
+        self.save_album(item)
+        self.save_track(item)
+        return item
+
+    def __get_item(self, uri, name, artists,
+                   genres, a_sortnames, aa_sortnames, album_artists,
+                   album_name, discname, album_loved, album_mtime,
+                   album_synced, album_rate, album_pop, discnumber, year,
+                   timestamp, original_year, original_timestamp, mb_album_id,
+                   mb_track_id, mb_artist_id, mb_album_artist_id,
+                   tracknumber, track_pop, track_rate, bpm, track_mtime,
+                   track_ltime, track_loved, duration, compilation,
+                   storage_type=StorageType.COLLECTION):
+        """
+            Get a new item for file
+            @param uri as str
+            @param tags as *()
+            @param storage_type as StorageType
+            @return CollectionItem
+        """
         item = CollectionItem(uri=uri,
                               track_name=name,
                               artists=artists,
@@ -859,8 +1360,6 @@ class CollectionScanner(GObject.GObject, TagReader):
                               duration=duration,
                               compilation=compilation,
                               storage_type=storage_type)
-        self.save_album(item)
-        self.save_track(item)
         return item
 
     def __flatpak_migration(self):
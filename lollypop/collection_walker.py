@@ -0,0 +1,373 @@
+# Copyright (c) 2014-2021 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from gi.repository import GLib, Gio
+
+from gi.repository.Gio import FILE_ATTRIBUTE_STANDARD_NAME, \
+                              FILE_ATTRIBUTE_STANDARD_TYPE, \
+                              FILE_ATTRIBUTE_STANDARD_IS_HIDDEN,\
+                              FILE_ATTRIBUTE_STANDARD_IS_SYMLINK,\
+                              FILE_ATTRIBUTE_STANDARD_SYMLINK_TARGET,\
+                              FILE_ATTRIBUTE_STANDARD_SIZE,\
+                              FILE_ATTRIBUTE_TIME_MODIFIED
+
+from collections import deque
+from time import time
+from urllib.parse import urlparse
+
+from lollypop.define import FileType
+from lollypop.logger import Logger
+from lollypop.utils_file import get_mtime, get_file_type
+
+
+SCAN_QUERY_INFO = "{},{},{},{},{},{},{}".format(
+                                       FILE_ATTRIBUTE_STANDARD_NAME,
+                                       FILE_ATTRIBUTE_STANDARD_TYPE,
+                                       FILE_ATTRIBUTE_STANDARD_IS_HIDDEN,
+                                       FILE_ATTRIBUTE_STANDARD_IS_SYMLINK,
+                                       FILE_ATTRIBUTE_STANDARD_SYMLINK_TARGET,
+                                       FILE_ATTRIBUTE_STANDARD_SIZE,
+                                       FILE_ATTRIBUTE_TIME_MODIFIED)
+
+
+class CollectionWalker:
+    """
+        Walk directories with async Gio enumeration
+        Several directories are enumerated at the same time, limited per
+        mount: remote mounts do not like too many concurrent requests
+    """
+    # Files fetched per next_files_async() call
+    __BATCH_SIZE = 100
+    # Directories enumerated at the same time per mount
+    __LOCAL_LIMIT = 8
+    __REMOTE_LIMIT = 2
+
+    def __init__(self, ignore_symlinks, get_unchanged_children=None):
+        """
+            Init walker
+            @param ignore_symlinks as bool
+            @param get_unchanged_children as function(str, str, int)/None:
+                   called with (uri, parent, mtime) for each non root
+                   directory, returns [str] to only walk these children
+                   instead of enumerating directory, None to enumerate it
+        """
+        self.__ignore_symlinks = ignore_symlinks
+        self.__get_unchanged_children = get_unchanged_children
+        self.__cancellable = Gio.Cancellable.new()
+        # Directories waiting for enumeration per mount
+        self.__frontiers = {}
+        # Running operations per mount
+        self.__running = {}
+        self.__files = deque()
+        self.__walked_directories = {}
+        self.__skipped_directories = set()
+        # Subdirectories found while enumerating a directory
+        self.__subdirectories = {}
+        self.__directories_count = 0
+        self.__files_count = 0
+        self.__start_time = 0
+        self.__stop_time = 0
+
+    def walk(self, uris):
+        """
+            Walk uris for files, must be consumed in a single thread
+            @param uris as [str]
+            @return generator of (int, str, int): (mtime, uri, size)
+        """
+        self.__start_time = time()
+        self.__stop_time = 0
+        context = GLib.MainContext.new()
+        # Async callbacks are dispatched to this context
+        context.push_thread_default()
+        try:
+            # Roots are always walked
+            for uri in uris:
+                self.__push(uri, None, None)
+            while self.__frontiers or self.__running:
+                self.__start_operations()
+                while self.__files:
+                    yield self.__files.popleft()
+                if self.__running:
+                    context.iteration(True)
+        finally:
+            self.__cancellable.cancel()
+            self.__frontiers = {}
+            # Let cancelled operations finish
+            while self.__running:
+                context.iteration(True)
+            context.pop_thread_default()
+            self.__stop_time = time()
+            Logger.info("Walked %s directories, %s files: %.1f files/s",
+                        self.directories_count, self.files_count,
+                        self.files_per_second)
+
+    def get_complete_directories(self, saved_counts):
+        """
+            Get walked directories with whole tree walked and saved, safe
+            to call while walking
+            @param saved_counts as {str: int}: audio files saved per
+                   directory
+            @return {str: (str, int, int)}: {uri: (parent, mtime, count)}
+        """
+        walked = self.__walked_directories.copy()
+        skipped = set(self.__skipped_directories)
+        subdirectories = self.__subdirectories.copy()
+        complete = {}
+
+        def is_complete(uri):
+            if uri in skipped:
+                return True
+            elif uri not in walked.keys():
+                return False
+            elif uri not in complete.keys():
+                # Walked directory subdirectories are all known
+                count = walked[uri][2]
+                complete[uri] = saved_counts.get(uri, 0) >= count and\
+                    all([is_complete(child_uri)
+                         for child_uri in subdirectories.get(uri, [])])
+            return complete[uri]
+
+        return dict([(uri, values) for (uri, values) in walked.items()
+                     if is_complete(uri)])
+
+    @property
+    def walked_directories(self):
+        """
+            Get enumerated directories
+            @return {str: (str, int, int)}: {uri: (parent, mtime, count)}
+        """
+        return self.__walked_directories
+
+    @property
+    def skipped_directories(self):
+        """
+            Get unchanged directories not enumerated
+            @return set of str
+        """
+        return self.__skipped_directories
+
+    @property
+    def directories_count(self):
+        """
+            Get walked directories count
+            @return int
+        """
+        return self.__directories_count
+
+    @property
+    def files_count(self):
+        """
+            Get found files count
+            @return int
+        """
+        return self.__files_count
+
+    @property
+    def elapsed(self):
+        """
+            Get walk duration
+            @return float (seconds)
+        """
+        if self.__start_time == 0:
+            return 0
+        elif self.__stop_time == 0:
+            return time() - self.__start_time
+        return self.__stop_time - self.__start_time
+
+    @property
+    def files_per_second(self):
+        """
+            Get walk throughput
+            @return float
+        """
+        elapsed = self.elapsed
+        if elapsed == 0:
+            return 0
+        return self.__files_count / elapsed
+
+#######################
+# PRIVATE             #
+#######################
+    def __get_mount(self, uri):
+        """
+            Get mount key for uri
+            @param uri as str
+            @return str
+        """
+        parsed = urlparse(uri)
+        if parsed.scheme == "file":
+            return "file"
+        # smb://host/share/..., uri path holds share
+        share = parsed.path.lstrip("/").split("/", 1)[0]
+        return "%s://%s/%s" % (parsed.scheme, parsed.netloc, share)
+
+    def __push(self, uri, parent, info):
+        """
+            Add uri to frontier
+            @param uri as str
+            @param parent as str/None
+            @param info as Gio.FileInfo/None => known directory info
+        """
+        mount = self.__get_mount(uri)
+        if mount not in self.__frontiers.keys():
+            self.__frontiers[mount] = deque()
+        self.__frontiers[mount].append((uri, parent, info))
+
+    def __start_operations(self):
+        """
+            Start operations for mounts with free slots
+        """
+        for mount in list(self.__frontiers.keys()):
+            frontier = self.__frontiers[mount]
+            limit = self.__LOCAL_LIMIT if mount == "file"\
+                else self.__REMOTE_LIMIT
+            while frontier and self.__running.get(mount, 0) < limit:
+                (uri, parent, info) = frontier.popleft()
+                self.__running[mount] = self.__running.get(mount, 0) + 1
+                f = Gio.File.new_for_uri(uri)
+                if info is None:
+                    f.query_info_async(SCAN_QUERY_INFO,
+                                       Gio.FileQueryInfoFlags.NONE,
+                                       GLib.PRIORITY_LOW,
+                                       self.__cancellable,
+                                       self.__on_query_info,
+                                       mount, parent)
+                else:
+                    self.__handle_info(f, mount, parent, info)
+            if not frontier:
+                del self.__frontiers[mount]
+
+    def __handle_info(self, f, mount, parent, info):
+        """
+            Add file or enumerate directory
+            @param f as Gio.File
+            @param mount as str
+            @param parent as str/None
+            @param info as Gio.FileInfo
+        """
+        uri = f.get_uri()
+        mtime = get_mtime(info)
+        if info.get_file_type() != Gio.FileType.DIRECTORY:
+            self.__files_count += 1
+            self.__files.append((mtime, uri, info.get_size()))
+            self.__end_operation(mount)
+            return
+        self.__directories_count += 1
+        if parent is not None and self.__get_unchanged_children is not None:
+            children = self.__get_unchanged_children(uri, parent, mtime)
+            if children is not None:
+                self.__skipped_directories.add(uri)
+                for child_uri in children:
+                    self.__push(child_uri, uri, None)
+                self.__end_operation(mount)
+                return
+        f.enumerate_children_async(SCAN_QUERY_INFO,
+                                   Gio.FileQueryInfoFlags.NONE,
+                                   GLib.PRIORITY_LOW,
+                                   self.__cancellable,
+                                   self.__on_enumerate_children,
+                                   mount, parent, mtime)
+
+    def __end_operation(self, mount):
+        """
+            Release a slot for mount
+            @param mount as str
+        """
+        self.__running[mount] -= 1
+        if self.__running[mount] == 0:
+            del self.__running[mount]
+
+    def __on_query_info(self, f, result, mount, parent):
+        """
+            Handle file info
+            @param f as Gio.File
+            @param result as Gio.AsyncResult
+            @param mount as str
+            @param parent as str/None
+        """
+        try:
+            info = f.query_info_finish(result)
+            self.__handle_info(f, mount, parent, info)
+        except Exception as e:
+            if not self.__cancellable.is_cancelled():
+                Logger.error("CollectionWalker::__on_query_info(): %s", e)
+            self.__end_operation(mount)
+
+    def __on_enumerate_children(self, f, result, mount, parent, mtime):
+        """
+            Fetch first children batch
+            @param f as Gio.File
+            @param result as Gio.AsyncResult
+            @param mount as str
+            @param parent as str/None
+            @param mtime as int
+        """
+        try:
+            enumerator = f.enumerate_children_finish(result)
+            enumerator.next_files_async(self.__BATCH_SIZE,
+                                        GLib.PRIORITY_LOW,
+                                        self.__cancellable,
+                                        self.__on_next_files,
+                                        mount, f.get_uri(), parent, mtime, 0)
+        except Exception as e:
+            if not self.__cancellable.is_cancelled():
+                Logger.error("CollectionWalker::__on_enumerate_children(): %s",
+                             e)
+            self.__end_operation(mount)
+
+    def __on_next_files(self, enumerator, result,
+                        mount, uri, parent, mtime, count):
+        """
+            Add children to frontier and fetch next batch
+            @param enumerator as Gio.FileEnumerator
+            @param result as Gio.AsyncResult
+            @param mount as str
+            @param uri as str
+            @param parent as str/None
+            @param mtime as int
+            @param count as int => audio files in previous batches
+        """
+        try:
+            infos = enumerator.next_files_finish(result)
+            if not infos:
+                enumerator.close_async(GLib.PRIORITY_LOW, None, None)
+                self.__walked_directories[uri] = (parent, mtime, count)
+                self.__end_operation(mount)
+                return
+            for info in infos:
+                if info.get_is_hidden():
+                    continue
+                # User do not want internal symlinks
+                elif info.get_is_symlink() and self.__ignore_symlinks:
+                    continue
+                child_uri = enumerator.get_child(info).get_uri()
+                if info.get_file_type() == Gio.FileType.DIRECTORY:
+                    if uri not in self.__subdirectories.keys():
+                        self.__subdirectories[uri] = []
+                    self.__subdirectories[uri].append(child_uri)
+                    # Info already known, do not query it again
+                    self.__push(child_uri, uri, info)
+                else:
+                    if get_file_type(child_uri) == FileType.AUDIO:
+                        count += 1
+                    self.__files_count += 1
+                    self.__files.append((get_mtime(info), child_uri,
+                                         info.get_size()))
+            enumerator.next_files_async(self.__BATCH_SIZE,
+                                        GLib.PRIORITY_LOW,
+                                        self.__cancellable,
+                                        self.__on_next_files,
+                                        mount, uri, parent, mtime, count)
+        except Exception as e:
+            if not self.__cancellable.is_cancelled():
+                Logger.error("CollectionWalker::__on_next_files(): %s", e)
+            self.__end_operation(mount)
@@ -10,18 +10,21 @@
 # You should have received a copy of the GNU General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
-from gi.repository import Gio
+from gi.repository import Gio, GLib
 
 import sqlite3
+from locale import setlocale, LC_COLLATE
 from threading import Lock
 from random import shuffle
 import itertools
 
 from lollypop.define import App, LOLLYPOP_DATA_PATH
 from lollypop.database_upgrade import DatabaseAlbumsUpgrade
+from lollypop.database_writer import DatabaseWriter
+from lollypop.database_fts import FtsDatabase
 from lollypop.sqlcursor import SqlCursor
 from lollypop.logger import Logger
-from lollypop.localized import LocalizedCollation
+from lollypop.localized import LocalizedCollation, get_sort_keys
 from lollypop.utils import noaccents, sql_escape
 
 
@@ -52,6 +55,12 @@ class Database:
     """
 
     DB_PATH = "%s/lollypop.db" % LOLLYPOP_DATA_PATH
+    # Pragmas used in WAL mode
+    # NORMAL is safe with WAL: only last commits may be lost on power loss
+    __SYNCHRONOUS = "NORMAL"
+    # Negative value is in KiB: 16MB page cache per connection
+    __CACHE_SIZE = -16000
+    __MMAP_SIZE = 268435456
 
     # SQLite documentation:
     # In SQLite, a column with type INTEGER PRIMARY KEY
@@ -60,6 +69,12 @@ class Database:
     # this make VACUUM not destroy rowids...
     __create_albums = """CREATE TABLE albums (id INTEGER PRIMARY KEY,
                                               name TEXT NOT NULL,
+                                              searchname TEXT NOT NULL
+                                                DEFAULT '',
+                                              sortindex TEXT NOT NULL
+                                                DEFAULT '',
+                                              sortkey TEXT NOT NULL
+                                                DEFAULT '',
                                               mb_album_id TEXT,
                                               lp_album_id TEXT,
                                               no_album_artist BOOLEAN NOT NULL,
@@ -74,13 +89,23 @@ class Database:
                                               synced INT NOT NULL)"""
     __create_artists = """CREATE TABLE artists (id INTEGER PRIMARY KEY,
                                                name TEXT NOT NULL,
+                                               searchname TEXT NOT NULL
+                                                DEFAULT '',
                                                sortname TEXT NOT NULL,
+                                               sortindex TEXT NOT NULL
+                                                DEFAULT '',
+                                               sortkey TEXT NOT NULL
+                                                DEFAULT '',
                                                mb_artist_id TEXT)"""
     __create_featuring = """CREATE TABLE featuring (
                                                artist_id INT NOT NULL,
                                                album_id INT NOT NULL)"""
     __create_genres = """CREATE TABLE genres (id INTEGER PRIMARY KEY,
-                                            name TEXT NOT NULL)"""
+                                            name TEXT NOT NULL,
+                                            sortindex TEXT NOT NULL
+                                                DEFAULT '',
+                                            sortkey TEXT NOT NULL
+                                                DEFAULT '')"""
     __create_album_artists = """CREATE TABLE album_artists (
                                                 album_id INT NOT NULL,
                                                 artist_id INT NOT NULL)"""
@@ -93,6 +118,8 @@ class Database:
                                                 popularity INT NOT NULL)"""
     __create_tracks = """CREATE TABLE tracks (id INTEGER PRIMARY KEY,
                                               name TEXT NOT NULL,
+                                              searchname TEXT NOT NULL
+                                                DEFAULT '',
                                               uri TEXT NOT NULL,
                                               duration INT,
                                               tracknumber INT,
@@ -109,8 +136,22 @@ class Database:
                                               storage_type INT NOT NULL,
                                               mb_track_id TEXT,
                                               lp_track_id TEXT,
-                                              bpm DOUBLE
+                                              bpm DOUBLE,
+                                              fingerprint TEXT,
+                                              track_gain DOUBLE,
+                                              track_peak DOUBLE,
+                                              album_gain DOUBLE,
+                                              album_peak DOUBLE,
+                                              loudness_failed INT NOT NULL
+                                                  DEFAULT 0
                                               )"""
+    __create_album_stats = """CREATE TABLE album_stats (
+                                                album_id INTEGER PRIMARY KEY,
+                                                duration INT NOT NULL,
+                                                tracks_count INT NOT NULL,
+                                                discs TEXT NOT NULL,
+                                                min_year INT,
+                                                max_year INT)"""
     __create_track_artists = """CREATE TABLE track_artists (
                                                 track_id INT NOT NULL,
                                                 artist_id INT NOT NULL)"""
@@ -125,12 +166,55 @@ class Database:
                                                 album_id)"""
     __create_track_genres_idx = """CREATE index idx_tg ON track_genres(
                                                 track_id)"""
+    __create_albums_searchname_idx = """CREATE index idx_albums_searchname
+                                                ON albums(searchname)"""
+    __create_artists_searchname_idx = """CREATE index idx_artists_searchname
+                                                ON artists(searchname)"""
+    __create_tracks_searchname_idx = """CREATE index idx_tracks_searchname
+                                                ON tracks(searchname)"""
+    __create_albums_sortkey_idx = """CREATE index idx_albums_sortkey
+                                            ON albums(sortindex, sortkey)"""
+    __create_artists_sortkey_idx = """CREATE index idx_artists_sortkey
+                                            ON artists(sortindex, sortkey)"""
+    __create_genres_sortkey_idx = """CREATE index idx_genres_sortkey
+                                            ON genres(sortindex, sortkey)"""
+    __create_album_artists_artist_idx = """CREATE index idx_aa_artist
+                                    ON album_artists(artist_id, album_id)"""
+    __create_track_artists_artist_idx = """CREATE index idx_ta_artist
+                                    ON track_artists(artist_id, track_id)"""
+    __create_album_genres_genre_idx = """CREATE index idx_ag_genre
+                                    ON album_genres(genre_id, album_id)"""
+    __create_track_genres_genre_idx = """CREATE index idx_tg_genre
+                                    ON track_genres(genre_id, track_id)"""
+    __create_featuring_idx = """CREATE index idx_featuring
+                                    ON featuring(artist_id, album_id)"""
+    __create_tracks_uri_idx = """CREATE index idx_tracks_uri
+                                    ON tracks(uri)"""
+    __create_tracks_album_idx = """CREATE index idx_tracks_album
+                            ON tracks(album_id, discnumber, tracknumber)"""
+    __create_tracks_storage_type_idx = """CREATE index idx_tracks_storage_type
+                                    ON tracks(storage_type, mtime)"""
+    __create_tracks_lp_idx = """CREATE index idx_tracks_lp
+                                    ON tracks(lp_track_id)"""
+    __create_albums_storage_type_idx = """CREATE index idx_albums_storage_type
+                                    ON albums(storage_type, mtime)"""
+    __create_albums_lp_idx = """CREATE index idx_albums_lp
+                                    ON albums(lp_album_id)"""
+    __create_album_stats_idx = """CREATE index idx_album_stats_count
+                                    ON album_stats(tracks_count)"""
+    __create_directories = """CREATE TABLE directories (
+                                                uri TEXT PRIMARY KEY,
+                                                parent TEXT,
+                                                mtime INT NOT NULL,
+                                                count INT NOT NULL)"""
 
     def __init__(self):
         """
             Create database tables or manage update if needed
         """
         self.thread_lock = MyLock()
+        self.__wal = App().settings.get_value("db-wal")
+        self.writer = DatabaseWriter(self)
         f = Gio.File.new_for_path(self.DB_PATH)
         upgrade = DatabaseAlbumsUpgrade()
         if not f.query_exists():
@@ -148,17 +232,46 @@ class Database:
                     sql.execute(self.__create_album_artists)
                     sql.execute(self.__create_album_timed_popularity)
                     sql.execute(self.__create_tracks)
+                    sql.execute(self.__create_album_stats)
                     sql.execute(self.__create_track_artists)
                     sql.execute(self.__create_track_genres)
                     sql.execute(self.__create_album_artists_idx)
                     sql.execute(self.__create_track_artists_idx)
                     sql.execute(self.__create_album_genres_idx)
                     sql.execute(self.__create_track_genres_idx)
+                    sql.execute(self.__create_albums_searchname_idx)
+                    sql.execute(self.__create_artists_searchname_idx)
+                    sql.execute(self.__create_tracks_searchname_idx)
+                    sql.execute(self.__create_albums_sortkey_idx)
+                    sql.execute(self.__create_artists_sortkey_idx)
+                    sql.execute(self.__create_genres_sortkey_idx)
+                    sql.execute(self.__create_album_artists_artist_idx)
+                    sql.execute(self.__create_track_artists_artist_idx)
+                    sql.execute(self.__create_album_genres_genre_idx)
+                    sql.execute(self.__create_track_genres_genre_idx)
+                    sql.execute(self.__create_featuring_idx)
+                    sql.execute(self.__create_tracks_uri_idx)
+                    sql.execute(self.__create_tracks_album_idx)
+                    sql.execute(self.__create_tracks_storage_type_idx)
+                    sql.execute(self.__create_tracks_lp_idx)
+                    sql.execute(self.__create_albums_storage_type_idx)
+                    sql.execute(self.__create_albums_lp_idx)
+                    sql.execute(self.__create_album_stats_idx)
+                    sql.execute(self.__create_directories)
                     sql.execute("PRAGMA user_version=%s" % upgrade.version)
+                FtsDatabase(self).create()
             except Exception as e:
                 Logger.error("Database::__init__(): %s" % e)
         else:
             upgrade.upgrade(self)
+        self.__set_journal_mode()
+        # Sort keys depend on collation locale
+        collate = setlocale(LC_COLLATE)
+        if App().settings.get_value(
+                "sort-keys-locale").get_string() != collate:
+            self.update_sort_keys()
+            App().settings.set_value("sort-keys-locale",
+                                     GLib.Variant("s", collate))
 
     def execute(self, request):
         """
@@ -205,14 +318,56 @@ class Database:
             Return a new sqlite cursor
         """
         try:
-            c = sqlite3.connect(self.DB_PATH, 600.0)
+            c = sqlite3.connect(self.DB_PATH, 600.0,
+                                check_same_thread=False)
             c.create_collation("LOCALIZED", LocalizedCollation())
             c.create_function("noaccents", 1, noaccents)
             c.create_function("sql_escape", 1, sql_escape)
+            if self.__wal:
+                c.execute("PRAGMA synchronous=%s" % self.__SYNCHRONOUS)
+                c.execute("PRAGMA cache_size=%s" % self.__CACHE_SIZE)
+                c.execute("PRAGMA mmap_size=%s" % self.__MMAP_SIZE)
+                c.execute("PRAGMA temp_store=MEMORY")
             return c
         except:
             exit(-1)
 
+    def update_sort_keys(self):
+        """
+            Regenerate sort keys for current locale
+        """
+        try:
+            with SqlCursor(self, True) as sql:
+                for (table, column) in [("albums", "name"),
+                                        ("artists", "sortname"),
+                                        ("genres", "name")]:
+                    result = sql.execute("SELECT rowid, %s FROM %s" %
+                                         (column, table))
+                    keys = [get_sort_keys(value) + (rowid,)
+                            for (rowid, value) in list(result)]
+                    sql.executemany("UPDATE %s SET sortindex=?, sortkey=?\
+                                     WHERE rowid=?" % table, keys)
+        except Exception as e:
+            Logger.error("Database::update_sort_keys(): %s", e)
+
+    @property
+    def wal(self):
+        """
+            True if database is in WAL mode
+            @return bool
+        """
+        return self.__wal
+
 #######################
 # PRIVATE             #
 #######################
+    def __set_journal_mode(self):
+        """
+            Set journal mode, WAL is persistent in database file
+        """
+        try:
+            mode = "WAL" if self.__wal else "DELETE"
+            with SqlCursor(self) as sql:
+                sql.execute("PRAGMA journal_mode=%s" % mode)
+        except Exception as e:
+            Logger.error("Database::__set_journal_mode(): %s" % e)
@@ -11,6 +11,7 @@
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
 import itertools
+import json
 from time import time
 from random import shuffle
 
@@ -18,12 +19,23 @@ from lollypop.sqlcursor import SqlCursor
 from lollypop.define import App, Type, OrderBy, StorageType, LovedFlags
 from lollypop.logger import Logger
 from lollypop.utils import remove_static, make_subrequest
+from lollypop.utils import make_in_subrequest, get_sql_ids
+from lollypop.utils import noaccents, get_prefix_range
+from lollypop.localized import get_sort_keys
 
 
 class AlbumsDatabase:
     """
         Albums database helper
     """
+    # Aggregates for album_stats, %s is a WHERE clause on tracks
+    __STATS_REQUEST = """INSERT INTO album_stats (album_id, duration,
+                                                  tracks_count, discs,
+                                                  min_year, max_year)
+                         SELECT album_id, IFNULL(SUM(duration), 0), COUNT(*),
+                                json_group_array(DISTINCT discnumber),
+                                MIN(year), MAX(year)
+                         FROM tracks %s GROUP BY album_id"""
 
     def __init__(self, db):
         """
@@ -52,12 +64,16 @@ class AlbumsDatabase:
         """
         with SqlCursor(self.__db, True) as sql:
             result = sql.execute("INSERT INTO albums\
-                                  (name, mb_album_id, lp_album_id,\
+                                  (name, searchname, sortindex, sortkey,\
+                                   mb_album_id, lp_album_id,\
                                    no_album_artist, uri,\
                                    loved, popularity, rate, mtime, synced,\
                                    storage_type)\
-                                  VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-                                 (album_name, mb_album_id or None, lp_album_id,
+                                  VALUES (?, ?, ?, ?, ?, ?, ?, ?,\
+                                          ?, ?, ?, ?, ?, ?)",
+                                 (album_name, noaccents(album_name)) +
+                                 get_sort_keys(album_name) +
+                                 (mb_album_id or None, lp_album_id,
                                   artist_ids == [], uri, loved, popularity,
                                   rate, mtime, synced, storage_type))
             for artist_id in artist_ids:
@@ -93,6 +109,18 @@ class AlbumsDatabase:
                              VALUES (?, ?)",
                             (album_id, genre_id))
 
+    def add_genres(self, album_genre_ids):
+        """
+            Add genres to albums, skip already set genres
+            @param album_genre_ids as [(int, int)] => (album id, genre id)
+        """
+        with SqlCursor(self.__db, True) as sql:
+            sql.executemany("INSERT INTO album_genres (album_id, genre_id)\
+                             SELECT ?1, ?2 WHERE NOT EXISTS (\
+                                SELECT 1 FROM album_genres\
+                                WHERE album_id=?1 AND genre_id=?2)",
+                            album_genre_ids)
+
     def set_artist_ids(self, album_id, artist_ids):
         """
             Set artist id
@@ -177,6 +205,16 @@ class AlbumsDatabase:
             sql.execute("UPDATE albums SET timestamp=? WHERE rowid=?",
                         (timestamp, album_id))
 
+    def set_years(self, album_years):
+        """
+            Set years and timestamps
+            @param album_years as [(int, int, int)] =>
+                   (album id, year, timestamp)
+        """
+        with SqlCursor(self.__db, True) as sql:
+            sql.executemany("UPDATE albums SET year=?2, timestamp=?3\
+                             WHERE rowid=?1", album_years)
+
     def set_uri(self, album_id, uri):
         """
             Set album uri for album id
@@ -223,11 +261,9 @@ class AlbumsDatabase:
                        AND (album_artists.artist_id = artists.rowid\
                             OR album_artists.artist_id=?)\
                        AND synced & (1 << ?) AND albums.storage_type & ?"
-            order = " ORDER BY artists.sortname\
-                     COLLATE NOCASE COLLATE LOCALIZED,\
+            order = " ORDER BY artists.sortindex, artists.sortkey,\
                      albums.timestamp,\
-                     albums.name\
-                     COLLATE NOCASE COLLATE LOCALIZED"
+                     albums.sortindex, albums.sortkey"
             filters = (Type.COMPILATIONS, index, StorageType.COLLECTION)
             result = sql.execute(request + order, filters)
             return list(itertools.chain(*result))
@@ -494,6 +530,25 @@ class AlbumsDatabase:
                 return v[0]
             return None
 
+    def get_lookup_rows(self):
+        """
+            Get rows needed to resolve album ids while scanning
+            @return [(int, str, str, bool, int, str, str)]:
+                id, name, mbid, no album artist, storage type, uri,
+                comma separated artist ids
+        """
+        with SqlCursor(self.__db) as sql:
+            result = sql.execute("SELECT albums.rowid, albums.name,\
+                                         albums.mb_album_id,\
+                                         albums.no_album_artist,\
+                                         albums.storage_type, albums.uri,\
+                                         group_concat(album_artists.artist_id)\
+                                  FROM albums LEFT JOIN album_artists\
+                                  ON album_artists.album_id=albums.rowid\
+                                  GROUP BY albums.rowid\
+                                  ORDER BY albums.rowid")
+            return list(result)
+
     def set_genre_ids(self, album_id, genre_ids):
         """
             Set genre_ids for album
@@ -646,6 +701,15 @@ class AlbumsDatabase:
                 return v[0]
             return ""
 
+    def get_lp_album_ids(self):
+        """
+            Get all Lollypop ids
+            @return set(str)
+        """
+        with SqlCursor(self.__db) as sql:
+            result = sql.execute("SELECT lp_album_id FROM albums")
+            return set([row[0] for row in result if row[0]])
+
     def get_uri(self, album_id):
         """
             Get album uri for album id
@@ -684,6 +748,56 @@ class AlbumsDatabase:
             result = sql.execute("SELECT uri FROM albums")
             return list(itertools.chain(*result))
 
+    def get_rows(self, album_ids):
+        """
+            Get albums attributes, one query per table for all albums
+            @param album_ids as [int]
+            @return {album_id: {attr: value}}
+        """
+        rows = {}
+        if not album_ids:
+            return rows
+        with SqlCursor(self.__db) as sql:
+            # One parameter whatever ids count
+            ids = get_sql_ids(album_ids)
+            subrequest = "SELECT value FROM json_each(?)"
+            result = sql.execute("SELECT rowid, name, mb_album_id,\
+                                  lp_album_id, year, timestamp, uri,\
+                                  popularity, rate, loved, mtime,\
+                                  storage_type, synced\
+                                  FROM albums\
+                                  WHERE rowid IN (%s)" % subrequest,
+                                 (ids,))
+            for v in result:
+                rows[v[0]] = {"name": v[1],
+                              "mb_album_id": v[2],
+                              "lp_album_id": v[3] or "",
+                              "year": v[4] or None,
+                              "timestamp": v[5],
+                              "uri": v[6],
+                              "popularity": v[7],
+                              "rate": v[8],
+                              "loved": v[9],
+                              "mtime": v[10],
+                              "storage_type": v[11],
+                              "synced": v[12],
+                              "artist_ids": [],
+                              "artists": []}
+            result = sql.execute("SELECT album_artists.album_id,\
+                                  album_artists.artist_id, artists.name\
+                                  FROM album_artists\
+                                  LEFT JOIN artists\
+                                  ON artists.rowid=album_artists.artist_id\
+                                  WHERE album_artists.album_id IN (%s)" %
+                                 subrequest, (ids,))
+            for (album_id, artist_id, name) in result:
+                if album_id not in rows.keys():
+                    continue
+                rows[album_id]["artist_ids"].append(artist_id)
+                if name is not None:
+                    rows[album_id]["artists"].append(name)
+        return rows
+
     def get_rated(self, storage_type, skipped, limit):
         """
             Get albums with user rating >= 4
@@ -908,6 +1022,9 @@ class AlbumsDatabase:
             @param album_id as int
             @return [disc as int]
         """
+        stats = self.get_stats(album_id)
+        if stats is not None:
+            return stats[2]
         with SqlCursor(self.__db) as sql:
             request = "SELECT DISTINCT discnumber\
                        FROM tracks\
@@ -944,25 +1061,12 @@ class AlbumsDatabase:
         artist_ids = remove_static(artist_ids)
         with SqlCursor(self.__db) as sql:
             filters = (album_id, disc, storage_type)
-            request = "SELECT DISTINCT tracks.rowid\
-                       FROM tracks"
-            if genre_ids:
-                request += ", track_genres"
-                filters += tuple(genre_ids)
-            if artist_ids:
-                request += ", track_artists"
-                filters += tuple(artist_ids)
-            request += " WHERE album_id=? AND discnumber=? AND storage_type&?"
-            if genre_ids:
-                request += " AND track_genres.track_id = tracks.rowid AND"
-                request += make_subrequest("track_genres.genre_id=?",
-                                           "OR",
-                                           len(genre_ids))
-            if artist_ids:
-                request += " AND track_artists.track_id=tracks.rowid AND"
-                request += make_subrequest("track_artists.artist_id=?",
-                                           "OR",
-                                           len(artist_ids))
+            request = "SELECT tracks.rowid FROM tracks\
+                       WHERE album_id=? AND discnumber=? AND storage_type&?"
+            (subrequest, subfilters) = self.__get_tracks_filter(genre_ids,
+                                                                artist_ids)
+            request += subrequest
+            filters += subfilters
             if not skipped:
                 request += " AND not tracks.loved & ?"
                 filters += (LovedFlags.SKIPPED,)
@@ -982,24 +1086,11 @@ class AlbumsDatabase:
         artist_ids = remove_static(artist_ids)
         with SqlCursor(self.__db) as sql:
             filters = (album_id,)
-            request = "SELECT COUNT(*) FROM tracks"
-            if genre_ids:
-                request += ", track_genres"
-                filters += tuple(genre_ids)
-            if artist_ids:
-                request += ", track_artists"
-                filters += tuple(artist_ids)
-            request += " WHERE album_id=?"
-            if genre_ids:
-                request += " AND track_genres.track_id = tracks.rowid AND"
-                request += make_subrequest("track_genres.genre_id=?",
-                                           "OR",
-                                           len(genre_ids))
-            if artist_ids:
-                request += " AND track_artists.track_id=tracks.rowid AND"
-                request += make_subrequest("track_artists.artist_id=?",
-                                           "OR",
-                                           len(artist_ids))
+            request = "SELECT COUNT(*) FROM tracks WHERE album_id=?"
+            (subrequest, subfilters) = self.__get_tracks_filter(genre_ids,
+                                                                artist_ids)
+            request += subrequest
+            filters += subfilters
             result = sql.execute(request, filters)
             v = result.fetchone()
             if v is not None and v[0] > 0:
@@ -1038,105 +1129,47 @@ class AlbumsDatabase:
         if orderby is None:
             orderby = App().settings.get_enum("orderby")
         if orderby == OrderBy.ARTIST_YEAR:
-            order = " ORDER BY artists.sortname\
-                     COLLATE NOCASE COLLATE LOCALIZED,\
+            order = " ORDER BY artists.sortindex, artists.sortkey,\
                      albums.timestamp,\
-                     albums.name\
-                     COLLATE NOCASE COLLATE LOCALIZED"
+                     albums.sortindex, albums.sortkey"
         elif orderby == OrderBy.ARTIST_TITLE:
-            order = " ORDER BY artists.sortname\
-                     COLLATE NOCASE COLLATE LOCALIZED,\
-                     albums.name\
-                     COLLATE NOCASE COLLATE LOCALIZED"
+            order = " ORDER BY artists.sortindex, artists.sortkey,\
+                     albums.sortindex, albums.sortkey"
         elif orderby == OrderBy.TITLE:
-            order = " ORDER BY albums.name\
-                     COLLATE NOCASE COLLATE LOCALIZED"
+            order = " ORDER BY albums.sortindex, albums.sortkey"
         elif orderby == OrderBy.YEAR_DESC:
             order = " ORDER BY albums.timestamp DESC,\
-                     albums.name\
-                     COLLATE NOCASE COLLATE LOCALIZED"
+                     albums.sortindex, albums.sortkey"
         elif orderby == OrderBy.YEAR_ASC:
             order = " ORDER BY albums.timestamp ASC,\
-                     albums.name\
-                     COLLATE NOCASE COLLATE LOCALIZED"
+                     albums.sortindex, albums.sortkey"
         else:
             order = " ORDER BY albums.popularity DESC,\
-                     albums.name\
-                     COLLATE NOCASE COLLATE LOCALIZED"
+                     albums.sortindex, albums.sortkey"
 
         with SqlCursor(self.__db) as sql:
-            result = []
-            # Get albums for all artists
-            if not artist_ids and not genre_ids:
-                filters = (storage_type,)
-                request = "SELECT DISTINCT albums.rowid\
-                           FROM albums, album_artists, artists\
-                           WHERE albums.rowid = album_artists.album_id AND\
-                           albums.storage_type & ? AND\
-                           artists.rowid = album_artists.artist_id"
-                if not skipped:
-                    request += " AND not albums.loved & ?"
-                    filters += (LovedFlags.SKIPPED,)
-                request += order
-                result = sql.execute(request, filters)
+            filters = (storage_type,)
+            request = "SELECT DISTINCT albums.rowid\
+                       FROM albums, album_artists, artists\
+                       WHERE albums.rowid = album_artists.album_id AND\
+                       albums.storage_type & ? AND\
+                       artists.rowid = album_artists.artist_id"
+            # Get albums for artists
+            if artist_ids:
+                request += " AND " + make_in_subrequest("artists.rowid")
+                filters += (get_sql_ids(artist_ids),)
             # Get albums for genres
-            elif not artist_ids:
-                filters = (storage_type,)
-                filters += tuple(genre_ids)
-                request = "SELECT DISTINCT albums.rowid FROM albums,\
-                           album_genres, album_artists, artists\
-                           WHERE albums.rowid = album_artists.album_id AND\
-                           artists.rowid = album_artists.artist_id AND\
-                           albums.storage_type & ? AND\
-                           album_genres.album_id=albums.rowid AND"
-                request += make_subrequest("album_genres.genre_id=?",
-                                           "OR",
-                                           len(genre_ids))
-                if not skipped:
-                    request += " AND not albums.loved & ?"
-                    filters += (LovedFlags.SKIPPED,)
-                request += order
-                result = sql.execute(request, filters)
-            # Get albums for artist
-            elif not genre_ids:
-                filters = (storage_type,)
-                filters += tuple(artist_ids)
-                request = "SELECT DISTINCT albums.rowid\
-                           FROM albums, album_artists, artists\
-                           WHERE album_artists.album_id=albums.rowid AND\
-                           albums.storage_type & ? AND\
-                           artists.rowid = album_artists.artist_id AND"
-                request += make_subrequest("artists.rowid=?",
-                                           "OR",
-                                           len(artist_ids))
-                if not skipped:
-                    request += " AND not albums.loved & ?"
-                    filters += (LovedFlags.SKIPPED,)
-                request += order
-                result = sql.execute(request, filters)
-            # Get albums for artist id and genre id
-            else:
-                filters = (storage_type,)
-                filters += tuple(artist_ids)
-                filters += tuple(genre_ids)
-                request = "SELECT DISTINCT albums.rowid\
-                           FROM albums, album_genres, album_artists, artists\
-                           WHERE album_genres.album_id=albums.rowid AND\
-                           artists.rowid = album_artists.artist_id AND\
-                           albums.storage_type & ? AND\
-                           album_artists.album_id=albums.rowid AND"
-                request += make_subrequest("artists.rowid=?",
-                                           "OR",
-                                           len(artist_ids))
-                request += " AND "
-                request += make_subrequest("album_genres.genre_id=?",
-                                           "OR",
-                                           len(genre_ids))
-                if not skipped:
-                    request += " AND not albums.loved & ?"
-                    filters += (LovedFlags.SKIPPED,)
-                request += order
-                result = sql.execute(request, filters)
+            if genre_ids:
+                request += " AND EXISTS (SELECT 1 FROM album_genres\
+                             WHERE album_genres.album_id=albums.rowid\
+                             AND %s)" % make_in_subrequest(
+                                "album_genres.genre_id")
+                filters += (get_sql_ids(genre_ids),)
+            if not skipped:
+                request += " AND not albums.loved & ?"
+                filters += (LovedFlags.SKIPPED,)
+            request += order
+            result = sql.execute(request, filters)
             return list(itertools.chain(*result))
 
     def get_compilation_ids(self, genre_ids, storage_type, skipped=False):
@@ -1195,53 +1228,16 @@ class AlbumsDatabase:
         """
         genre_ids = remove_static(genre_ids)
         artist_ids = remove_static(artist_ids)
-        request = "SELECT SUM(duration) FROM ("
         with SqlCursor(self.__db) as sql:
-            if genre_ids and artist_ids:
-                filters = (album_id,)
-                filters += tuple(genre_ids)
-                filters += tuple(artist_ids)
-                request += "SELECT duration\
-                           FROM tracks, track_genres, track_artists\
-                           WHERE tracks.album_id=?\
-                           AND track_genres.track_id = tracks.rowid\
-                           AND track_artists.track_id = tracks.rowid AND"
-                request += make_subrequest("track_genres.genre_id=?",
-                                           "OR",
-                                           len(genre_ids))
-                request += " AND "
-                request += make_subrequest("track_artists.artist_id=?",
-                                           "OR",
-                                           len(artist_ids))
-            elif artist_ids:
-                filters = (album_id,)
-                filters += tuple(artist_ids)
-                request += "SELECT duration\
-                           FROM tracks, track_artists\
-                           WHERE tracks.album_id=?\
-                           AND track_artists.track_id = tracks.rowid AND"
-                request += make_subrequest("track_artists.artist_id=?",
-                                           "OR",
-                                           len(artist_ids))
-            elif genre_ids:
-                filters = (album_id,)
-                filters += tuple(genre_ids)
-                request += "SELECT duration\
-                           FROM tracks, track_genres\
-                           WHERE tracks.album_id=?\
-                           AND track_genres.track_id = tracks.rowid AND"
-                request += make_subrequest("track_genres.genre_id=?",
-                                           "OR",
-                                           len(genre_ids))
-            else:
-                filters = (album_id,)
-                request += "SELECT duration\
-                           FROM tracks\
-                           WHERE tracks.album_id=?"
+            filters = (album_id,)
+            request = "SELECT SUM(duration) FROM tracks WHERE album_id=?"
+            (subrequest, subfilters) = self.__get_tracks_filter(genre_ids,
+                                                                artist_ids)
+            request += subrequest
+            filters += subfilters
             if disc_number is not None:
                 filters += (disc_number,)
                 request += " AND discnumber=?"
-            request += " GROUP BY tracks.id)"
             result = sql.execute(request, filters)
             v = result.fetchone()
             if v and v[0] is not None:
@@ -1290,12 +1286,22 @@ class AlbumsDatabase:
             @return album ids as [int]
         """
         with SqlCursor(self.__db) as sql:
-            filters = ("%" + searched + "%", storage_type)
+            # Index assisted prefix lookup first
+            (start, end) = get_prefix_range(searched)
+            filters = (start, end, storage_type)
             request = "SELECT rowid, name FROM albums\
-                       WHERE noaccents(name) LIKE ?\
+                       WHERE searchname>=? AND searchname<?\
                        AND albums.storage_type & ? LIMIT 25"
-            result = sql.execute(request, filters)
-            return list(result)
+            items = list(sql.execute(request, filters))
+            if len(items) < 25:
+                filters = ("%" + searched + "%", start, end,
+                           storage_type, 25 - len(items))
+                request = "SELECT rowid, name FROM albums\
+                           WHERE searchname LIKE ?\
+                           AND NOT (searchname>=? AND searchname<?)\
+                           AND albums.storage_type & ? LIMIT ?"
+                items += list(sql.execute(request, filters))
+            return items
 
     def calculate_artist_ids(self, album_id, disable_compilations):
         """
@@ -1352,33 +1358,46 @@ class AlbumsDatabase:
                 return v[0]
             return 0
 
-    def clean(self, commit=True):
+    def clean(self, commit=True, album_ids=None):
         """
             Clean albums
             @param commit as bool
+            @param album_ids as [int]/None => only check these albums
         """
+        if album_ids is not None and not album_ids:
+            return
         storage_type = StorageType.EPHEMERAL |\
             StorageType.COLLECTION | StorageType.EXTERNAL
+        requests = [("DELETE FROM albums WHERE\
+                      albums.storage_type&%s AND NOT EXISTS (\
+                        SELECT 1 FROM tracks\
+                        WHERE tracks.album_id=albums.rowid)" % storage_type,
+                     "albums.rowid")]
+        for table in ["album_genres", "album_artists",
+                      "albums_timed_popularity"]:
+            requests.append(("DELETE FROM %s WHERE NOT EXISTS (\
+                                SELECT 1 FROM albums\
+                                WHERE albums.rowid=%s.album_id)" %
+                             (table, table), "%s.album_id" % table))
+        requests.append(("DELETE FROM album_stats WHERE NOT EXISTS (\
+                            SELECT 1 FROM tracks\
+                            WHERE tracks.album_id=album_stats.album_id)",
+                         "album_stats.album_id"))
         with SqlCursor(self.__db, commit) as sql:
-            sql.execute("DELETE FROM albums WHERE\
-                         albums.storage_type&? AND\
-                         albums.rowid NOT IN (\
-                            SELECT tracks.album_id FROM tracks)",
-                        (storage_type,))
-            sql.execute("DELETE FROM album_genres\
-                         WHERE album_genres.album_id NOT IN (\
-                            SELECT albums.rowid FROM albums)")
-            sql.execute("DELETE FROM album_artists\
-                         WHERE album_artists.album_id NOT IN (\
-                            SELECT albums.rowid FROM albums)")
-            sql.execute("DELETE FROM albums_timed_popularity\
-                         WHERE albums_timed_popularity.album_id NOT IN (\
-                            SELECT albums.rowid FROM albums)")
-            # We clear timed popularity based on mtime
-            # For now, we don't need to keep more data than a month
-            month = int(time()) - 2678400
-            sql.execute("DELETE FROM albums_timed_popularity\
-                         WHERE albums_timed_popularity.mtime < ?", (month,))
+            for (request, column) in requests:
+                if album_ids is None:
+                    sql.execute(request)
+                else:
+                    sql.execute(request + " AND " +
+                                make_in_subrequest(column),
+                                (get_sql_ids(album_ids),))
+            if album_ids is None:
+                # We clear timed popularity based on mtime
+                # For now, we don't need to keep more data than a month
+                month = int(time()) - 2678400
+                sql.execute("DELETE FROM albums_timed_popularity\
+                             WHERE albums_timed_popularity.mtime < ?",
+                            (month,))
 
     @property
     def max_count(self):
@@ -1392,16 +1411,78 @@ class AlbumsDatabase:
             Update MAX(COUNT(tracks)) for albums
         """
         with SqlCursor(self.__db) as sql:
-            result = sql.execute("SELECT MAX(num_tracks)\
-                                  FROM (SELECT COUNT(t.rowid)\
-                                  AS num_tracks FROM albums\
-                                  INNER JOIN tracks t\
-                                  ON albums.rowid=t.album_id\
-                                  GROUP BY albums.rowid)")
+            result = sql.execute("SELECT MAX(tracks_count) FROM album_stats")
             v = result.fetchone()
             if v and v[0] is not None:
                 self.__max_count = v[0]
 
+    def get_stats(self, album_id):
+        """
+            Get album aggregates
+            @param album_id as int
+            @return (duration as int, tracks count as int, discs as [int],
+                     min year as int, max year as int)/None
+        """
+        with SqlCursor(self.__db) as sql:
+            result = sql.execute("SELECT duration, tracks_count, discs,\
+                                  min_year, max_year\
+                                  FROM album_stats WHERE album_id=?",
+                                 (album_id,))
+            v = result.fetchone()
+            if v is not None:
+                discs = sorted([disc for disc in json.loads(v[2])
+                                if disc is not None])
+                return (v[0], v[1], discs, v[3], v[4])
+            return None
+
+    def update_stats(self, album_ids):
+        """
+            Update aggregates for albums, needed after tracks changes
+            @param album_ids as [int]
+            @warning: commit needed
+        """
+        ids = (get_sql_ids(album_ids),)
+        with SqlCursor(self.__db, True) as sql:
+            sql.execute("DELETE FROM album_stats WHERE %s" %
+                        make_in_subrequest("album_id"), ids)
+            sql.execute(self.__STATS_REQUEST % (
+                        "WHERE " + make_in_subrequest("album_id")), ids)
+            result = sql.execute("SELECT MAX(tracks_count) FROM album_stats\
+                                  WHERE %s" % make_in_subrequest("album_id"),
+                                 ids)
+            v = result.fetchone()
+            if v and v[0] is not None and v[0] > self.__max_count:
+                self.__max_count = v[0]
+
+    def rebuild_stats(self):
+        """
+            Rebuild aggregates for all albums
+        """
+        with SqlCursor(self.__db, True) as sql:
+            sql.execute("DELETE FROM album_stats")
+            sql.execute(self.__STATS_REQUEST % "")
+
 #######################
 # PRIVATE             #
 #######################
+    def __get_tracks_filter(self, genre_ids, artist_ids):
+        """
+            Get subrequest restricting tracks to genres and artists
+            @param genre_ids as [int]
+            @param artist_ids as [int]
+            @return (str, tuple) => (subrequest, filters)
+        """
+        request = ""
+        filters = ()
+        if genre_ids:
+            request += " AND EXISTS (SELECT 1 FROM track_genres\
+                         WHERE track_genres.track_id=tracks.rowid\
+                         AND %s)" % make_in_subrequest("track_genres.genre_id")
+            filters += (get_sql_ids(genre_ids),)
+        if artist_ids:
+            request += " AND EXISTS (SELECT 1 FROM track_artists\
+                         WHERE track_artists.track_id=tracks.rowid\
+                         AND %s)" % make_in_subrequest(
+                            "track_artists.artist_id")
+            filters += (get_sql_ids(artist_ids),)
+        return (request, filters)
@@ -16,13 +16,26 @@ import itertools
 from lollypop.sqlcursor import SqlCursor
 from lollypop.define import App, Type, StorageType, OrderBy, LovedFlags
 from lollypop.utils import get_default_storage_type, make_subrequest
-from lollypop.utils import format_artist_name, remove_static
+from lollypop.utils import format_artist_name, remove_static, noaccents
+from lollypop.utils import get_prefix_range, make_in_subrequest, get_sql_ids
+from lollypop.localized import get_sort_keys
 
 
 class ArtistsDatabase:
     """
         Artists database helper
     """
+    # Track artists not in album artists
+    __FEATURING_REQUEST = """INSERT INTO featuring (artist_id, album_id)
+                             SELECT DISTINCT track_artists.artist_id,
+                                             tracks.album_id
+                             FROM tracks, track_artists
+                             WHERE track_artists.track_id = tracks.rowid
+                             AND NOT EXISTS (
+                              SELECT * FROM album_artists WHERE
+                              album_artists.album_id = tracks.album_id AND
+                              album_artists.artist_id =
+                                track_artists.artist_id)"""
 
     def __init__(self, db):
         """
@@ -43,10 +56,12 @@ class ArtistsDatabase:
         if sortname == "":
             sortname = format_artist_name(name)
         with SqlCursor(self.__db, True) as sql:
-            result = sql.execute("INSERT INTO artists (name, sortname,\
-                                  mb_artist_id)\
-                                  VALUES (?, ?, ?)",
-                                 (name, sortname, mb_artist_id))
+            result = sql.execute("INSERT INTO artists (name, searchname,\
+                                  sortname, sortindex, sortkey, mb_artist_id)\
+                                  VALUES (?, ?, ?, ?, ?, ?)",
+                                 (name, noaccents(name), sortname) +
+                                 get_sort_keys(sortname) +
+                                 (mb_artist_id,))
             return result.lastrowid
 
     def set_sortname(self, artist_id, sort_name):
@@ -58,9 +73,10 @@ class ArtistsDatabase:
         """
         with SqlCursor(self.__db, True) as sql:
             sql.execute("UPDATE artists\
-                         SET sortname=?\
+                         SET sortname=?, sortindex=?, sortkey=?\
                          WHERE rowid=?",
-                        (sort_name, artist_id))
+                        (sort_name,) + get_sort_keys(sort_name) +
+                        (artist_id,))
 
     def get_sortname(self, artist_id):
         """
@@ -111,6 +127,16 @@ class ArtistsDatabase:
                 return v[0]
             return None
 
+    def get_lookup_rows(self):
+        """
+            Get rows needed to resolve artist ids while scanning
+            @return [(int, str, str, str)]: id, name, sortname, mbid
+        """
+        with SqlCursor(self.__db) as sql:
+            result = sql.execute("SELECT rowid, name, sortname, mb_artist_id\
+                                  FROM artists ORDER BY rowid")
+            return list(result)
+
     def get_name(self, artist_id):
         """
             Get artist name
@@ -142,9 +168,9 @@ class ArtistsDatabase:
         """
         with SqlCursor(self.__db, True) as sql:
             sql.execute("UPDATE artists\
-                         SET name=?\
+                         SET name=?, searchname=?\
                          WHERE rowid=?",
-                        (name, artist_id))
+                        (name, noaccents(name), artist_id))
 
     def set_mb_artist_id(self, artist_id, mb_artist_id):
         """
@@ -209,8 +235,8 @@ class ArtistsDatabase:
                                   WHERE album_artists.artist_id=artists.rowid\
                                   AND album_artists.album_id=albums.rowid\
                                   AND albums.storage_type & ?\
-                                  ORDER BY artists.sortname\
-                                  COLLATE NOCASE COLLATE LOCALIZED" % select,
+                                  ORDER BY artists.sortindex,\
+                                           artists.sortkey" % select,
                     (storage_type,))
             else:
                 filters = (storage_type,)
@@ -224,8 +250,7 @@ class ArtistsDatabase:
                 request += make_subrequest("album_genres.genre_id=?",
                                            "OR",
                                            len(genre_ids))
-                request += " ORDER BY artists.sortname\
-                            COLLATE NOCASE COLLATE LOCALIZED"
+                request += " ORDER BY artists.sortindex, artists.sortkey"
                 result = sql.execute(request % select, filters)
             return [(row[0], row[1], row[2]) for row in result]
 
@@ -244,8 +269,7 @@ class ArtistsDatabase:
                                   AND album_artists.album_id=albums.rowid\
                                   AND albums.storage_type & ?\
                                   AND not albums.loved & ?\
-                                  ORDER BY random() LIMIT ?\
-                                  COLLATE NOCASE COLLATE LOCALIZED"
+                                  ORDER BY random() LIMIT ?"
             result = sql.execute(
                 request, (storage_type, LovedFlags.SKIPPED, limit))
             return [(row[0], row[1], row[2]) for row in result]
@@ -267,8 +291,7 @@ class ArtistsDatabase:
                                   WHERE album_artists.artist_id=artists.rowid\
                                   AND album_artists.album_id=albums.rowid\
                                   AND albums.storage_type & ?\
-                                  ORDER BY artists.sortname\
-                                  COLLATE NOCASE COLLATE LOCALIZED",
+                                  ORDER BY artists.sortindex, artists.sortkey",
                     (storage_type,))
             else:
                 filters = (storage_type,)
@@ -282,8 +305,7 @@ class ArtistsDatabase:
                 request += make_subrequest("album_genres.genre_id=?",
                                            "OR",
                                            len(genre_ids))
-                request += " ORDER BY artists.sortname\
-                            COLLATE NOCASE COLLATE LOCALIZED"
+                request += " ORDER BY artists.sortindex, artists.sortkey"
                 result = sql.execute(request, filters)
             return list(itertools.chain(*result))
 
@@ -308,23 +330,27 @@ class ArtistsDatabase:
             result = sql.execute(request, filters)
             return list(itertools.chain(*result))
 
-    def update_featuring(self):
+    def update_featuring(self, album_ids):
+        """
+            Calculate featuring for albums
+            @param album_ids as [int]
+        """
+        if not album_ids:
+            return
+        ids = (get_sql_ids(album_ids),)
+        with SqlCursor(self.__db, True) as sql:
+            sql.execute("DELETE FROM featuring WHERE %s" %
+                        make_in_subrequest("album_id"), ids)
+            sql.execute(self.__FEATURING_REQUEST + " AND %s" %
+                        make_in_subrequest("tracks.album_id"), ids)
+
+    def rebuild_featuring(self):
         """
             Calculate featuring for current DB
         """
         with SqlCursor(self.__db, True) as sql:
             sql.execute("DELETE FROM featuring")
-            result = sql.execute(
-                        "SELECT track_artists.artist_id, tracks.album_id\
-                         FROM tracks, track_artists\
-                         WHERE track_artists.track_id = tracks.rowid\
-                         AND NOT EXISTS (\
-                          SELECT * FROM album_artists WHERE\
-                          album_artists.album_id = tracks.album_id AND\
-                          album_artists.artist_id = track_artists.artist_id)")
-            for (artist_id, album_id) in result:
-                sql.execute("INSERT INTO featuring (artist_id, album_id)\
-                             VALUES (?, ?)", (artist_id, album_id))
+            sql.execute(self.__FEATURING_REQUEST)
 
     def get_featured(self, genre_ids, artist_ids, storage_type, skipped):
         """
@@ -336,31 +362,23 @@ class ArtistsDatabase:
         """
         orderby = App().settings.get_enum("orderby")
         if orderby == OrderBy.ARTIST_YEAR:
-            order = " ORDER BY artists.sortname\
-                     COLLATE NOCASE COLLATE LOCALIZED,\
+            order = " ORDER BY artists.sortindex, artists.sortkey,\
                      albums.timestamp,\
-                     albums.name\
-                     COLLATE NOCASE COLLATE LOCALIZED"
+                     albums.sortindex, albums.sortkey"
         elif orderby == OrderBy.ARTIST_TITLE:
-            order = " ORDER BY artists.sortname\
-                     COLLATE NOCASE COLLATE LOCALIZED,\
-                     albums.name\
-                     COLLATE NOCASE COLLATE LOCALIZED"
+            order = " ORDER BY artists.sortindex, artists.sortkey,\
+                     albums.sortindex, albums.sortkey"
         elif orderby == OrderBy.TITLE:
-            order = " ORDER BY albums.name\
-                     COLLATE NOCASE COLLATE LOCALIZED"
+            order = " ORDER BY albums.sortindex, albums.sortkey"
         elif orderby == OrderBy.YEAR_DESC:
             order = " ORDER BY albums.timestamp DESC,\
-                     albums.name\
-                     COLLATE NOCASE COLLATE LOCALIZED"
+                     albums.sortindex, albums.sortkey"
         elif orderby == OrderBy.YEAR_ASC:
             order = " ORDER BY albums.timestamp ASC,\
-                     albums.name\
-                     COLLATE NOCASE COLLATE LOCALIZED"
+                     albums.sortindex, albums.sortkey"
         else:
             order = " ORDER BY albums.popularity DESC,\
-                     albums.name\
-                     COLLATE NOCASE COLLATE LOCALIZED"
+                     albums.sortindex, albums.sortkey"
         with SqlCursor(self.__db) as sql:
             request = "SELECT DISTINCT featuring.album_id\
                        FROM featuring, album_genres, albums, artists\
@@ -407,15 +425,26 @@ class ArtistsDatabase:
             @return artist ids as [int]
         """
         with SqlCursor(self.__db) as sql:
-            filters = ("%" + searched + "%", storage_type)
             request = "SELECT DISTINCT artists.rowid, artists.name\
                    FROM albums, album_artists, artists\
                    WHERE album_artists.artist_id=artists.rowid AND\
-                   album_artists.album_id=albums.rowid AND\
-                   noaccents(artists.name) LIKE ? AND\
-                   albums.storage_type & ? LIMIT 25"
-            result = sql.execute(request, filters)
-            return list(result)
+                   album_artists.album_id=albums.rowid AND %s AND\
+                   albums.storage_type & ? LIMIT ?"
+            # Index assisted prefix lookup first
+            (start, end) = get_prefix_range(searched)
+            filters = (start, end, storage_type, 25)
+            items = list(sql.execute(
+                request % "artists.searchname>=? AND artists.searchname<?",
+                filters))
+            if len(items) < 25:
+                filters = ("%" + searched + "%", start, end,
+                           storage_type, 25 - len(items))
+                items += list(sql.execute(
+                    request % "artists.searchname LIKE ? AND NOT\
+                               (artists.searchname>=? AND\
+                                artists.searchname<?)",
+                    filters))
+            return items
 
     def count(self):
         """
@@ -434,14 +463,22 @@ class ArtistsDatabase:
                 return v[0]
             return 0
 
-    def clean(self, commit=True):
+    def clean(self, commit=True, artist_ids=None):
         """
             Clean artists
             @param commit as bool
-        """
+            @param artist_ids as [int]/None => only check these artists
+        """
+        request = "DELETE FROM artists WHERE NOT EXISTS (\
+                    SELECT 1 FROM album_artists\
+                    WHERE album_artists.artist_id=artists.rowid)\
+                   AND NOT EXISTS (\
+                    SELECT 1 FROM track_artists\
+                    WHERE track_artists.artist_id=artists.rowid)"
         with SqlCursor(self.__db, commit) as sql:
-            sql.execute("DELETE FROM artists WHERE artists.rowid NOT IN (\
-                            SELECT album_artists.artist_id\
-                            FROM album_artists) AND artists.rowid NOT IN (\
-                                SELECT track_artists.artist_id\
-                                FROM track_artists)")
+            if artist_ids is None:
+                sql.execute(request)
+            elif artist_ids:
+                sql.execute(request + " AND " +
+                            make_in_subrequest("artists.rowid"),
+                            (get_sql_ids(artist_ids),))
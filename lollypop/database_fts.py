@@ -0,0 +1,248 @@
+# Copyright (c) 2014-2021 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import itertools
+
+from lollypop.sqlcursor import SqlCursor
+from lollypop.logger import Logger
+from lollypop.utils import noaccents, get_sql_ids
+
+
+class FtsDatabase:
+    """
+        Full text index over albums, artists and tracks
+        Index rowids are albums/artists/tracks rowids
+        Needs SQLite FTS5, search returns nothing if not available
+    """
+
+    __create_fts_albums = """CREATE VIRTUAL TABLE fts_albums USING fts5(
+                                name, artists, genres,
+                                tokenize='unicode61 remove_diacritics 1')"""
+    __create_fts_artists = """CREATE VIRTUAL TABLE fts_artists USING fts5(
+                                name,
+                                tokenize='unicode61 remove_diacritics 1')"""
+    __create_fts_tracks = """CREATE VIRTUAL TABLE fts_tracks USING fts5(
+                                name, artists, genres,
+                                tokenize='unicode61 remove_diacritics 1')"""
+    __insert_albums = """INSERT INTO fts_albums(rowid, name, artists, genres)
+                         SELECT albums.rowid, albums.name,
+                            (SELECT group_concat(artists.name, ' ')
+                             FROM album_artists, artists
+                             WHERE album_artists.album_id=albums.rowid
+                             AND artists.rowid=album_artists.artist_id),
+                            (SELECT group_concat(genres.name, ' ')
+                             FROM album_genres, genres
+                             WHERE album_genres.album_id=albums.rowid
+                             AND genres.rowid=album_genres.genre_id)
+                         FROM albums"""
+    __insert_tracks = """INSERT INTO fts_tracks(rowid, name, artists, genres)
+                         SELECT tracks.rowid, tracks.name,
+                            (SELECT group_concat(artists.name, ' ')
+                             FROM track_artists, artists
+                             WHERE track_artists.track_id=tracks.rowid
+                             AND artists.rowid=track_artists.artist_id),
+                            (SELECT group_concat(genres.name, ' ')
+                             FROM track_genres, genres
+                             WHERE track_genres.track_id=tracks.rowid
+                             AND genres.rowid=track_genres.genre_id)
+                         FROM tracks"""
+    # Column weights for bm25(): name, artists, genres
+    __WEIGHTS = "10.0, 5.0, 1.0"
+
+    def __init__(self, db):
+        """
+            Init fts database object
+            @param db as Database
+        """
+        self.__db = db
+        self.__available = None
+
+    def create(self):
+        """
+            Create index and populate it
+        """
+        try:
+            with SqlCursor(self.__db, True) as sql:
+                sql.execute(self.__create_fts_albums)
+                sql.execute(self.__create_fts_artists)
+                sql.execute(self.__create_fts_tracks)
+            self.__available = None
+            self.rebuild()
+        except Exception as e:
+            Logger.warning("FtsDatabase::create(): %s", e)
+
+    def rebuild(self):
+        """
+            Rebuild whole index
+        """
+        if not self.available:
+            return
+        with SqlCursor(self.__db, True) as sql:
+            sql.execute("DELETE FROM fts_albums")
+            sql.execute("DELETE FROM fts_tracks")
+            sql.execute(self.__insert_albums)
+            sql.execute(self.__insert_tracks)
+        self.update_artists()
+
+    def update_albums(self, album_ids):
+        """
+            Update index for albums and their tracks
+            @param album_ids as [int]
+        """
+        if not self.available or not album_ids:
+            return
+        with SqlCursor(self.__db, True) as sql:
+            # One parameter whatever ids count
+            ids = (get_sql_ids(album_ids),)
+            subrequest = "SELECT value FROM json_each(?)"
+            sql.execute("DELETE FROM fts_albums\
+                         WHERE rowid IN (%s)" % subrequest, ids)
+            sql.execute("DELETE FROM fts_tracks WHERE rowid IN (\
+                            SELECT rowid FROM tracks\
+                            WHERE album_id IN (%s))" % subrequest, ids)
+            sql.execute(self.__insert_albums +
+                        " WHERE albums.rowid IN (%s)" % subrequest, ids)
+            sql.execute(self.__insert_tracks +
+                        " WHERE tracks.album_id IN (%s)" % subrequest, ids)
+
+    def update_artists(self, artist_ids=None):
+        """
+            Update index for artists, artists may have been renamed
+            @param artist_ids as [int]/None => all artists
+        """
+        if not self.available:
+            return
+        with SqlCursor(self.__db, True) as sql:
+            if artist_ids is None:
+                sql.execute("DELETE FROM fts_artists")
+                sql.execute("INSERT INTO fts_artists(rowid, name)\
+                             SELECT rowid, name FROM artists")
+                return
+            ids = (get_sql_ids(artist_ids),)
+            subrequest = "SELECT value FROM json_each(?)"
+            sql.execute("DELETE FROM fts_artists\
+                         WHERE rowid IN (%s)" % subrequest, ids)
+            sql.execute("INSERT INTO fts_artists(rowid, name)\
+                         SELECT rowid, name FROM artists\
+                         WHERE rowid IN (%s)" % subrequest, ids)
+
+    def clean(self, commit=True):
+        """
+            Remove removed albums/artists/tracks from index
+            @param commit as bool
+        """
+        if not self.available:
+            return
+        with SqlCursor(self.__db, commit) as sql:
+            sql.execute("DELETE FROM fts_albums WHERE rowid NOT IN (\
+                            SELECT rowid FROM albums)")
+            sql.execute("DELETE FROM fts_tracks WHERE rowid NOT IN (\
+                            SELECT rowid FROM tracks)")
+            sql.execute("DELETE FROM fts_artists WHERE rowid NOT IN (\
+                            SELECT rowid FROM artists)")
+
+    def search_albums(self, searched, storage_type, limit=25):
+        """
+            Search albums matching all words, best matches first
+            @param searched as str
+            @param storage_type as StorageType
+            @param limit as int
+            @return album ids as [int]
+        """
+        match = self.__get_match(searched)
+        if match is None:
+            return []
+        with SqlCursor(self.__db) as sql:
+            request = "SELECT albums.rowid FROM fts_albums, albums\
+                       WHERE fts_albums MATCH ?\
+                       AND albums.rowid=fts_albums.rowid\
+                       AND albums.storage_type & ?\
+                       ORDER BY bm25(fts_albums, %s) LIMIT ?" %\
+                self.__WEIGHTS
+            result = sql.execute(request, (match, storage_type, limit))
+            return list(itertools.chain(*result))
+
+    def search_artists(self, searched, storage_type, limit=25):
+        """
+            Search album artists matching all words, best matches first
+            @param searched as str
+            @param storage_type as StorageType
+            @param limit as int
+            @return artist ids as [int]
+        """
+        match = self.__get_match(searched)
+        if match is None:
+            return []
+        with SqlCursor(self.__db) as sql:
+            request = "SELECT artists.rowid FROM fts_artists, artists\
+                       WHERE fts_artists MATCH ?\
+                       AND artists.rowid=fts_artists.rowid\
+                       AND EXISTS (\
+                            SELECT 1 FROM album_artists, albums\
+                            WHERE album_artists.artist_id=artists.rowid\
+                            AND albums.rowid=album_artists.album_id\
+                            AND albums.storage_type & ?)\
+                       ORDER BY bm25(fts_artists) LIMIT ?"
+            result = sql.execute(request, (match, storage_type, limit))
+            return list(itertools.chain(*result))
+
+    def search_tracks(self, searched, storage_type, limit=25):
+        """
+            Search tracks matching all words, best matches first
+            @param searched as str
+            @param storage_type as StorageType
+            @param limit as int
+            @return track ids as [int]
+        """
+        match = self.__get_match(searched)
+        if match is None:
+            return []
+        with SqlCursor(self.__db) as sql:
+            request = "SELECT tracks.rowid FROM fts_tracks, tracks\
+                       WHERE fts_tracks MATCH ?\
+                       AND tracks.rowid=fts_tracks.rowid\
+                       AND tracks.storage_type & ?\
+                       ORDER BY bm25(fts_tracks, %s) LIMIT ?" %\
+                self.__WEIGHTS
+            result = sql.execute(request, (match, storage_type, limit))
+            return list(itertools.chain(*result))
+
+    @property
+    def available(self):
+        """
+            True if index is available
+            @return bool
+        """
+        if self.__available is None:
+            with SqlCursor(self.__db) as sql:
+                result = sql.execute("SELECT COUNT(*) FROM sqlite_master\
+                                      WHERE type='table'\
+                                      AND name='fts_tracks'")
+                v = result.fetchone()
+                self.__available = v is not None and v[0] == 1
+        return self.__available
+
+#######################
+# PRIVATE             #
+#######################
+    def __get_match(self, searched):
+        """
+            Get FTS5 query: all words as prefixes
+            @param searched as str
+            @return str/None
+        """
+        words = noaccents(searched).split()
+        if not words:
+            return None
+        # Quote words, FTS5 syntax chars are then plain text
+        return " ".join(['"%s"*' % word.replace('"', '""')
+                         for word in words])
@@ -15,6 +15,8 @@ import itertools
 from lollypop.sqlcursor import SqlCursor
 from lollypop.define import App, Type, OrderBy, LovedFlags
 from lollypop.utils import get_network_available, sql_escape
+from lollypop.utils import make_in_subrequest, get_sql_ids
+from lollypop.localized import get_sort_keys
 
 
 class GenresDatabase:
@@ -37,8 +39,10 @@ class GenresDatabase:
             @warning: commit needed
         """
         with SqlCursor(self.__db, True) as sql:
-            result = sql.execute("INSERT INTO genres (name) VALUES (?)",
-                                 (name,))
+            result = sql.execute("INSERT INTO genres\
+                                  (name, sortindex, sortkey)\
+                                  VALUES (?, ?, ?)",
+                                 (name,) + get_sort_keys(name))
             return result.lastrowid
 
     def get_id(self, name):
@@ -58,6 +62,16 @@ class GenresDatabase:
                 return v[0]
             return None
 
+    def get_lookup_rows(self):
+        """
+            Get rows needed to resolve genre ids while scanning
+            @return [(int, str)]: id, name
+        """
+        with SqlCursor(self.__db) as sql:
+            result = sql.execute("SELECT rowid, name FROM genres\
+                                  ORDER BY rowid")
+            return list(result)
+
     def get_name(self, genre_id):
         """
             Get genre name for genre id
@@ -82,27 +96,20 @@ class GenresDatabase:
         orderby = App().settings.get_enum("orderby")
         order = " ORDER BY genres.name, "
         if orderby == OrderBy.ARTIST_YEAR:
-            order += " artists.sortname\
-                     COLLATE NOCASE COLLATE LOCALIZED,\
+            order += " artists.sortindex, artists.sortkey,\
                      albums.timestamp,\
-                     albums.name\
-                     COLLATE NOCASE COLLATE LOCALIZED"
+                     albums.sortindex, albums.sortkey"
         elif orderby == OrderBy.ARTIST_TITLE:
-            order += " artists.sortname\
-                     COLLATE NOCASE COLLATE LOCALIZED,\
-                     albums.name\
-                     COLLATE NOCASE COLLATE LOCALIZED"
+            order += " artists.sortindex, artists.sortkey,\
+                     albums.sortindex, albums.sortkey"
         elif orderby == OrderBy.NAME:
-            order += " albums.name\
-                     COLLATE NOCASE COLLATE LOCALIZED"
+            order += " albums.sortindex, albums.sortkey"
         elif orderby == OrderBy.YEAR_DESC:
             order += " albums.timestamp DESC,\
-                     albums.name\
-                     COLLATE NOCASE COLLATE LOCALIZED"
+                     albums.sortindex, albums.sortkey"
         else:
             order += " albums.popularity DESC,\
-                     albums.name\
-                     COLLATE NOCASE COLLATE LOCALIZED"
+                     albums.sortindex, albums.sortkey"
         with SqlCursor(self.__db) as sql:
             filters = ()
             request = "SELECT albums.rowid\
@@ -137,8 +144,7 @@ class GenresDatabase:
                                         album_artists.album_id AND\
                                         album_artists.artist_id != ? AND\
                                         album_genres.genre_id=genres.rowid)\
-                                  ORDER BY genres.name\
-                                  COLLATE NOCASE COLLATE LOCALIZED",
+                                  ORDER BY genres.sortindex, genres.sortkey",
                                  (Type.COMPILATIONS,))
             return list(result)
 
@@ -157,8 +163,7 @@ class GenresDatabase:
                                         album_artists.album_id AND\
                                         album_artists.artist_id != ? AND\
                                         album_genres.genre_id=genres.rowid)\
-                                  ORDER BY genres.name\
-                                  COLLATE NOCASE COLLATE LOCALIZED",
+                                  ORDER BY genres.sortindex, genres.sortkey",
                                  (Type.COMPILATIONS,))
             return list(itertools.chain(*result))
 
@@ -182,13 +187,22 @@ class GenresDatabase:
             genres = list(result)
             return genres[0] if genres else (None, "")
 
-    def clean(self, commit=True):
+    def clean(self, commit=True, genre_ids=None):
         """
             Clean genres
             @param commit as bool
-        """
+            @param genre_ids as [int]/None => only check these genres
+        """
+        request = "DELETE FROM genres WHERE (NOT EXISTS (\
+                    SELECT 1 FROM album_genres\
+                    WHERE album_genres.genre_id=genres.rowid)\
+                   OR NOT EXISTS (\
+                    SELECT 1 FROM track_genres\
+                    WHERE track_genres.genre_id=genres.rowid))"
         with SqlCursor(self.__db, commit) as sql:
-            sql.execute("DELETE FROM genres WHERE genres.rowid NOT IN (\
-                            SELECT album_genres.genre_id FROM album_genres)")
-            sql.execute("DELETE FROM genres WHERE genres.rowid NOT IN (\
-                            SELECT track_genres.genre_id FROM track_genres)")
+            if genre_ids is None:
+                sql.execute(request)
+            elif genre_ids:
+                sql.execute(request + " AND " +
+                            make_in_subrequest("genres.rowid"),
+                            (get_sql_ids(genre_ids),))
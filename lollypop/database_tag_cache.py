@@ -0,0 +1,125 @@
+# Copyright (c) 2014-2021 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from gi.repository import Gio
+
+import sqlite3
+from pickle import dumps, loads
+from threading import Lock
+
+from lollypop.define import LOLLYPOP_DATA_PATH
+from lollypop.sqlcursor import SqlCursor
+from lollypop.database import Database
+from lollypop.logger import Logger
+
+
+class TagCacheDatabase:
+    """
+        Cache of tags read from files, keyed by uri, size and mtime
+        Allows to rebuild collection database without reading files again
+    """
+    DB_PATH = "%s/tags_v1.db" % LOLLYPOP_DATA_PATH
+
+    __create_tags = """CREATE TABLE tags (
+                        uri TEXT PRIMARY KEY,
+                        size INT NOT NULL,
+                        mtime INT NOT NULL,
+                        advanced INT NOT NULL,
+                        tags BLOB NOT NULL)"""
+
+    def __init__(self):
+        """
+            Create database tables
+        """
+        self.thread_lock = Lock()
+        f = Gio.File.new_for_path(self.DB_PATH)
+        if not f.query_exists():
+            try:
+                d = Gio.File.new_for_path(LOLLYPOP_DATA_PATH)
+                if not d.query_exists():
+                    d.make_directory_with_parents()
+                # Create db schema
+                with SqlCursor(self, True) as sql:
+                    sql.execute(self.__create_tags)
+            except Exception as e:
+                Logger.error("TagCacheDatabase::__init__(): %s" % e)
+
+    def get(self, uri, size, mtime, advanced):
+        """
+            Get cached tags for file
+            @param uri as str
+            @param size as int
+            @param mtime as int
+            @param advanced as bool => advanced artists tags
+            @return TagReader.get_file_tags() result/None
+        """
+        try:
+            with SqlCursor(self) as sql:
+                result = sql.execute("SELECT tags FROM tags\
+                                      WHERE uri=? AND size=? AND mtime=?\
+                                      AND advanced=?",
+                                     (uri, size, mtime, advanced))
+                v = result.fetchone()
+                if v is not None:
+                    return loads(v[0])
+        except Exception as e:
+            Logger.error("TagCacheDatabase::get(): %s", e)
+        return None
+
+    def set(self, rows):
+        """
+            Add or update cached tags
+            @param rows as [(str, int, int, bool, tuple)]:
+                uri, size, mtime, advanced, TagReader.get_file_tags() result
+        """
+        try:
+            with SqlCursor(self, True) as sql:
+                sql.executemany("INSERT OR REPLACE INTO tags\
+                                 (uri, size, mtime, advanced, tags)\
+                                 VALUES (?, ?, ?, ?, ?)",
+                                [(uri, size, mtime, advanced, dumps(tags))
+                                 for (uri, size, mtime, advanced, tags)
+                                 in rows])
+        except Exception as e:
+            Logger.error("TagCacheDatabase::set(): %s", e)
+
+    def clean(self):
+        """
+            Remove files not in collection anymore
+        """
+        try:
+            with SqlCursor(self) as sql:
+                # Pooled connection, do not keep database attached
+                sql.execute('ATTACH DATABASE "%s" AS music' %
+                            Database.DB_PATH)
+                try:
+                    sql.execute("DELETE FROM tags WHERE uri NOT IN (\
+                                    SELECT tracks.uri FROM music.tracks)")
+                    # Database can not be detached in a transaction
+                    sql.commit()
+                finally:
+                    if sql.in_transaction:
+                        sql.rollback()
+                    sql.execute("DETACH DATABASE music")
+        except Exception as e:
+            Logger.error("TagCacheDatabase::clean(): %s", e)
+
+    def get_cursor(self):
+        """
+            Return a new sqlite cursor
+        """
+        try:
+            c = sqlite3.connect(self.DB_PATH, 600.0,
+                                check_same_thread=False)
+            return c
+        except:
+            exit(-1)
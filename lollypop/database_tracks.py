@@ -13,10 +13,13 @@
 
 from gettext import gettext as _
 import itertools
+import json
 
 from lollypop.sqlcursor import SqlCursor
-from lollypop.define import App, StorageType, Type, LovedFlags
-from lollypop.utils import noaccents, make_subrequest
+from lollypop.define import App, StorageType, Type, LovedFlags, FileType
+from lollypop.utils import noaccents, make_subrequest, get_sql_ids
+from lollypop.utils import get_prefix_range, make_in_subrequest
+from lollypop.utils_file import get_file_type
 
 
 class TracksDatabase:
@@ -34,7 +37,7 @@ class TracksDatabase:
 
     def add(self, name, uri, duration, tracknumber, discnumber, discname,
             album_id, year, timestamp, popularity, rate, loved, ltime, mtime,
-            mb_track_id, lp_track_id, bpm, storage_type):
+            mb_track_id, lp_track_id, bpm, storage_type, fingerprint=None):
         """
             Add a new track to database
             @param name as string
@@ -54,22 +57,71 @@ class TracksDatabase:
             @param mb_track_id as str
             @param lp_track_id as str
             @param bpm as double
+            @param storage_type as StorageType
+            @param fingerprint as str
             @return inserted rowid as int
             @warning: commit needed
         """
         with SqlCursor(self.__db, True) as sql:
             result = sql.execute(
-                "INSERT INTO tracks (name, uri, duration, tracknumber,\
-                discnumber, discname, album_id,\
+                "INSERT INTO tracks (name, searchname, uri, duration,\
+                tracknumber, discnumber, discname, album_id,\
                 year, timestamp, popularity, rate, loved,\
-                ltime, mtime, mb_track_id, lp_track_id, bpm, storage_type)\
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-                (name, uri, duration, tracknumber, discnumber,
+                ltime, mtime, mb_track_id, lp_track_id, bpm, storage_type,\
+                fingerprint)\
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?,\
+                        ?, ?)",
+                (name, noaccents(name), uri, duration, tracknumber, discnumber,
                  discname, album_id, year, timestamp, popularity,
                  rate, loved, ltime, mtime, mb_track_id, lp_track_id,
-                 bpm, storage_type))
+                 bpm, storage_type, fingerprint))
             return result.lastrowid
 
+    def add_many(self, tracks):
+        """
+            Add new tracks to database
+            @param tracks as [tuple] => add() params
+            @return {uri: track id}
+            @warning: commit needed
+        """
+        with SqlCursor(self.__db, True) as sql:
+            sql.executemany(
+                "INSERT INTO tracks (name, searchname, uri, duration,\
+                tracknumber, discnumber, discname, album_id,\
+                year, timestamp, popularity, rate, loved,\
+                ltime, mtime, mb_track_id, lp_track_id, bpm, storage_type,\
+                fingerprint)\
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?,\
+                        ?, ?)",
+                [(track[0], noaccents(track[0])) + tuple(track[1:])
+                 for track in tracks])
+            # Newest track wins if an uri is duplicated
+            uris = json.dumps([track[1] for track in tracks])
+            result = sql.execute("SELECT uri, rowid FROM tracks\
+                                  WHERE %s ORDER BY rowid" %
+                                 make_in_subrequest("uri"), (uris,))
+            return dict(result)
+
+    def add_artists(self, track_artist_ids):
+        """
+            Add artists to new tracks
+            @param track_artist_ids as [(int, int)] => (track id, artist id)
+            @warning: commit needed
+        """
+        with SqlCursor(self.__db, True) as sql:
+            sql.executemany("INSERT INTO track_artists (track_id, artist_id)\
+                             VALUES (?, ?)", track_artist_ids)
+
+    def add_genres(self, track_genre_ids):
+        """
+            Add genres to new tracks
+            @param track_genre_ids as [(int, int)] => (track id, genre id)
+            @warning: commit needed
+        """
+        with SqlCursor(self.__db, True) as sql:
+            sql.executemany("INSERT INTO track_genres (track_id, genre_id)\
+                             VALUES (?, ?)", track_genre_ids)
+
     def add_artist(self, track_id, artist_id):
         """
             Add artist to track
@@ -125,8 +177,7 @@ class TracksDatabase:
         """
         with SqlCursor(self.__db) as sql:
             result = sql.execute("SELECT rowid\
-                                  FROM tracks WHERE noaccents(name)=?\
-                                  COLLATE NOCASE",
+                                  FROM tracks WHERE searchname=?",
                                  (noaccents(name),))
             return list(itertools.chain(*result))
 
@@ -276,6 +327,50 @@ class TracksDatabase:
                          WHERE rowid=?",
                         (uri, track_id))
 
+    def update_uris(self, tracks):
+        """
+            Set uri and fingerprint for tracks
+            @param tracks as [(str, str, str)]: (uri, fingerprint, old uri)
+            @warning: commit needed
+        """
+        with SqlCursor(self.__db, True) as sql:
+            sql.executemany("UPDATE tracks SET uri=?, fingerprint=?\
+                             WHERE uri=?", tracks)
+
+    def set_loudness(self, track_id, track_gain, track_peak):
+        """
+            Set track loudness
+            @param track_id as int
+            @param track_gain as float
+            @param track_peak as float
+        """
+        with SqlCursor(self.__db, True) as sql:
+            sql.execute("UPDATE tracks SET track_gain=?, track_peak=?\
+                         WHERE rowid=?",
+                        (track_gain, track_peak, track_id))
+
+    def set_loudness_failed(self, track_id):
+        """
+            Mark track loudness analysis as failed, track will not be
+            analyzed again until modified
+            @param track_id as int
+        """
+        with SqlCursor(self.__db, True) as sql:
+            sql.execute("UPDATE tracks SET loudness_failed=1\
+                         WHERE rowid=?", (track_id,))
+
+    def set_album_loudness(self, album_id, album_gain, album_peak):
+        """
+            Set album loudness for tracks
+            @param album_id as int
+            @param album_gain as float
+            @param album_peak as float
+        """
+        with SqlCursor(self.__db, True) as sql:
+            sql.execute("UPDATE tracks SET album_gain=?, album_peak=?\
+                         WHERE album_id=?",
+                        (album_gain, album_peak, album_id))
+
     def set_storage_type(self, track_id, storage_type):
         """
             Set storage type
@@ -406,6 +501,20 @@ class TracksDatabase:
                                  (album_id,))
             return list(itertools.chain(*result))
 
+    def get_album_artist_ids(self, album_id):
+        """
+            Get artist ids of album tracks
+            @param album_id as int
+            @return [int]
+        """
+        with SqlCursor(self.__db) as sql:
+            result = sql.execute("SELECT DISTINCT track_artists.artist_id\
+                                  FROM tracks, track_artists\
+                                  WHERE tracks.album_id=? AND\
+                                  track_artists.track_id=tracks.rowid",
+                                 (album_id,))
+            return list(itertools.chain(*result))
+
     def get_genre_ids(self, track_id):
         """
             Get genre ids
@@ -471,16 +580,88 @@ class TracksDatabase:
             sql.execute("DELETE FROM tracks WHERE storage_type & ?",
                         (StorageType.COLLECTION,))
 
+    def get_loudness(self, track_id):
+        """
+            Get track loudness
+            @param track_id as int
+            @return (float, float, float, float)/None:
+                    (track gain, track peak, album gain, album peak)
+        """
+        with SqlCursor(self.__db) as sql:
+            result = sql.execute("SELECT track_gain, track_peak,\
+                                  album_gain, album_peak\
+                                  FROM tracks WHERE rowid=? AND\
+                                  track_gain IS NOT NULL", (track_id,))
+            return result.fetchone()
+
+    def get_loudness_rows(self, album_id):
+        """
+            Get loudness for album tracks
+            @param album_id as int
+            @return [(int, str, int, float, float, float, float, bool)]:
+                    (track id, uri, duration, track gain, track peak,
+                     album gain, album peak, analysis failed)
+        """
+        with SqlCursor(self.__db) as sql:
+            result = sql.execute("SELECT rowid, uri, duration,\
+                                  track_gain, track_peak,\
+                                  album_gain, album_peak,\
+                                  loudness_failed\
+                                  FROM tracks WHERE album_id=?",
+                                 (album_id,))
+            return list(result)
+
+    def get_album_ids_without_loudness(self):
+        """
+            Get albums with local tracks not analyzed
+            @return [int]
+        """
+        with SqlCursor(self.__db) as sql:
+            result = sql.execute("SELECT DISTINCT album_id FROM tracks\
+                                  WHERE track_gain IS NULL AND\
+                                  NOT loudness_failed AND\
+                                  uri LIKE 'file://%' AND storage_type & ?",
+                                 (StorageType.COLLECTION,))
+            return list(itertools.chain(*result))
+
+    def get_fingerprints(self):
+        """
+            Get fingerprint for tracks
+            @return {uri as str: fingerprint as str/None}
+        """
+        with SqlCursor(self.__db) as sql:
+            result = sql.execute("SELECT uri, fingerprint\
+                                  FROM tracks WHERE storage_type & ?",
+                                 (StorageType.COLLECTION,))
+            return dict(result)
+
     def get_uris(self, uris_concerned=None):
         """
             Get all tracks uri
-            @param uris_concerned as [uri as str]
+            @param uris_concerned as [uri as str]: files or directories
             @return [str]
         """
         with SqlCursor(self.__db) as sql:
             uris = []
             if uris_concerned:
+                # Files are matched with uri index, one request for all
+                files = []
+                directories = []
                 for uri in uris_concerned:
+                    if get_file_type(uri) == FileType.AUDIO:
+                        files.append(uri)
+                    else:
+                        directories.append(uri)
+                if files:
+                    result = sql.execute("SELECT uri\
+                                          FROM tracks\
+                                          WHERE uri IN (\
+                                            SELECT value FROM json_each(?))\
+                                          AND storage_type & ?",
+                                         (json.dumps(files),
+                                          StorageType.COLLECTION))
+                    uris += list(itertools.chain(*result))
+                for uri in directories:
                     result = sql.execute("SELECT uri\
                                           FROM tracks\
                                           WHERE uri LIKE ? AND\
@@ -494,6 +675,87 @@ class TracksDatabase:
                 uris = list(itertools.chain(*result))
             return uris
 
+    def get_rows(self, track_ids):
+        """
+            Get tracks attributes, one query per table for all tracks
+            @param track_ids as [int]
+            @return {track_id: {attr: value}}
+        """
+        rows = {}
+        if not track_ids:
+            return rows
+        with SqlCursor(self.__db) as sql:
+            # One parameter whatever ids count
+            ids = get_sql_ids(track_ids)
+            subrequest = "SELECT value FROM json_each(?)"
+            result = sql.execute("SELECT tracks.rowid, tracks.name,\
+                                  tracks.uri, tracks.duration,\
+                                  tracks.tracknumber, tracks.discnumber,\
+                                  tracks.discname, tracks.album_id,\
+                                  tracks.year, tracks.timestamp,\
+                                  tracks.popularity, tracks.rate,\
+                                  tracks.loved, tracks.mtime,\
+                                  tracks.storage_type, tracks.mb_track_id,\
+                                  tracks.lp_track_id, albums.name\
+                                  FROM tracks\
+                                  LEFT JOIN albums\
+                                  ON albums.rowid=tracks.album_id\
+                                  WHERE tracks.rowid IN (%s)" % subrequest,
+                                 (ids,))
+            for v in result:
+                rows[v[0]] = {"name": v[1],
+                              "uri": v[2],
+                              "duration": v[3],
+                              "number": v[4],
+                              "discnumber": v[5],
+                              "discname": v[6],
+                              "album_id": v[7],
+                              "year": v[8] or None,
+                              "timestamp": v[9] or None,
+                              "popularity": v[10],
+                              "rate": v[11],
+                              "loved": v[12],
+                              "mtime": v[13],
+                              "storage_type": v[14],
+                              "mb_track_id": v[15],
+                              "lp_track_id": v[16] or "",
+                              "album_name": v[17] if v[17] is not None
+                              else _("Unknown"),
+                              "artist_ids": [],
+                              "artists": [],
+                              "mb_artist_ids": [],
+                              "genre_ids": [],
+                              "genres": []}
+            result = sql.execute("SELECT track_artists.track_id,\
+                                  track_artists.artist_id, artists.name,\
+                                  artists.mb_artist_id\
+                                  FROM track_artists\
+                                  LEFT JOIN artists\
+                                  ON artists.rowid=track_artists.artist_id\
+                                  WHERE track_artists.track_id IN (%s)" %
+                                 subrequest, (ids,))
+            for (track_id, artist_id, name, mb_artist_id) in result:
+                if track_id not in rows.keys():
+                    continue
+                rows[track_id]["artist_ids"].append(artist_id)
+                if name is not None:
+                    rows[track_id]["artists"].append(name)
+                    rows[track_id]["mb_artist_ids"].append(mb_artist_id)
+            result = sql.execute("SELECT track_genres.track_id,\
+                                  track_genres.genre_id, genres.name\
+                                  FROM track_genres\
+                                  LEFT JOIN genres\
+                                  ON genres.rowid=track_genres.genre_id\
+                                  WHERE track_genres.track_id IN (%s)" %
+                                 subrequest, (ids,))
+            for (track_id, genre_id, name) in result:
+                if track_id not in rows.keys():
+                    continue
+                rows[track_id]["genre_ids"].append(genre_id)
+                if name is not None:
+                    rows[track_id]["genres"].append(name)
+        return rows
+
     def get_number(self, track_id):
         """
             Get track position in album
@@ -933,11 +1195,9 @@ class TracksDatabase:
             @return discs [(int, int)]
         """
         with SqlCursor(self.__db) as sql:
-            order = " ORDER BY artists.sortname\
-                     COLLATE NOCASE COLLATE LOCALIZED,\
+            order = " ORDER BY artists.sortindex, artists.sortkey,\
                      tracks.timestamp,\
-                     albums.name\
-                     COLLATE NOCASE COLLATE LOCALIZED LIMIT ?"
+                     albums.sortindex, albums.sortkey LIMIT ?"
             request = "SELECT DISTINCT tracks.album_id,\
                        discnumber,\
                        discname,\
@@ -968,8 +1228,8 @@ class TracksDatabase:
             @return discs [(int, int)]
         """
         with SqlCursor(self.__db) as sql:
-            order = " ORDER BY albums.timestamp, albums.name\
-                     COLLATE NOCASE COLLATE LOCALIZED LIMIT ?"
+            order = " ORDER BY albums.timestamp,\
+                     albums.sortindex, albums.sortkey LIMIT ?"
             request = "SELECT DISTINCT tracks.album_id,\
                        discnumber,\
                        discname,\
@@ -1031,12 +1291,12 @@ class TracksDatabase:
             @param commit as bool
         """
         with SqlCursor(self.__db, commit) as sql:
-            sql.execute("DELETE FROM track_artists\
-                         WHERE track_artists.track_id NOT IN (\
-                            SELECT tracks.rowid FROM tracks)")
-            sql.execute("DELETE FROM track_genres\
-                         WHERE track_genres.track_id NOT IN (\
-                            SELECT tracks.rowid FROM tracks)")
+            sql.execute("DELETE FROM track_artists WHERE NOT EXISTS (\
+                            SELECT 1 FROM tracks\
+                            WHERE tracks.rowid=track_artists.track_id)")
+            sql.execute("DELETE FROM track_genres WHERE NOT EXISTS (\
+                            SELECT 1 FROM tracks\
+                            WHERE tracks.rowid=track_genres.track_id)")
 
     def search(self, searched, storage_type):
         """
@@ -1046,12 +1306,22 @@ class TracksDatabase:
             @return [(int, name)]
         """
         with SqlCursor(self.__db) as sql:
-            filters = ("%" + searched + "%", storage_type)
+            # Index assisted prefix lookup first
+            (start, end) = get_prefix_range(searched)
+            filters = (start, end, storage_type)
             request = "SELECT rowid, name FROM tracks\
-                       WHERE noaccents(name) LIKE ?\
+                       WHERE searchname>=? AND searchname<?\
                        AND tracks.storage_type & ? LIMIT 25"
-            result = sql.execute(request, filters)
-            return list(result)
+            items = list(sql.execute(request, filters))
+            if len(items) < 25:
+                filters = ("%" + searched + "%", start, end,
+                           storage_type, 25 - len(items))
+                request = "SELECT rowid, name FROM tracks\
+                           WHERE searchname LIKE ?\
+                           AND NOT (searchname>=? AND searchname<?)\
+                           AND tracks.storage_type & ? LIMIT ?"
+                items += list(sql.execute(request, filters))
+            return items
 
     def search_performed(self, searched, storage_type):
         """
@@ -1061,19 +1331,30 @@ class TracksDatabase:
             @return [(int, name)]
         """
         with SqlCursor(self.__db) as sql:
-            filters = ("%" + searched + "%", storage_type)
             request = "SELECT DISTINCT tracks.rowid, artists.name\
                    FROM track_artists, tracks, artists\
                    WHERE track_artists.artist_id=artists.rowid AND\
-                   track_artists.track_id=tracks.rowid AND\
-                   noaccents(artists.name) LIKE ? AND\
+                   track_artists.track_id=tracks.rowid AND %s AND\
                    tracks.storage_type & ? AND NOT EXISTS (\
                         SELECT album_artists.artist_id\
                         FROM album_artists\
                         WHERE album_artists.artist_id=artists.rowid)\
-                    LIMIT 25"
-            result = sql.execute(request, filters)
-            return list(result)
+                    LIMIT ?"
+            # Index assisted prefix lookup first
+            (start, end) = get_prefix_range(searched)
+            filters = (start, end, storage_type, 25)
+            items = list(sql.execute(
+                request % "artists.searchname>=? AND artists.searchname<?",
+                filters))
+            if len(items) < 25:
+                filters = ("%" + searched + "%", start, end,
+                           storage_type, 25 - len(items))
+                items += list(sql.execute(
+                    request % "artists.searchname LIKE ? AND NOT\
+                               (artists.searchname>=? AND\
+                                artists.searchname<?)",
+                    filters))
+            return items
 
     def search_track(self, artist, title):
         """
@@ -175,6 +175,14 @@ class DatabaseAlbumsUpgrade(DatabaseUpgrade):
             46: self.__upgrade_46,
             47: self.__upgrade_47,
             48: self.__upgrade_48,
+            49: self.__upgrade_49,
+            50: self.__upgrade_50,
+            51: self.__upgrade_51,
+            52: self.__upgrade_52,
+            53: self.__upgrade_53,
+            54: self.__upgrade_54,
+            55: self.__upgrade_55,
+            56: self.__upgrade_56,
         }
 
 #######################
@@ -837,3 +845,105 @@ class DatabaseAlbumsUpgrade(DatabaseUpgrade):
             sql.execute("UPDATE albums set loved=2 where loved=1")
             sql.execute("UPDATE albums set loved=1 where loved=0")
             sql.execute("UPDATE albums set loved=4 where loved=-1")
+
+    def __upgrade_49(self, db):
+        """
+            Add indexed accent-folded names used by search
+        """
+        with SqlCursor(db, True) as sql:
+            for table in ["albums", "artists", "tracks"]:
+                sql.execute("ALTER TABLE %s ADD searchname TEXT\
+                             NOT NULL DEFAULT ''" % table)
+                sql.execute("UPDATE %s SET searchname=noaccents(name)" %
+                            table)
+                sql.execute("CREATE index idx_%s_searchname\
+                             ON %s(searchname)" % (table, table))
+
+    def __upgrade_50(self, db):
+        """
+            Add full text search index
+        """
+        from lollypop.database_fts import FtsDatabase
+        FtsDatabase(db).create()
+
+    def __upgrade_51(self, db):
+        """
+            Add precomputed sort keys, filled by Database for current locale
+        """
+        with SqlCursor(db, True) as sql:
+            for table in ["albums", "artists", "genres"]:
+                sql.execute("ALTER TABLE %s ADD sortindex TEXT NOT NULL\
+                             DEFAULT ''" % table)
+                sql.execute("ALTER TABLE %s ADD sortkey TEXT NOT NULL\
+                             DEFAULT ''" % table)
+                sql.execute("CREATE index idx_%s_sortkey\
+                             ON %s(sortindex, sortkey)" % (table, table))
+        App().settings.set_value("sort-keys-locale", GLib.Variant("s", ""))
+
+    def __upgrade_52(self, db):
+        """
+            Add indexes matching collection queries, then update planner stats
+        """
+        indexes = [
+            "idx_aa_artist ON album_artists(artist_id, album_id)",
+            "idx_ta_artist ON track_artists(artist_id, track_id)",
+            "idx_ag_genre ON album_genres(genre_id, album_id)",
+            "idx_tg_genre ON track_genres(genre_id, track_id)",
+            "idx_featuring ON featuring(artist_id, album_id)",
+            "idx_tracks_uri ON tracks(uri)",
+            "idx_tracks_album ON tracks(album_id, discnumber, tracknumber)",
+            "idx_tracks_storage_type ON tracks(storage_type, mtime)",
+            "idx_tracks_lp ON tracks(lp_track_id)",
+            "idx_albums_storage_type ON albums(storage_type, mtime)",
+            "idx_albums_lp ON albums(lp_album_id)"
+        ]
+        with SqlCursor(db, True) as sql:
+            for index in indexes:
+                sql.execute("CREATE INDEX IF NOT EXISTS %s" % index)
+            sql.execute("ANALYZE")
+
+    def __upgrade_53(self, db):
+        """
+            Add album aggregates table
+        """
+        from lollypop.database_albums import AlbumsDatabase
+        with SqlCursor(db, True) as sql:
+            sql.execute("CREATE TABLE album_stats (\
+                            album_id INTEGER PRIMARY KEY,\
+                            duration INT NOT NULL,\
+                            tracks_count INT NOT NULL,\
+                            discs TEXT NOT NULL,\
+                            min_year INT,\
+                            max_year INT)")
+            sql.execute("CREATE index idx_album_stats_count\
+                         ON album_stats(tracks_count)")
+        AlbumsDatabase(db).rebuild_stats()
+
+    def __upgrade_54(self, db):
+        """
+            Add directories table
+        """
+        with SqlCursor(db, True) as sql:
+            sql.execute("CREATE TABLE directories (\
+                            uri TEXT PRIMARY KEY,\
+                            parent TEXT,\
+                            mtime INT NOT NULL,\
+                            count INT NOT NULL)")
+
+    def __upgrade_55(self, db):
+        """
+            Add tracks fingerprint, used to detect moved files
+        """
+        with SqlCursor(db, True) as sql:
+            sql.execute("ALTER TABLE tracks ADD fingerprint TEXT")
+
+    def __upgrade_56(self, db):
+        """
+            Add tracks loudness, failed analysis is not retried
+        """
+        with SqlCursor(db, True) as sql:
+            for column in ["track_gain", "track_peak",
+                           "album_gain", "album_peak"]:
+                sql.execute("ALTER TABLE tracks ADD %s DOUBLE" % column)
+            sql.execute("ALTER TABLE tracks ADD\
+                         loudness_failed INT NOT NULL DEFAULT 0")
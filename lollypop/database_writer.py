@@ -0,0 +1,153 @@
+# Copyright (c) 2014-2021 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from threading import Thread, Event, get_ident
+from queue import Queue, Empty
+
+from lollypop.sqlcursor import SqlCursor
+from lollypop.logger import Logger
+
+
+class DatabaseWriterItem:
+    """
+        A write queued for writer thread
+    """
+
+    def __init__(self, command, args, sync):
+        """
+            Init item
+            @param command as function
+            @param args as []
+            @param sync as bool => caller waits for result
+        """
+        self.command = command
+        self.args = args
+        self.event = Event() if sync else None
+        self.result = None
+        self.exception = None
+
+
+class DatabaseWriter:
+    """
+        Serialize database writes in a dedicated thread
+        Writes are committed in batches, on size or when queue is idle
+    """
+    # Commit after this count of writes
+    __BATCH_SIZE = 500
+    # Commit when no write since this delay (seconds)
+    __BATCH_TIMEOUT = 0.5
+
+    def __init__(self, db):
+        """
+            Init writer
+            @param db as Database
+        """
+        self.__db = db
+        self.__queue = Queue()
+        self.__thread = None
+
+    def start(self):
+        """
+            Start writer thread
+        """
+        if self.__thread is not None:
+            return
+        self.__thread = Thread(target=self.__run)
+        self.__thread.daemon = True
+        self.__thread.start()
+
+    def stop(self):
+        """
+            Flush pending writes and stop writer thread
+        """
+        if self.__thread is None:
+            return
+        self.__queue.put(None)
+        self.__thread.join()
+        self.__thread = None
+
+    def queue(self, command, *args):
+        """
+            Queue a write, run it directly if writer is not running
+            @param command as function
+            @param args as []
+        """
+        if self.__thread is None:
+            command(*args)
+        else:
+            self.__queue.put(DatabaseWriterItem(command, args, False))
+
+    def run_sync(self, command, *args):
+        """
+            Run a write in writer thread and wait for it to be committed
+            @param command as function
+            @param args as []
+            @return command result
+        """
+        if self.__thread is None or self.__thread.ident == get_ident():
+            return command(*args)
+        item = DatabaseWriterItem(command, args, True)
+        self.__queue.put(item)
+        item.event.wait()
+        if item.exception is not None:
+            raise item.exception
+        return item.result
+
+    @property
+    def running(self):
+        """
+            True if writer thread is running
+            @return bool
+        """
+        return self.__thread is not None
+
+#######################
+# PRIVATE             #
+#######################
+    def __run(self):
+        """
+            Consume queue, commit in batches
+        """
+        SqlCursor.add(self.__db)
+        pending = 0
+        while True:
+            try:
+                timeout = self.__BATCH_TIMEOUT if pending else None
+                item = self.__queue.get(timeout=timeout)
+            except Empty:
+                self.__commit()
+                pending = 0
+                continue
+            if item is None:
+                break
+            try:
+                item.result = item.command(*item.args)
+            except Exception as e:
+                Logger.error("DatabaseWriter::__run(): %s", e)
+                item.exception = e
+            pending += 1
+            # Sync callers expect data to be visible to other connections
+            if item.event is not None or pending >= self.__BATCH_SIZE:
+                self.__commit()
+                pending = 0
+            if item.event is not None:
+                item.event.set()
+        SqlCursor.remove(self.__db)
+
+    def __commit(self):
+        """
+            Commit pending writes
+        """
+        try:
+            SqlCursor.commit(self.__db)
+        except Exception as e:
+            Logger.error("DatabaseWriter::__commit(): %s", e)
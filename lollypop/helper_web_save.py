@@ -146,8 +146,11 @@ class SaveWebHelper(GObject.Object):
                               storage_type=storage_type)
         Logger.debug("SaveWebHelper::save_album(): %s - %s",
                      item.album_artists, item.album_name)
-        App().scanner.save_album(item)
-        App().albums.add_genre(item.album_id, Type.WEB)
+        writer = App().db.writer
+        writer.run_sync(App().scanner.save_album, item)
+        writer.run_sync(App().albums.add_genre, item.album_id, Type.WEB)
+        writer.run_sync(App().fts.update_albums, [item.album_id])
+        writer.run_sync(App().fts.update_artists, item.album_artist_ids)
         return item
 
     def __save_track(self, payload, item, storage_type):
@@ -168,4 +171,8 @@ class SaveWebHelper(GObject.Object):
         item.uri = payload["uri"]
         item.mb_track_id = payload["mbid"]
         item.storage_type = storage_type
-        App().scanner.save_track(item)
+        writer = App().db.writer
+        writer.run_sync(App().scanner.save_track, item)
+        writer.run_sync(App().artists.update_featuring, [item.album_id])
+        writer.run_sync(App().fts.update_albums, [item.album_id])
+        writer.run_sync(App().fts.update_artists, item.artist_ids)
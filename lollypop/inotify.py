@@ -11,30 +11,32 @@
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
 from gi.repository import Gio, GLib
-from gi.repository.Gio import FILE_ATTRIBUTE_STANDARD_TYPE,\
-    FILE_ATTRIBUTE_STANDARD_FAST_CONTENT_TYPE
-
-from lollypop.define import App, ScanType
-from lollypop.utils_file import is_audio
-from lollypop.logger import Logger
 
+from time import time
 
-SCAN_QUERY_INFO = "{},{}".format(FILE_ATTRIBUTE_STANDARD_TYPE,
-                                 FILE_ATTRIBUTE_STANDARD_FAST_CONTENT_TYPE)
+from lollypop.define import App, ScanType, FileType
+from lollypop.utils_file import get_file_type
+from lollypop.logger import Logger
 
 
 class Inotify:
     """
         Inotify support
+        Events are coalesced and changed files are scanned together
     """
-    # 2 seconds before updating database
+    # 2 seconds without events before updating database
     __TIMEOUT = 2000
+    # Do not delay update more than 10 seconds
+    __MAX_DELAY = 10
 
     def __init__(self):
         """
             Init inode notification
         """
         self.__monitors = {}
+        # Changed uris since last update, ordered and deduplicated
+        self.__changes = {}
+        self.__first_change_time = 0
         self.__collection_timeout_id = None
         self.__disable_timeout_id = None
 
@@ -48,7 +50,7 @@ class Inotify:
             return
         try:
             f = Gio.File.new_for_uri(uri)
-            monitor = f.monitor_directory(Gio.FileMonitorFlags.NONE,
+            monitor = f.monitor_directory(Gio.FileMonitorFlags.WATCH_MOVES,
                                           None)
             if monitor is not None:
                 monitor.connect("changed", self.__on_dir_changed)
@@ -65,6 +67,8 @@ class Inotify:
             self.__disable_timeout_id = None
         if self.__collection_timeout_id is not None:
             GLib.source_remove(self.__collection_timeout_id)
+            self.__collection_timeout_id = None
+        self.__changes = {}
         if self.__disable_timeout_id is not None:
             GLib.source_remove(self.__disable_timeout_id)
         self.__disable_timeout_id = GLib.timeout_add(timeout, on_timeout)
@@ -72,10 +76,23 @@ class Inotify:
 #######################
 # PRIVATE             #
 #######################
+    def __add_change(self, f):
+        """
+            Add a change for file
+            @param f as Gio.File
+        """
+        uri = f.get_uri()
+        # Ignore non audio files, keep directories
+        if get_file_type(uri) in [FileType.OTHER, FileType.PLS]:
+            return
+        if not self.__changes:
+            self.__first_change_time = time()
+        # Scanner checks if file was created, modified or deleted
+        self.__changes[uri] = None
+
     def __on_dir_changed(self, monitor, changed_file, other_file, event):
         """
-            Stop collection scanner if running
-            Delayed update by default
+            Coalesce changes, delayed update by default
             @param monitor as Gio.FileMonitor
             @param changed_file as Gio.File/None
             @param other_file as Gio.File/None
@@ -89,43 +106,41 @@ class Inotify:
             if changed_uri in self.__monitors.keys() and\
                     self.__monitors[changed_uri] == monitor:
                 return
-
-            if changed_file.query_exists():
-                # Ignore non audio
-                info = changed_file.query_info(SCAN_QUERY_INFO,
-                                               Gio.FileQueryInfoFlags.NONE)
-                if info.get_file_type() != Gio.FileType.DIRECTORY and\
-                        is_audio(info):
-                    return
-
-            # Stop collection scanner and wait
-            if App().scanner.is_locked():
-                App().scanner.stop()
-                GLib.timeout_add(self.__TIMEOUT,
-                                 self.__on_dir_changed,
-                                 monitor,
-                                 changed_file,
-                                 other_file,
-                                 event)
-            # Run update delayed
+            if event in [Gio.FileMonitorEvent.CREATED,
+                         Gio.FileMonitorEvent.CHANGED,
+                         Gio.FileMonitorEvent.CHANGES_DONE_HINT,
+                         Gio.FileMonitorEvent.MOVED_IN,
+                         Gio.FileMonitorEvent.DELETED,
+                         Gio.FileMonitorEvent.MOVED_OUT]:
+                self.__add_change(changed_file)
+            # Old and new uris
+            elif event == Gio.FileMonitorEvent.RENAMED:
+                self.__add_change(changed_file)
+                self.__add_change(other_file)
             else:
-                if self.__collection_timeout_id is not None:
-                    GLib.source_remove(self.__collection_timeout_id)
-                if changed_file.has_parent():
-                    uris = [changed_file.get_parent().get_uri()]
-                else:
-                    uris = [changed_uri]
-                self.__collection_timeout_id = GLib.timeout_add(
-                                                 self.__TIMEOUT,
-                                                 self.__run_collection_update,
-                                                 uris)
+                return
+            if not self.__changes:
+                return
+            # Run update delayed, wait for more events
+            if self.__collection_timeout_id is not None:
+                if time() - self.__first_change_time > self.__MAX_DELAY:
+                    return
+                GLib.source_remove(self.__collection_timeout_id)
+            self.__collection_timeout_id = GLib.timeout_add(
+                                             self.__TIMEOUT,
+                                             self.__run_collection_update)
         except Exception as e:
-            Logger.error("Inotify::__on_dir_changed()", e)
+            Logger.error("Inotify::__on_dir_changed(): %s", e)
 
-    def __run_collection_update(self, uris=[]):
+    def __run_collection_update(self):
         """
-            Run a collection update
-            @param uris as [str]
+            Run a collection update for changed uris
+            Running scan is not stopped, wait for it
         """
+        if App().scanner.is_locked():
+            return True
         self.__collection_timeout_id = None
+        uris = list(self.__changes.keys())
+        self.__changes = {}
+        Logger.info("Inotify: %s changed files", len(uris))
         App().scanner.update(ScanType.NEW_FILES, uris)
@@ -10,7 +10,7 @@
 # You should have received a copy of the GNU General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
-from locale import getlocale, strcoll
+from locale import getlocale, strcoll, strxfrm
 from importlib import import_module
 
 # Ugly magic to dynamically adapt to the current locale...
@@ -34,6 +34,19 @@ except:
             return ""
 
 
+def get_sort_keys(string):
+    """
+        Get keys sorting with a binary comparison like LocalizedCollation
+        @param string as str
+        @return (str, str) => (index key, string key)
+    """
+    index = index_of(string).upper()
+    try:
+        return (strxfrm(index), strxfrm(string))
+    except:
+        return (index, string)
+
+
 class LocalizedCollation(object):
     """
         COLLATE LOCALIZED missing from default sqlite installation
@@ -0,0 +1,275 @@
+# Copyright (c) 2014-2021 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from gi.repository import GLib, Gst
+
+from concurrent.futures import ThreadPoolExecutor
+from threading import local
+from math import log10
+from time import monotonic
+import os
+
+from lollypop.define import App, ReplayGain
+from lollypop.tagreader_file import FileDiscoverer
+from lollypop.logger import Logger
+
+
+class LoudnessAnalyzer:
+    """
+        Analyze tracks loudness in background with GStreamer rganalysis
+        Gain and peak are stored in DB and used by player, files are
+        not modified
+    """
+    # Tracks analyzed at the same time
+    __WORKERS = 2
+    # Delay before first analysis (seconds)
+    __DELAY = 30
+    # Max wait for a pipeline message (ns)
+    __TIMEOUT = Gst.SECOND
+    # Max analysis time for a track (seconds)
+    __DEADLINE = 600
+
+    def __init__(self):
+        """
+            Init analyzer
+        """
+        self.__thread = None
+        self.__cancelled = False
+        self.__local = local()
+        App().scanner.connect("scan-finished", self.__on_scan_finished)
+        App().settings.connect("changed::replay-gain",
+                               self.__on_replay_gain_changed)
+        GLib.timeout_add_seconds(self.__DELAY, self.start)
+
+    def start(self):
+        """
+            Analyze tracks without loudness, only if ReplayGain is enabled
+        """
+        if self.is_running() or App().scanner.is_locked() or\
+                App().settings.get_enum("replay-gain") == ReplayGain.NONE or\
+                not App().settings.get_value("replay-gain-analysis"):
+            return
+        self.__cancelled = False
+        self.__thread = App().task_helper.run(self.__analyze)
+
+    def stop(self):
+        """
+            Stop analysis
+        """
+        self.__cancelled = True
+
+    def is_running(self):
+        """
+            True if analysis is running
+            @return bool
+        """
+        return self.__thread is not None and self.__thread.is_alive()
+
+#######################
+# PRIVATE             #
+#######################
+    def __lower_priority(self):
+        """
+            Lower current thread priority
+        """
+        try:
+            # On Linux, nice value is per thread
+            os.setpriority(os.PRIO_PROCESS, 0, 19)
+        except Exception as e:
+            Logger.warning("LoudnessAnalyzer::__lower_priority(): %s", e)
+
+    def __analyze(self):
+        """
+            Analyze albums with tracks without loudness
+            @thread safe
+        """
+        self.__lower_priority()
+        executor = ThreadPoolExecutor(max_workers=self.__WORKERS,
+                                      initializer=self.__lower_priority)
+        try:
+            for album_id in App().tracks.get_album_ids_without_loudness():
+                # Let scanner and quit have priority
+                if self.__cancelled or App().scanner.is_locked():
+                    break
+                self.__analyze_album(album_id, executor)
+        except Exception as e:
+            Logger.error("LoudnessAnalyzer::__analyze(): %s", e)
+        executor.shutdown()
+
+    def __analyze_album(self, album_id, executor):
+        """
+            Analyze tracks without loudness, then update album loudness
+            @param album_id as int
+            @param executor as ThreadPoolExecutor
+        """
+        rows = App().tracks.get_loudness_rows(album_id)
+        rows = [list(row) for row in rows]
+        todo = [row for row in rows if row[3] is None and not row[7]]
+        results = executor.map(self.__analyze_track,
+                               [row[1] for row in todo])
+        for (row, loudness) in zip(todo, results):
+            # Cancelled analysis returns None too
+            if self.__cancelled:
+                break
+            elif loudness is None:
+                App().tracks.set_loudness_failed(row[0])
+                continue
+            (track_gain, track_peak, album_gain, album_peak) = loudness
+            App().tracks.set_loudness(row[0], track_gain, track_peak)
+            row[3:7] = loudness
+        analyzed = [row for row in rows if row[3] is not None]
+        if not analyzed:
+            return
+        # Keep album values from tags if all tracks have one
+        if all([row[5] is not None for row in analyzed]):
+            (album_gain, album_peak) = analyzed[0][5:7]
+        else:
+            (album_gain, album_peak) = self.__get_album_loudness(analyzed)
+        App().tracks.set_album_loudness(album_id, album_gain, album_peak)
+
+    def __get_album_loudness(self, rows):
+        """
+            Get album gain from tracks gain, weighted by duration
+            This is an approximation of rganalysis album mode
+            @param rows as [(int, str, int, float, float, float, float)]
+            @return (float, float)
+        """
+        duration = sum([max(1, row[2]) for row in rows])
+        power = sum([max(1, row[2]) * 10 ** (-row[3] / 10) for row in rows])
+        album_gain = -10 * log10(power / duration)
+        album_peak = max([row[4] for row in rows])
+        return (album_gain, album_peak)
+
+    def __analyze_track(self, uri):
+        """
+            Get loudness from ReplayGain tags or by analyzing track
+            @param uri as str
+            @return (float, float, float/None, float/None)/None
+        """
+        if self.__cancelled:
+            return None
+        try:
+            loudness = self.__get_loudness_from_tags(uri)
+            if loudness is None:
+                loudness = self.__get_loudness_from_stream(uri)
+            return loudness
+        except Exception as e:
+            Logger.error("LoudnessAnalyzer::__analyze_track(): %s, %s",
+                         uri, e)
+        return None
+
+    def __get_loudness_from_tags(self, uri):
+        """
+            Get loudness from file ReplayGain tags
+            @param uri as str
+            @return (float, float, float/None, float/None)/None
+        """
+        # One discoverer per worker thread
+        discoverer = getattr(self.__local, "discoverer", None)
+        if discoverer is None:
+            discoverer = self.__local.discoverer = FileDiscoverer()
+        tags = discoverer.get_info(uri).get_tags()
+        if tags is None:
+            return None
+        values = []
+        for tag in [Gst.TAG_TRACK_GAIN, Gst.TAG_TRACK_PEAK,
+                    Gst.TAG_ALBUM_GAIN, Gst.TAG_ALBUM_PEAK]:
+            (exists, value) = tags.get_double(tag)
+            values.append(value if exists else None)
+        if values[0] is None:
+            return None
+        # No peak, no clipping prevention
+        if values[1] is None:
+            values[1] = 1.0
+        if values[2] is None:
+            values[3] = None
+        elif values[3] is None:
+            values[3] = 1.0
+        return tuple(values)
+
+    def __get_loudness_from_stream(self, uri):
+        """
+            Analyze track with rganalysis
+            @param uri as str
+            @return (float, float, None, None)/None
+        """
+        pipeline = Gst.parse_launch(
+            "uridecodebin name=decoder ! audioconvert ! audioresample !"
+            " rganalysis name=analysis ! fakesink sync=false")
+        pipeline.get_by_name("decoder").set_property("uri", uri)
+        analysis = pipeline.get_by_name("analysis")
+        bus = pipeline.get_bus()
+        # Streaming threads come from a GLib pool, they do not inherit
+        # worker priority
+        bus.enable_sync_message_emission()
+        bus.connect("sync-message::stream-status", self.__on_stream_status)
+        track_gain = track_peak = None
+        deadline = monotonic() + self.__DEADLINE
+        pipeline.set_state(Gst.State.PLAYING)
+        try:
+            while not self.__cancelled:
+                if monotonic() > deadline:
+                    Logger.warning("LoudnessAnalyzer: %s, timeout", uri)
+                    break
+                message = bus.timed_pop_filtered(
+                    self.__TIMEOUT,
+                    Gst.MessageType.TAG | Gst.MessageType.EOS |
+                    Gst.MessageType.ERROR)
+                if message is None:
+                    continue
+                elif message.type == Gst.MessageType.ERROR:
+                    Logger.warning("LoudnessAnalyzer: %s, %s", uri,
+                                   message.parse_error()[0].message)
+                    break
+                elif message.type == Gst.MessageType.EOS:
+                    break
+                elif message.src == analysis:
+                    tags = message.parse_tag()
+                    (exists, value) = tags.get_double(Gst.TAG_TRACK_GAIN)
+                    if exists:
+                        track_gain = value
+                    (exists, value) = tags.get_double(Gst.TAG_TRACK_PEAK)
+                    if exists:
+                        track_peak = value
+        finally:
+            pipeline.set_state(Gst.State.NULL)
+            bus.disable_sync_message_emission()
+        if track_gain is None or track_peak is None:
+            return None
+        return (track_gain, track_peak, None, None)
+
+    def __on_stream_status(self, bus, message):
+        """
+            Lower streaming thread priority, called from that thread
+            @param bus as Gst.Bus
+            @param message as Gst.Message
+            @thread safe
+        """
+        (status, owner) = message.parse_stream_status()
+        if status == Gst.StreamStatusType.ENTER:
+            self.__lower_priority()
+
+    def __on_scan_finished(self, scanner, modifications):
+        """
+            Analyze new tracks
+            @param scanner as CollectionScanner
+            @param modifications as bool
+        """
+        self.start()
+
+    def __on_replay_gain_changed(self, settings, value):
+        """
+            Start analysis if ReplayGain is enabled
+            @param settings as Gio.Settings
+            @param value as GLib.Variant
+        """
+        self.start()
@@ -15,7 +15,7 @@ from gi.repository import Gio, GLib
 from gettext import gettext as _
 
 from lollypop.define import App, ViewType, Type, LovedFlags
-from lollypop.utils_album import tracks_to_albums
+from lollypop.utils_album import tracks_to_albums, get_tracks_for_ids
 from lollypop.utils import get_default_storage_type, emit_signal
 from lollypop.utils import get_network_available
 from lollypop.objects_track import Track
@@ -236,7 +236,7 @@ class PlaylistPlaybackMenu(Gio.Menu):
             split[0] += " AND tracks.storage_type&%s " % storage_type
             track_ids = App().db.execute("ORDER BY".join(split))
             albums = tracks_to_albums(
-                [Track(track_id) for track_id in track_ids])
+                get_tracks_for_ids(track_ids))
         else:
             tracks = App().playlists.get_tracks(playlist_id)
             albums = tracks_to_albums(tracks)
@@ -48,6 +48,18 @@ class Base:
             else:
                 return attr_value
 
+    def set_row(self, row):
+        """
+            Prefill attributes not already loaded
+            @param row as {attr: value}
+        """
+        for attr in self.DEFAULTS.keys():
+            if attr not in row.keys():
+                continue
+            attr_name = "_" + attr
+            if getattr(self, attr_name) is None:
+                setattr(self, attr_name, row[attr])
+
     def reset(self, attr):
         """
             Reset attr
@@ -11,12 +11,10 @@
 # You should have received a copy of the GNU General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
-from hashlib import md5
-
 from lollypop.define import App, StorageType, ScanUpdate, Type
 from lollypop.objects_track import Track
 from lollypop.objects import Base
-from lollypop.utils import emit_signal
+from lollypop.utils import emit_signal, remove_static
 from lollypop.collection_item import CollectionItem
 from lollypop.logger import Logger
 
@@ -94,14 +92,18 @@ class Disc:
             @return [Track]
         """
         if not self.__tracks and self.album.id is not None:
-            self.__tracks = [Track(track_id, self.album)
-                             for track_id in self.db.get_disc_track_ids(
-                                    self.album.id,
-                                    self.album.genre_ids,
-                                    self.album.artist_ids,
-                                    self.number,
-                                    self.__storage_type,
-                                    self.__skipped)]
+            track_ids = self.db.get_disc_track_ids(self.album.id,
+                                                   self.album.genre_ids,
+                                                   self.album.artist_ids,
+                                                   self.number,
+                                                   self.__storage_type,
+                                                   self.__skipped)
+            rows = App().tracks.get_rows(track_ids)
+            tracks = []
+            for track_id in track_ids:
+                tracks.append(Track(track_id, self.album,
+                                    rows.get(track_id, None)))
+            self.__tracks = tracks
         return self.__tracks
 
 
@@ -124,23 +126,29 @@ class Album(Base):
                 "lp_album_id": None}
 
     def __init__(self, album_id=None, genre_ids=[], artist_ids=[],
-                 skipped=True):
+                 skipped=True, row=None):
         """
             Init album
             @param album_id as int
             @param genre_ids as [int]
             @param artist_ids as [int]
             @param skipped as bool
+            @param row as {attr: value} from AlbumsDatabase.get_rows()
         """
         Base.__init__(self, App().albums)
         self.id = album_id
         self.genre_ids = genre_ids
+        # Aggregates are only valid for the whole album
+        self.__filtered = bool(remove_static(genre_ids) or
+                               remove_static(artist_ids))
         self.__tracks = []
         self.__discs = []
         self.__name = None
         self.__skipped = skipped
         self.__disc_number = None
         self.__original_year = Type.NONE
+        if row is not None:
+            self.set_row(row)
         self.__tracks_storage_type = self.storage_type
         # Use artist ids from db else
         if artist_ids:
@@ -164,6 +172,19 @@ class Album(Base):
     def __setstate__(self, d):
         self.__dict__.update(d)
         self.db = App().albums
+        # Album saved by a previous version
+        if "_Album__filtered" not in d.keys():
+            self.__filtered = True
+
+    def set_row(self, row):
+        """
+            Prefill attributes not already loaded
+            @param row as {attr: value}
+        """
+        Base.set_row(self, row)
+        if self.__name is None and self.__disc_number is None and\
+                "name" in row.keys():
+            self.__name = row["name"]
 
     def set_discs(self, discs):
         """
@@ -436,11 +457,12 @@ class Album(Base):
         """
         if self.__tracks:
             return len(self.__tracks)
-        else:
-            return self.db.get__tracks_count(
-                self.id,
-                self.genre_ids,
-                self.artist_ids)
+        stats = self.__get_stats()
+        if stats is not None:
+            return stats[1]
+        return self.db.get_tracks_count(self.id,
+                                        self.genre_ids,
+                                        self.artist_ids)
 
     @property
     def track_ids(self):
@@ -503,37 +525,32 @@ class Album(Base):
     @property
     def duration(self):
         """
-            Get album duration and handle caching
+            Get album duration
             @return int
         """
         if self.__tracks:
-            track_ids = [track.lp_track_id for track in self.tracks]
-            track_str = "%s" % sorted(track_ids)
-            track_hash = md5(track_str.encode("utf-8")).hexdigest()
-            album_hash = "%s-%s-%s" % (
-                self.lp_album_id, track_hash, self.__disc_number)
-        else:
-            album_hash = "%s-%s-%s-%s" % (self.lp_album_id,
-                                          self.genre_ids,
-                                          self.artist_ids,
-                                          self.__disc_number)
-        duration = App().cache.get_duration(album_hash)
-        if duration is None:
-            if self.__tracks:
-                duration = 0
-                for track in self.__tracks:
-                    duration += track.duration
-            else:
-                duration = self.db.get_duration(self.id,
-                                                self.genre_ids,
-                                                self.artist_ids,
-                                                self.__disc_number)
-            App().cache.set_duration(self.id, album_hash, duration)
-        return duration
+            return sum([track.duration for track in self.__tracks])
+        stats = self.__get_stats()
+        if stats is not None:
+            return stats[0]
+        return self.db.get_duration(self.id,
+                                    self.genre_ids,
+                                    self.artist_ids,
+                                    self.__disc_number)
 
 #######################
 # PRIVATE             #
 #######################
+    def __get_stats(self):
+        """
+            Get album aggregates if they match this album
+            @return (int, int, [int], int, int)/None
+        """
+        if self.id is None or self.__filtered or\
+                self.__disc_number is not None:
+            return None
+        return self.db.get_stats(self.id)
+
     def __save(self, save):
         """
             Save album to collection.
@@ -44,16 +44,19 @@ class Track(Base):
                 "lp_track_id": None,
                 "mb_artist_ids": []}
 
-    def __init__(self, track_id=None, album=None):
+    def __init__(self, track_id=None, album=None, row=None):
         """
             Init track
             @param track_id as int
             @param album as Album
+            @param row as {attr: value} from TracksDatabase.get_rows()
         """
         Base.__init__(self, App().tracks)
         self.id = track_id
         self._uri = None
         self.__uri_loaded = False
+        if row is not None:
+            self.set_row(row)
 
         if album is None:
             from lollypop.objects_album import Album
@@ -77,6 +80,15 @@ class Track(Base):
         self.__dict__.update(d)
         self.db = App().tracks
 
+    def set_row(self, row):
+        """
+            Prefill attributes not already loaded
+            @param row as {attr: value}
+        """
+        Base.set_row(self, row)
+        if self._uri is None and "uri" in row.keys():
+            self._uri = row["uri"]
+
     def set_album(self, album):
         """
             Set track album
@@ -271,9 +271,11 @@ class Player(GObject.GObject, AlbumsPlayer, BinPlayer, AutoRandomPlayer,
         if played >= track.duration / 2000 or played >= 240:
             self.__scrobble(track, self._start_time)
             if track.id >= 0:
-                App().tracks.set_listened_at(track.id, int(time()))
+                writer = App().db.writer
+                writer.queue(App().tracks.set_listened_at,
+                             track.id, int(time()))
                 # Increment popularity
-                App().tracks.set_more_popular(track.id)
+                writer.queue(App().tracks.set_more_popular, track.id)
                 # In party mode, linear popularity
                 if self.is_party:
                     pop_to_add = 1
@@ -281,7 +283,8 @@ class Player(GObject.GObject, AlbumsPlayer, BinPlayer, AutoRandomPlayer,
                 else:
                     count = track.album.tracks_count
                     pop_to_add = int(App().albums.max_count / count)
-                App().albums.set_more_popular(track.album_id, pop_to_add)
+                writer.queue(App().albums.set_more_popular,
+                             track.album_id, pop_to_add)
 
     def _on_stream_start(self, bus, message):
         """
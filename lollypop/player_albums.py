@@ -16,7 +16,7 @@ from random import choice
 from gettext import gettext as _
 
 from lollypop.logger import Logger
-from lollypop.objects_album import Album
+from lollypop.utils_album import get_albums_for_ids
 from lollypop.player_auto_similar import AutoSimilarPlayer
 from lollypop.player_auto_random import AutoRandomPlayer
 from lollypop.define import App, Repeat
@@ -47,7 +47,7 @@ class AlbumsPlayer:
             Add album ids to player
             @param album_ids as [int]
         """
-        self.add_albums([Album(album_id) for album_id in album_ids])
+        self.add_albums(get_albums_for_ids(album_ids))
 
     def add_albums(self, albums):
         """
@@ -20,7 +20,7 @@ from lollypop.logger import Logger
 from lollypop.define import App, Repeat, StorageType
 from lollypop.utils import sql_escape, get_network_available
 from lollypop.utils import get_default_storage_type, emit_signal
-from lollypop.utils_album import tracks_to_albums
+from lollypop.utils_album import tracks_to_albums, get_tracks_for_ids
 
 
 class AutoSimilarPlayer:
@@ -63,7 +63,7 @@ class AutoSimilarPlayer:
                                              False,
                                              100)
         albums = tracks_to_albums(
-            [Track(track_id) for track_id in track_ids], False)
+            get_tracks_for_ids(track_ids), False)
         self.play_albums(albums)
 
     def play_radio_from_spotify(self, artist_ids):
@@ -110,7 +110,7 @@ class AutoSimilarPlayer:
         track_ids = App().tracks.get_loved_track_ids(artist_ids,
                                                      StorageType.ALL)
         shuffle(track_ids)
-        albums = tracks_to_albums([Track(track_id) for track_id in track_ids])
+        albums = tracks_to_albums(get_tracks_for_ids(track_ids))
         App().player.play_albums(albums)
 
     def play_radio_from_populars(self, artist_ids):
@@ -121,7 +121,7 @@ class AutoSimilarPlayer:
         track_ids = App().tracks.get_populars(artist_ids, StorageType.ALL,
                                               False, 100)
         shuffle(track_ids)
-        albums = tracks_to_albums([Track(track_id) for track_id in track_ids])
+        albums = tracks_to_albums(get_tracks_for_ids(track_ids))
         App().player.play_albums(albums)
 
     @property
@@ -252,6 +252,10 @@ class BinPlayer:
                 self.__load_from_web(track)
                 return False
             else:
+                # New stream, pending loudness is outdated
+                if self._playbin.get_state(0)[1] == Gst.State.NULL:
+                    self._plugins.clear_loudness()
+                self._plugins.add_loudness(App().tracks.get_loudness(track.id))
                 self._playbin.set_property("uri", track.uri)
         except Exception as e:  # Gstreamer error
             Logger.error("BinPlayer::_load_track(): %s" % e)
@@ -390,6 +394,7 @@ class BinPlayer:
             duration = discoverer.get_info(track.uri).get_duration() / 1000000
             if duration != track.duration and duration > 0:
                 App().tracks.set_duration(track.id, int(duration))
+                App().albums.update_stats([track.album_id])
                 track.reset("duration")
                 emit_signal(self, "duration-changed", track.id)
         except Exception as e:
@@ -13,6 +13,8 @@
 
 from gi.repository import Gst
 
+from collections import deque
+
 from lollypop.define import App, ReplayGain
 from lollypop.logger import Logger
 
@@ -33,6 +35,10 @@ class PluginsPlayer:
         """
         self.__equalizer = None
         self.__playbin = playbin
+        # Loudness for next streams, see add_loudness()
+        self.__loudness = deque()
+        self.__loudness_tags = None
+        self.__buffer_probe = False
         self.build_audiofilter()
 
     def build_audiofilter(self):
@@ -66,6 +72,10 @@ class PluginsPlayer:
                     "replay-gain-db").get_double()
                 rglimiter.props.enabled = App().settings.get_value(
                     "replay-gain-limiter")
+                self.__buffer_probe = False
+                rgvolume.get_static_pad("sink").add_probe(
+                    Gst.PadProbeType.EVENT_DOWNSTREAM,
+                    self.__on_rgvolume_probe)
 
             # Equalizer
             self.__equalizer = None
@@ -121,6 +131,22 @@ class PluginsPlayer:
         except Exception as e:
             Logger.error("PluginsPlayer::init():", e)
 
+    def add_loudness(self, loudness):
+        """
+            Add loudness for next stream, only used if stream does not
+            have ReplayGain tags
+            @param loudness as (float, float, float, float)/None:
+                   (track gain, track peak, album gain, album peak)
+        """
+        self.__loudness.append(loudness)
+
+    def clear_loudness(self):
+        """
+            Clear loudness for next streams
+        """
+        self.__loudness.clear()
+        self.__loudness_tags = None
+
     def update_equalizer(self):
         """
             Update equalizer based on current settings
@@ -147,3 +173,68 @@ class PluginsPlayer:
 #######################
 # PRIVATE             #
 #######################
+    def __get_loudness_tags(self, loudness):
+        """
+            Get ReplayGain tags for loudness
+            @param loudness as (float, float, float, float)/None
+            @return Gst.TagList/None
+        """
+        if loudness is None:
+            return None
+        tags = Gst.TagList.new_empty()
+        for (tag, value) in zip([Gst.TAG_TRACK_GAIN, Gst.TAG_TRACK_PEAK,
+                                 Gst.TAG_ALBUM_GAIN, Gst.TAG_ALBUM_PEAK],
+                                loudness):
+            if value is not None:
+                tags.add_value(Gst.TagMergeMode.REPLACE, tag, value)
+        return tags
+
+    def __on_rgvolume_probe(self, pad, info):
+        """
+            Get loudness from DB for new streams
+            @param pad as Gst.Pad
+            @param info as Gst.PadProbeInfo
+            @return Gst.PadProbeReturn
+        """
+        try:
+            event = info.get_event()
+            # rgvolume resets gain on new stream
+            if event.type == Gst.EventType.STREAM_START:
+                loudness = self.__loudness.popleft()\
+                    if self.__loudness else None
+                self.__loudness_tags = self.__get_loudness_tags(loudness)
+                # Wait for first buffer, stream tags come before
+                if self.__loudness_tags is not None and\
+                        not self.__buffer_probe:
+                    self.__buffer_probe = True
+                    pad.add_probe(Gst.PadProbeType.BUFFER,
+                                  self.__on_rgvolume_buffer_probe)
+            elif event.type == Gst.EventType.TAG and\
+                    self.__loudness_tags is not None:
+                (exists, value) = event.parse_tag().get_double(
+                    Gst.TAG_TRACK_GAIN)
+                # Stream tags win
+                if exists:
+                    self.__loudness_tags = None
+        except Exception as e:
+            Logger.error("PluginsPlayer::__on_rgvolume_probe(): %s", e)
+        return Gst.PadProbeReturn.OK
+
+    def __on_rgvolume_buffer_probe(self, pad, info):
+        """
+            Send loudness from DB to rgvolume as ReplayGain tags if stream
+            does not have ReplayGain tags, only probe first buffer
+            @param pad as Gst.Pad
+            @param info as Gst.PadProbeInfo
+            @return Gst.PadProbeReturn
+        """
+        try:
+            self.__buffer_probe = False
+            if self.__loudness_tags is not None:
+                tags = self.__loudness_tags
+                self.__loudness_tags = None
+                pad.send_event(Gst.Event.new_tag(tags))
+        except Exception as e:
+            Logger.error("PluginsPlayer::__on_rgvolume_buffer_probe(): %s",
+                         e)
+        return Gst.PadProbeReturn.REMOVE
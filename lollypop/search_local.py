@@ -43,14 +43,35 @@ class LocalSearch(GObject.Object):
             @param cancellable as Gio.Cancellable
         """
         search = noaccents(search)
-        self.__get_artists(search, storage_type, cancellable)
-        self.__get_albums(search, storage_type, cancellable)
-        self.__get_tracks(search, storage_type, cancellable)
+        if App().fts.available:
+            self.__get_fts(search, storage_type, cancellable)
+        else:
+            self.__get_artists(search, storage_type, cancellable)
+            self.__get_albums(search, storage_type, cancellable)
+            self.__get_tracks(search, storage_type, cancellable)
         GLib.idle_add(self.emit, "finished")
 
 #######################
 # PRIVATE             #
 #######################
+    def __get_fts(self, search, storage_type, cancellable):
+        """
+            Get matches for search from full text index, best matches first
+            @param search as str
+            @param storage_type as StorageType
+            @param cancellable as Gio.Cancellable
+        """
+        for artist_id in App().fts.search_artists(search, storage_type):
+            GLib.idle_add(self.emit, "match-artist", artist_id, storage_type)
+        if cancellable.is_cancelled():
+            return
+        for album_id in App().fts.search_albums(search, storage_type):
+            GLib.idle_add(self.emit, "match-album", album_id, storage_type)
+        if cancellable.is_cancelled():
+            return
+        for track_id in App().fts.search_tracks(search, storage_type):
+            GLib.idle_add(self.emit, "match-track", track_id, storage_type)
+
     def __split_string(self, string):
         """
             Split string for search
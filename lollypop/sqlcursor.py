@@ -11,74 +11,50 @@
 # You should have received a copy of the GNU General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
-from threading import current_thread
-
 from lollypop.define import App
 
 
 class SqlCursor:
     """
         Context manager to get the SQL cursor
+        Connections come from App().cursors pool
     """
     def add(obj):
         """
-            Add cursor to thread list
+            Register a cursor for current thread, no commit until remove()
         """
-        name = current_thread().getName() + obj.__class__.__name__
-        App().cursors[name] = obj.get_cursor()
+        App().cursors.acquire(obj, True)
 
     def remove(obj):
         """
             Remove cursor from thread list and commit
         """
-        name = current_thread().getName() + obj.__class__.__name__
-        if name in App().cursors.keys():
-            obj.thread_lock.acquire()
-            App().cursors[name].commit()
-            obj.thread_lock.release()
-            App().cursors[name].close()
-            del App().cursors[name]
+        App().cursors.unregister(obj)
 
     def commit(obj):
         """
             Commit current obj
         """
-        name = current_thread().getName() + obj.__class__.__name__
-        if name in App().cursors.keys():
-            obj.thread_lock.acquire()
-            App().cursors[name].commit()
-            obj.thread_lock.release()
+        App().cursors.commit(obj)
 
     def __init__(self, obj, commit=False):
         """
             Init object
             @param obj as Database/Playlists/Radios
-            @param commit as bool
+            @param commit as bool => commit when outermost cursor for obj
+                                     is released in this thread
         """
         self.__obj = obj
         self.__commit = commit
-        self.__cursor = None
 
     def __enter__(self):
         """
-            Get thread cursor or a new one
+            Get thread cursor from pool
         """
-        name = current_thread().getName() + self.__obj.__class__.__name__
-        if name in App().cursors.keys():
-            cursor = App().cursors[name]
-            return cursor
-        else:
-            self.__cursor = self.__obj.get_cursor()
-            return self.__cursor
+        return App().cursors.acquire(self.__obj)
 
     def __exit__(self, type, value, traceback):
         """
-            Close cursor if not thread cursor
+            Release cursor to pool, commit if needed
         """
-        if self.__cursor is not None:
-            if self.__commit:
-                self.__obj.thread_lock.acquire()
-                self.__cursor.commit()
-                self.__obj.thread_lock.release()
-            self.__cursor.close()
-        self.__cursor = None
+        App().cursors.release(self.__obj, self.__commit)
@@ -0,0 +1,257 @@
+# Copyright (c) 2014-2021 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from threading import Lock, get_ident
+from time import time
+
+from lollypop.logger import Logger
+
+
+class SqlPoolEntry:
+    """
+        A connection checked out by a thread
+    """
+
+    def __init__(self, connection, overflow):
+        """
+            Init entry
+            @param connection as sqlite3.Connection
+            @param overflow as bool
+        """
+        self.connection = connection
+        self.overflow = overflow
+        self.depth = 0
+        self.registered = 0
+        # A nested cursor asked for a commit
+        self.pending_commit = False
+
+
+class SqlPool:
+    """
+        Pool of warmed sqlite connections
+        A connection is checked out by a thread for a database object and
+        shared by nested cursors, then returned to the pool for reuse.
+        As nested cursors share a transaction, commit is done when
+        outermost cursor is released: an inner commit would also commit
+        pending writes of outer cursors.
+        Idle connections are closed after a while.
+    """
+    # Max pooled connections, overflow connections are closed on release
+    __MAX_CONNECTIONS = 16
+    # Close connections idle for more than 60 seconds
+    __IDLE_TIMEOUT = 60
+
+    def __init__(self):
+        """
+            Init pool
+        """
+        self.__lock = Lock()
+        # {id(obj): [(sqlite3.Connection, last used as float, obj)]}
+        # obj is kept so its id can not be reused by another object
+        self.__idle = {}
+        # {(thread id, id(obj)): SqlPoolEntry}
+        self.__busy = {}
+        self.__count = 0
+
+    def acquire(self, obj, register=False):
+        """
+            Get a connection for current thread
+            @param obj as Database/TagCacheDatabase/Playlists/History
+            @param register as bool => keep connection until unregister()
+            @return sqlite3.Connection
+        """
+        obj_id = id(obj)
+        key = (get_ident(), obj_id)
+        with self.__lock:
+            entry = self.__busy.get(key, None)
+            if entry is None:
+                entry = self.__get_idle(obj_id)
+        if entry is None:
+            entry = self.__new_entry(obj)
+        entry.depth += 1
+        if register:
+            entry.registered += 1
+        with self.__lock:
+            self.__busy[key] = entry
+        return entry.connection
+
+    def release(self, obj, commit=False):
+        """
+            Release connection for current thread
+            @param obj as Database/TagCacheDatabase/Playlists/History
+            @param commit as bool
+        """
+        obj_id = id(obj)
+        key = (get_ident(), obj_id)
+        with self.__lock:
+            entry = self.__busy.get(key, None)
+        if entry is None:
+            return
+        entry.depth -= 1
+        if commit:
+            entry.pending_commit = True
+        # Registered connection is still checked out, commit is done by
+        # owner in unregister()
+        if entry.depth == 0:
+            if entry.pending_commit:
+                self.commit(obj)
+            self.__release_entry(key, obj, entry)
+
+    def unregister(self, obj):
+        """
+            Commit and release registered connection for current thread
+            @param obj as Database/TagCacheDatabase/Playlists/History
+        """
+        obj_id = id(obj)
+        key = (get_ident(), obj_id)
+        with self.__lock:
+            entry = self.__busy.get(key, None)
+        if entry is None or entry.registered == 0:
+            return
+        entry.registered -= 1
+        self.commit(obj)
+        entry.depth -= 1
+        if entry.depth == 0:
+            self.__release_entry(key, obj, entry)
+
+    def commit(self, obj):
+        """
+            Commit connection for current thread
+            @param obj as Database/TagCacheDatabase/Playlists/History
+        """
+        with self.__lock:
+            entry = self.__busy.get((get_ident(), id(obj)), None)
+        if entry is not None:
+            obj.thread_lock.acquire()
+            try:
+                entry.connection.commit()
+            finally:
+                obj.thread_lock.release()
+
+    def is_registered(self, obj):
+        """
+            True if current thread registered a connection for obj
+            @param obj as Database/TagCacheDatabase/Playlists/History
+            @return bool
+        """
+        with self.__lock:
+            entry = self.__busy.get((get_ident(), id(obj)), None)
+        return entry is not None and entry.registered > 0
+
+    def close(self):
+        """
+            Close idle connections
+        """
+        with self.__lock:
+            for connections in self.__idle.values():
+                for (connection, mtime, obj) in connections:
+                    self.__close(connection)
+                    self.__count -= 1
+            self.__idle = {}
+
+#######################
+# PRIVATE             #
+#######################
+    def __get_idle(self, obj_id):
+        """
+            Get an idle entry for object, lock must be held
+            @param obj_id as int
+            @return SqlPoolEntry/None
+        """
+        connections = self.__idle.get(obj_id, [])
+        if connections:
+            (connection, mtime, obj) = connections.pop()
+            return SqlPoolEntry(connection, False)
+        return None
+
+    def __new_entry(self, obj):
+        """
+            Create a new connection, evict an idle one if pool is full
+            @param obj as Database/TagCacheDatabase/Playlists/History
+            @return SqlPoolEntry
+        """
+        with self.__lock:
+            if self.__count >= self.__MAX_CONNECTIONS:
+                self.__evict_lru()
+            overflow = self.__count >= self.__MAX_CONNECTIONS
+            if not overflow:
+                self.__count += 1
+        return SqlPoolEntry(obj.get_cursor(), overflow)
+
+    def __release_entry(self, key, obj, entry):
+        """
+            Put entry back in idle connections
+            @param key as (int, int)
+            @param obj as Database/TagCacheDatabase/Playlists/History
+            @param entry as SqlPoolEntry
+        """
+        connection = entry.connection
+        # Same behaviour as closing a connection: drop uncommitted changes
+        if connection.in_transaction:
+            try:
+                connection.rollback()
+            except Exception as e:
+                Logger.error("SqlPool::__release_entry(): %s", e)
+        with self.__lock:
+            del self.__busy[key]
+            if entry.overflow:
+                self.__close(connection)
+            else:
+                obj_id = id(obj)
+                if obj_id not in self.__idle.keys():
+                    self.__idle[obj_id] = []
+                self.__idle[obj_id].append((connection, time(), obj))
+            self.__close_idle()
+
+    def __close_idle(self):
+        """
+            Close connections idle for too long, lock must be held
+        """
+        now = time()
+        for obj_id in list(self.__idle.keys()):
+            connections = []
+            for (connection, mtime, obj) in self.__idle[obj_id]:
+                if now - mtime > self.__IDLE_TIMEOUT:
+                    self.__close(connection)
+                    self.__count -= 1
+                else:
+                    connections.append((connection, mtime, obj))
+            # Do not keep a reference on objects without connections
+            if connections:
+                self.__idle[obj_id] = connections
+            else:
+                del self.__idle[obj_id]
+
+    def __evict_lru(self):
+        """
+            Close least recently used idle connection, lock must be held
+        """
+        lru = None
+        for obj_id in self.__idle.keys():
+            for idle in self.__idle[obj_id]:
+                if lru is None or idle[1] < lru[1][1]:
+                    lru = (obj_id, idle)
+        if lru is not None:
+            (obj_id, idle) = lru
+            self.__idle[obj_id].remove(idle)
+            self.__close(idle[0])
+            self.__count -= 1
+
+    def __close(self, connection):
+        """
+            Close connection
+            @param connection as sqlite3.Connection
+        """
+        try:
+            connection.close()
+        except Exception as e:
+            Logger.error("SqlPool::__close(): %s", e)
@@ -13,12 +13,14 @@
 from gi.repository import Gst, GstPbutils, GLib, Gio
 
 from re import match
+from string import ascii_uppercase, ascii_lowercase
 from gettext import gettext as _
 
 from lollypop.define import App
 from lollypop.logger import Logger
 from lollypop.utils_file import decodeUnicode, splitUnicode
 from lollypop.utils import format_artist_name, get_iso_date_from_string
+from lollypop.utils import sql_escape
 from lollypop.tag_frame_text import FrameTextTag
 from lollypop.tag_frame_lang import FrameLangTag
 
@@ -59,12 +61,52 @@ class TagReader:
                 "album", "genre", "lyrics", "publisher"]
     __INT = ["album-disc-number", "track-number"]
     __DOUBLE = ["beats-per-minute"]
+    # Same case folding as SQLite NOCASE: ASCII only
+    __NOCASE = str.maketrans(ascii_uppercase, ascii_lowercase)
 
     def __init__(self):
         """
             Init tag reader
         """
-        pass
+        # Scan id caches, None if disabled, see start_cache()
+        # {nocase name: [[artist_id, name, sortname, mbid]]}
+        self.__artists = None
+        # {escaped name: genre_id}
+        self.__genres = None
+        # {(name, mbid, no_album_artist):
+        #   [[album_id, {artist_id}, storage_type, uri]]}
+        self.__albums = None
+
+    def start_cache(self):
+        """
+            Resolve artist, genre and album ids from memory until
+            stop_cache(): saves SQL lookups for each saved track
+        """
+        self.__artists = {}
+        for (artist_id, name, sortname, mbid) in\
+                App().artists.get_lookup_rows():
+            self.__cache_artist([artist_id, name, sortname, mbid])
+        self.__genres = {}
+        for (genre_id, name) in App().genres.get_lookup_rows():
+            self.__genres.setdefault(sql_escape(name), genre_id)
+        self.__albums = {}
+        for (album_id, name, mbid, no_album_artist, storage_type,
+             uri, artist_ids) in App().albums.get_lookup_rows():
+            if artist_ids is None:
+                artist_ids = set()
+            else:
+                artist_ids = set([int(i) for i in artist_ids.split(",")])
+            key = self.__get_album_key(name, mbid, bool(no_album_artist))
+            self.__cache_album(key,
+                               [album_id, artist_ids, storage_type, uri])
+
+    def stop_cache(self):
+        """
+            Drop caches filled by start_cache()
+        """
+        self.__artists = None
+        self.__genres = None
+        self.__albums = None
 
     def get_title(self, tags, filepath):
         """
@@ -497,6 +539,70 @@ class TagReader:
         lyrics = get_id3()
         return lyrics
 
+    def get_file_tags(self, info, name, advanced_artists):
+        """
+            Read tags needed by scanner, does not need database
+            @param info as GstPbutils.DiscovererInfo
+            @param name as str
+            @param advanced_artists as bool => add performers, conductors...
+            @return (str, str, str, str, str, str, str, str, int, int, int,
+                     int, int, str, str, str, str, int, int, float, int,
+                     bool): (title, artists, genres, a_sortnames,
+                             aa_sortnames, album_artists, album_name,
+                             discname, discnumber, year, timestamp,
+                             original_year, original_timestamp,
+                             mb_album_id, mb_track_id, mb_artist_id,
+                             mb_album_artist_id, tracknumber, popm, bpm,
+                             duration, compilation)
+        """
+        tags = info.get_tags()
+        duration = int(info.get_duration() / 1000000)
+        title = self.get_title(tags, name)
+        version = self.get_version(tags)
+        if version != "":
+            title += " (%s)" % version
+        artists = self.get_artists(tags)
+        a_sortnames = self.get_artist_sortnames(tags)
+        aa_sortnames = self.get_album_artist_sortnames(tags)
+        album_artists = self.get_album_artists(tags)
+        album_name = self.get_album_name(tags)
+        mb_album_id = self.get_mb_album_id(tags)
+        mb_track_id = self.get_mb_track_id(tags)
+        mb_artist_id = self.get_mb_artist_id(tags)
+        mb_album_artist_id = self.get_mb_album_artist_id(tags)
+        genres = self.get_genres(tags)
+        discnumber = self.get_discnumber(tags)
+        discname = self.get_discname(tags)
+        tracknumber = self.get_tracknumber(tags, name)
+        popm = self.get_popm(tags)
+        bpm = self.get_bpm(tags)
+        compilation = self.get_compilation(tags)
+        (original_year, original_timestamp) = self.get_original_year(tags)
+        (year, timestamp) = self.get_year(tags)
+        if year is None:
+            (year, timestamp) = (original_year, original_timestamp)
+        elif original_year is None:
+            (original_year, original_timestamp) = (year, timestamp)
+        # If no artists tag, use album artist
+        if artists == "":
+            artists = album_artists
+        if advanced_artists:
+            composers = self.get_composers(tags)
+            conductors = self.get_conductors(tags)
+            performers = self.get_performers(tags)
+            remixers = self.get_remixers(tags)
+            artists += ";%s" % performers if performers != "" else ""
+            artists += ";%s" % conductors if conductors != "" else ""
+            artists += ";%s" % composers if composers != "" else ""
+            artists += ";%s" % remixers if remixers != "" else ""
+        if artists == "":
+            artists = _("Unknown")
+        return (title, artists, genres, a_sortnames, aa_sortnames,
+                album_artists, album_name, discname, discnumber, year,
+                timestamp, original_year, original_timestamp,
+                mb_album_id, mb_track_id, mb_artist_id, mb_album_artist_id,
+                tracknumber, popm, bpm, duration, compilation)
+
     def add_artists(self, artists, sortnames, mb_artist_id=""):
         """
             Add artists to db
@@ -524,25 +630,32 @@ class TagReader:
                 else:
                     mbid = mbidsplit[i].strip()
                 # Get artist id, add it if missing
-                (artist_id, db_name) = App().artists.get_id(artist, mbid)
+                entry = self.__get_artist(artist, mbid)
                 if i >= sortlen or sortsplit[i] == "":
                     sortname = None
                 else:
                     sortname = sortsplit[i].strip()
-                if artist_id is None:
+                if entry is None:
                     if sortname is None:
                         sortname = format_artist_name(artist)
                     artist_id = App().artists.add(artist, sortname, mbid)
                     added_artist_ids.append(artist_id)
+                    if self.__artists is not None:
+                        self.__cache_artist(
+                            [artist_id, artist, sortname, mbid])
                 else:
-                    # artists.get_id() is NOCASE, check if we need to update
+                    artist_id = entry[0]
+                    # Lookup is NOCASE, check if we need to update
                     # artist name
-                    if db_name != artist:
+                    if entry[1] != artist:
                         App().artists.set_name(artist_id, artist)
-                    if sortname is not None:
+                        entry[1] = artist
+                    if sortname is not None and entry[2] != sortname:
                         App().artists.set_sortname(artist_id, sortname)
-                    if mbid is not None:
+                        entry[2] = sortname
+                    if mbid is not None and entry[3] != mbid:
                         App().artists.set_mb_artist_id(artist_id, mbid)
+                        entry[3] = mbid
                 i += 1
                 artist_ids.append(artist_id)
         return (added_artist_ids, artist_ids)
@@ -559,10 +672,15 @@ class TagReader:
             genre = genre.strip()
             if genre != "":
                 # Get genre id, add genre if missing
-                genre_id = App().genres.get_id(genre)
+                if self.__genres is None:
+                    genre_id = App().genres.get_id(genre)
+                else:
+                    genre_id = self.__genres.get(sql_escape(genre), None)
                 if genre_id is None:
                     genre_id = App().genres.add(genre)
                     added_genre_ids.append(genre_id)
+                    if self.__genres is not None:
+                        self.__genres[sql_escape(genre)] = genre_id
                 genre_ids.append(genre_id)
         return (added_genre_ids, genre_ids)
 
@@ -590,29 +708,116 @@ class TagReader:
             parent = f.get_parent()
             if parent is not None:
                 uri = parent.get_uri()
-        album_id = App().albums.get_id(album_name, mb_album_id, artist_ids)
+        key = self.__get_album_key(album_name, mb_album_id or None,
+                                   not artist_ids)
+        entry = self.__get_album(key, album_name, mb_album_id, artist_ids)
         # Check storage type did not changed, remove album then
-        if album_id is not None:
-            current_storage_type = App().albums.get_storage_type(album_id)
-            if current_storage_type != storage_type:
-                App().tracks.remove_album(album_id)
-                App().tracks.clean(False)
-                App().albums.clean(False)
-                App().artists.clean(False)
-                album_id = None
-        if album_id is None:
+        if entry is not None and entry[2] != storage_type:
+            # Only clean this album: other albums of a scanner batch may
+            # have no tracks yet
+            removed_artist_ids = list(set(
+                App().albums.get_artist_ids(entry[0]) +
+                App().tracks.get_album_artist_ids(entry[0])))
+            App().tracks.remove_album(entry[0])
+            App().tracks.clean(False)
+            App().albums.clean(False, [entry[0]])
+            App().artists.clean(False, removed_artist_ids)
+            entry = None
+            # Artists may have been removed
+            if self.__albums is not None:
+                self.start_cache()
+        if entry is None:
             added = True
             album_id = App().albums.add(album_name, mb_album_id, lp_album_id,
                                         artist_ids, uri, loved, popularity,
                                         rate, synced, mtime, storage_type)
-        # Check if path did not change
-        elif App().albums.get_uri(album_id) != uri:
-            App().albums.set_uri(album_id, uri)
+            if self.__albums is not None:
+                self.__cache_album(key, [album_id, set(artist_ids),
+                                         storage_type, uri])
+        else:
+            album_id = entry[0]
+            # Scanner then sets album artists to artist_ids
+            if artist_ids:
+                entry[1] = set(artist_ids)
+            # Check if path did not change
+            if entry[3] != uri:
+                App().albums.set_uri(album_id, uri)
+                entry[3] = uri
         return (added, album_id)
 
 #######################
 # PRIVATE             #
 #######################
+    def __get_artist(self, name, mbid):
+        """
+            Get artist matching name and MusicBrainz id
+            @param name as str
+            @param mbid as str/None
+            @return [artist_id, name, sortname, mbid]/None
+        """
+        if self.__artists is None:
+            (artist_id, db_name) = App().artists.get_id(name, mbid)
+            if artist_id is None:
+                return None
+            return [artist_id, db_name, None, None]
+        for entry in self.__artists.get(name.translate(self.__NOCASE), []):
+            if not mbid or entry[3] is None or entry[3] == mbid:
+                return entry
+        return None
+
+    def __cache_artist(self, entry):
+        """
+            Add artist to cache
+            @param entry as [artist_id, name, sortname, mbid]
+        """
+        key = entry[1].translate(self.__NOCASE)
+        if key not in self.__artists.keys():
+            self.__artists[key] = []
+        self.__artists[key].append(entry)
+
+    def __get_album_key(self, name, mbid, no_album_artist):
+        """
+            Get album cache key, same matching as albums.get_id()
+            @param name as str
+            @param mbid as str/None
+            @param no_album_artist as bool
+            @return (str, str, bool)
+        """
+        if not no_album_artist:
+            name = name.translate(self.__NOCASE)
+        return (name, mbid, no_album_artist)
+
+    def __get_album(self, key, name, mbid, artist_ids):
+        """
+            Get album matching name, MusicBrainz id and artists
+            @param key as (str, str, bool)
+            @param name as str
+            @param mbid as str
+            @param artist_ids as [int]
+            @return [album_id, {artist_id}, storage_type, uri]/None
+        """
+        if self.__albums is None:
+            album_id = App().albums.get_id(name, mbid, artist_ids)
+            if album_id is None:
+                return None
+            return [album_id, set(artist_ids),
+                    App().albums.get_storage_type(album_id),
+                    App().albums.get_uri(album_id)]
+        for entry in self.__albums.get(key, []):
+            if not artist_ids or entry[1] & set(artist_ids):
+                return entry
+        return None
+
+    def __cache_album(self, key, entry):
+        """
+            Add album to cache
+            @param key as (str, str, bool)
+            @param entry as [album_id, {artist_id}, storage_type, uri]
+        """
+        if key not in self.__albums.keys():
+            self.__albums[key] = []
+        self.__albums[key].append(entry)
+
     def __get_extended(self, tags, keys):
         """
             Return tag from tags following keys
@@ -0,0 +1,516 @@
+# Copyright (c) 2014-2021 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import gi
+gi.require_version("GstTag", "1.0")
+from gi.repository import Gst, GstTag, GLib, GObject
+
+import mmap
+from struct import unpack_from
+
+from lollypop.tagreader import Discoverer
+
+
+class FileInfo:
+    """
+        Tags and duration read from file, DiscovererInfo compatible
+    """
+
+    def __init__(self, tags, duration):
+        """
+            Init info
+            @param tags as Gst.TagList
+            @param duration as int (ns)
+        """
+        self.__tags = tags
+        self.__duration = duration
+
+    def get_tags(self):
+        """
+            Get tags
+            @return Gst.TagList
+        """
+        return self.__tags
+
+    def get_duration(self):
+        """
+            Get duration
+            @return int (ns)
+        """
+        return self.__duration
+
+
+class FileDiscoverer(Discoverer):
+    """
+        Read tags and duration from file headers for FLAC, Ogg Vorbis/Opus,
+        MP3 and MP4, without building a GStreamer pipeline.
+        Tag lists are built with GstTag parsers, so they match discoverer
+        ones. Other files are handled by Discoverer.
+    """
+    # MPEG audio bitrates (kbps) for (MPEG1 or 2, layer)
+    __MP3_BITRATES = {
+        (1, 1): [0, 32, 64, 96, 128, 160, 192, 224,
+                 256, 288, 320, 352, 384, 416, 448],
+        (1, 2): [0, 32, 48, 56, 64, 80, 96, 112,
+                 128, 160, 192, 224, 256, 320, 384],
+        (1, 3): [0, 32, 40, 48, 56, 64, 80, 96,
+                 112, 128, 160, 192, 224, 256, 320],
+        (2, 1): [0, 32, 48, 56, 64, 80, 96, 112,
+                 128, 144, 160, 176, 192, 224, 256],
+        (2, 2): [0, 8, 16, 24, 32, 40, 48, 56,
+                 64, 80, 96, 112, 128, 144, 160],
+        (2, 3): [0, 8, 16, 24, 32, 40, 48, 56,
+                 64, 80, 96, 112, 128, 144, 160]
+    }
+    # MPEG audio sample rates for version bits
+    __MP3_RATES = {3: [44100, 48000, 32000],
+                   2: [22050, 24000, 16000],
+                   0: [11025, 12000, 8000]}
+    # Max bytes searched for first MPEG frame
+    __MP3_SYNC_SEARCH = 65536
+    __MP4_STRINGS = {b"\xa9nam": "title",
+                     b"\xa9ART": "artist",
+                     b"\xa9alb": "album",
+                     b"aART": "album-artist",
+                     b"\xa9gen": "genre",
+                     b"\xa9wrt": "composer",
+                     b"\xa9lyr": "lyrics",
+                     b"soar": "artist-sortname",
+                     b"soaa": "album-artist-sortname"}
+    __MP4_UINTS = {b"trkn": "track-number",
+                   b"disk": "album-disc-number"}
+    __MP4_FREEFORM = {b"MusicBrainz Album Id": "musicbrainz-albumid",
+                      b"MusicBrainz Track Id": "musicbrainz-trackid",
+                      b"MusicBrainz Artist Id": "musicbrainz-artistid",
+                      b"MusicBrainz Album Artist Id":
+                          "musicbrainz-albumartistid"}
+
+    def __init__(self):
+        """
+            Init discoverer
+        """
+        Discoverer.__init__(self)
+
+    def get_info(self, uri):
+        """
+            Return information for file at uri
+            @param uri as str
+            @Exception GLib.Error
+            @return FileInfo/GstPbutils.DiscovererInfo
+        """
+        info = None
+        if uri.startswith("file://"):
+            try:
+                (path, host) = GLib.filename_from_uri(uri)
+                info = self.__get_file_info(path)
+            except Exception:
+                # Let discoverer handle broken files
+                info = None
+        if info is None:
+            info = Discoverer.get_info(self, uri)
+        return info
+
+#######################
+# PRIVATE             #
+#######################
+    def __get_file_info(self, path):
+        """
+            Read info from file
+            @param path as str
+            @return FileInfo/None if format not handled
+        """
+        with open(path, "rb") as f:
+            # Only read pages are loaded
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                offset = self.__get_id3v2_size(data)
+                magic = data[offset:offset + 4]
+                if magic == b"fLaC":
+                    return self.__get_flac_info(data, offset)
+                elif offset == 0 and magic == b"OggS":
+                    return self.__get_ogg_info(data)
+                elif offset == 0 and data[4:8] == b"ftyp":
+                    return self.__get_mp4_info(data)
+                # Without ID3v2 tag, file must start with a MPEG frame
+                elif offset != 0 or\
+                        self.__get_mp3_sync(data, 0) is not None:
+                    return self.__get_mp3_info(data, offset)
+                return None
+            finally:
+                data.close()
+
+    def __get_id3v2_size(self, data):
+        """
+            Get ID3v2 tag size
+            @param data as mmap.mmap
+            @return int
+        """
+        if data[0:3] != b"ID3":
+            return 0
+        size = 0
+        # Syncsafe integer
+        for byte in data[6:10]:
+            size = (size << 7) | (byte & 0x7f)
+        # Footer
+        if data[5] & 0x10:
+            size += 10
+        return size + 10
+
+    def __get_flac_info(self, data, offset):
+        """
+            Read FLAC metadata blocks
+            @param data as mmap.mmap
+            @param offset as int
+            @return FileInfo/None
+        """
+        tags = None
+        duration = None
+        offset += 4
+        last = False
+        while not last:
+            header = data[offset]
+            last = header & 0x80
+            block_type = header & 0x7f
+            size = int.from_bytes(data[offset + 1:offset + 4], "big")
+            offset += 4
+            if block_type == 0:
+                bits = int.from_bytes(data[offset + 10:offset + 18], "big")
+                rate = bits >> 44
+                samples = bits & 0xfffffffff
+                if rate == 0:
+                    return None
+                duration = samples * Gst.SECOND // rate
+            elif block_type == 4:
+                (tags, vendor) = GstTag.tag_list_from_vorbiscomment(
+                    data[offset:offset + size], b"")
+            offset += size
+        if duration is None:
+            return None
+        if tags is None:
+            tags = Gst.TagList.new_empty()
+        return FileInfo(tags, duration)
+
+    def __get_ogg_info(self, data):
+        """
+            Read Ogg Vorbis/Opus headers
+            @param data as mmap.mmap
+            @return FileInfo/None
+        """
+        (identification, comment) = self.__get_ogg_packets(data, 2)
+        if identification[0:7] == b"\x01vorbis":
+            rate = unpack_from("<I", identification, 12)[0]
+            preskip = 0
+            comment_id = b"\x03vorbis"
+        elif identification[0:8] == b"OpusHead":
+            rate = 48000
+            preskip = unpack_from("<H", identification, 10)[0]
+            comment_id = b"OpusTags"
+        else:
+            return None
+        if rate == 0 or comment[0:len(comment_id)] != comment_id:
+            return None
+        (tags, vendor) = GstTag.tag_list_from_vorbiscomment(comment,
+                                                            comment_id)
+        # Granule position of last stream page is sample count
+        serial = data[14:18]
+        end = len(data)
+        while True:
+            offset = data.rfind(b"OggS", 0, end)
+            if offset == -1:
+                return None
+            if data[offset + 14:offset + 18] == serial:
+                break
+            end = offset
+        granule = unpack_from("<q", data, offset + 6)[0]
+        duration = max(0, granule - preskip) * Gst.SECOND // rate
+        return FileInfo(tags, duration)
+
+    def __get_ogg_packets(self, data, count):
+        """
+            Get first packets of Ogg stream
+            @param data as mmap.mmap
+            @param count as int
+            @return [bytes]
+        """
+        packets = []
+        packet = b""
+        offset = 0
+        while len(packets) < count:
+            if data[offset:offset + 4] != b"OggS":
+                raise Exception("Invalid Ogg page")
+            segments = data[offset + 26]
+            table = data[offset + 27:offset + 27 + segments]
+            offset += 27 + segments
+            for size in table:
+                packet += data[offset:offset + size]
+                offset += size
+                # Packet ends with a segment smaller than 255 bytes
+                if size < 255:
+                    packets.append(packet)
+                    packet = b""
+        return packets[:count]
+
+    def __get_mp3_info(self, data, offset):
+        """
+            Read MP3 tags and duration from Xing/VBRI header or bitrate
+            @param data as mmap.mmap
+            @param offset as int
+            @return FileInfo/None
+        """
+        # Find first frame
+        end = min(len(data) - 4, offset + self.__MP3_SYNC_SEARCH)
+        header = None
+        while offset < end:
+            offset = data.find(b"\xff", offset, end)
+            if offset == -1:
+                return None
+            header = self.__get_mp3_sync(data, offset)
+            if header is not None:
+                break
+            offset += 1
+        if header is None:
+            return None
+        (version, layer, bitrate, rate, mono) = header
+        if layer == 1:
+            samples = 384
+        elif layer == 3 and version != 3:
+            samples = 576
+        else:
+            samples = 1152
+        if version == 3:
+            side = 17 if mono else 32
+        else:
+            side = 9 if mono else 17
+        xing = offset + 4 + side
+        vbri = offset + 36
+        frames = None
+        if data[xing:xing + 4] in [b"Xing", b"Info"]:
+            flags = unpack_from(">I", data, xing + 4)[0]
+            if flags & 1:
+                frames = unpack_from(">I", data, xing + 8)[0]
+        elif data[vbri:vbri + 4] == b"VBRI":
+            frames = unpack_from(">I", data, vbri + 14)[0]
+        audio_end = len(data)
+        has_id3v1 = audio_end >= 128 and data[-128:-125] == b"TAG"
+        if has_id3v1:
+            audio_end -= 128
+        if frames is not None:
+            duration = frames * samples * Gst.SECOND // rate
+        else:
+            duration = (audio_end - offset) * 8 * Gst.SECOND //\
+                (bitrate * 1000)
+        # Same merging as id3demux: ID3v2 wins over ID3v1
+        tags = Gst.TagList.new_empty()
+        size = self.__get_id3v2_size(data)
+        if size:
+            buffer = Gst.Buffer.new_wrapped(data[0:size])
+            tags = GstTag.tag_list_from_id3v2_tag(buffer) or tags
+        if has_id3v1:
+            v1 = GstTag.tag_list_new_from_id3v1(data[-128:])
+            if v1 is not None:
+                tags = tags.merge(v1, Gst.TagMergeMode.KEEP)
+        return FileInfo(tags, duration)
+
+    def __get_mp3_sync(self, data, offset):
+        """
+            Get MPEG audio frame header, next frame header must follow:
+            random data often looks like a frame header
+            @param data as mmap.mmap
+            @param offset as int
+            @return (version bits, layer, kbps, rate, mono)/None
+        """
+        if offset + 4 > len(data) or data[offset] != 0xff:
+            return None
+        header = self.__get_mp3_header(data, offset)
+        if header is None:
+            return None
+        (version, layer, bitrate, rate, mono) = header
+        padding = (data[offset + 2] >> 1) & 1
+        if layer == 1:
+            length = (12000 * bitrate // rate + padding) * 4
+        elif layer == 3 and version != 3:
+            length = 72000 * bitrate // rate + padding
+        else:
+            length = 144000 * bitrate // rate + padding
+        following = offset + length
+        # Single frame
+        if following == len(data):
+            return header
+        elif following + 4 > len(data) or data[following] != 0xff:
+            return None
+        following_header = self.__get_mp3_header(data, following)
+        if following_header is None or\
+                following_header[0:2] != header[0:2] or\
+                following_header[3] != rate:
+            return None
+        return header
+
+    def __get_mp3_header(self, data, offset):
+        """
+            Parse MPEG audio frame header
+            @param data as mmap.mmap
+            @param offset as int
+            @return (version bits, layer, kbps, rate, mono)/None
+        """
+        (b1, b2, b3) = data[offset + 1:offset + 4]
+        if b1 & 0xe0 != 0xe0:
+            return None
+        version = (b1 >> 3) & 3
+        layer = 4 - ((b1 >> 1) & 3)
+        bitrate_index = b2 >> 4
+        rate_index = (b2 >> 2) & 3
+        if version == 1 or layer == 4 or rate_index == 3 or\
+                bitrate_index in [0, 15]:
+            return None
+        key = (1 if version == 3 else 2, layer)
+        bitrate = self.__MP3_BITRATES[key][bitrate_index]
+        rate = self.__MP3_RATES[version][rate_index]
+        return (version, layer, bitrate, rate, b3 >> 6 == 3)
+
+    def __get_mp4_info(self, data):
+        """
+            Read MP4 atoms
+            @param data as mmap.mmap
+            @return FileInfo/None
+        """
+        moov = self.__get_mp4_child(data, 0, len(data), b"moov")
+        if moov is None:
+            return None
+        mvhd = self.__get_mp4_child(data, moov[0], moov[1], b"mvhd")
+        if mvhd is None:
+            return None
+        start = mvhd[0]
+        if data[start] == 1:
+            (timescale, length) = unpack_from(">IQ", data, start + 20)
+        else:
+            (timescale, length) = unpack_from(">II", data, start + 12)
+        if timescale == 0:
+            return None
+        duration = length * Gst.SECOND // timescale
+        tags = Gst.TagList.new_empty()
+        ilst = None
+        udta = self.__get_mp4_child(data, moov[0], moov[1], b"udta")
+        if udta is not None:
+            meta = self.__get_mp4_child(data, udta[0], udta[1], b"meta")
+            if meta is not None:
+                # meta is a full box: skip version and flags
+                ilst = self.__get_mp4_child(data, meta[0] + 4, meta[1],
+                                            b"ilst")
+        if ilst is not None:
+            for (name, start, end) in self.__get_mp4_atoms(data, *ilst):
+                try:
+                    self.__add_mp4_tag(tags, data, name, start, end)
+                except Exception:
+                    # Ignore broken items as qtdemux does
+                    pass
+        return FileInfo(tags, duration)
+
+    def __add_mp4_tag(self, tags, data, name, start, end):
+        """
+            Add ilst item to tags
+            @param tags as Gst.TagList
+            @param data as mmap.mmap
+            @param name as bytes
+            @param start as int
+            @param end as int
+        """
+        value = self.__get_mp4_data(data, start, end)
+        if value is None:
+            return
+        if name in self.__MP4_STRINGS.keys():
+            tags.add_value(Gst.TagMergeMode.APPEND,
+                           self.__MP4_STRINGS[name],
+                           value.decode("utf-8"))
+        elif name in self.__MP4_UINTS.keys() and len(value) >= 4:
+            number = unpack_from(">H", value, 2)[0]
+            if number:
+                tags.add_value(Gst.TagMergeMode.APPEND,
+                               self.__MP4_UINTS[name],
+                               GObject.Value(GObject.TYPE_UINT, number))
+        elif name == b"tmpo" and len(value) >= 2:
+            bpm = unpack_from(">H", value)[0]
+            if bpm:
+                tags.add_value(Gst.TagMergeMode.APPEND,
+                               "beats-per-minute",
+                               GObject.Value(GObject.TYPE_DOUBLE, bpm))
+        elif name == b"gnre" and len(value) >= 2:
+            genre = GstTag.tag_id3_genre_get(unpack_from(">H", value)[0] - 1)
+            if genre is not None:
+                tags.add_value(Gst.TagMergeMode.APPEND, "genre", genre)
+        elif name == b"\xa9day":
+            datetime = Gst.DateTime.new_from_iso8601_string(
+                value.decode("utf-8"))
+            if datetime is not None:
+                tags.add_value(Gst.TagMergeMode.APPEND, "datetime",
+                               GObject.Value(Gst.DateTime, datetime))
+        elif name == b"----":
+            child = self.__get_mp4_child(data, start, end, b"name")
+            if child is None:
+                return
+            # name is a full box: skip version and flags
+            key = data[child[0] + 4:child[1]]
+            if key in self.__MP4_FREEFORM.keys():
+                tags.add_value(Gst.TagMergeMode.APPEND,
+                               self.__MP4_FREEFORM[key],
+                               value.decode("utf-8"))
+
+    def __get_mp4_data(self, data, start, end):
+        """
+            Get value of data atom in item
+            @param data as mmap.mmap
+            @param start as int
+            @param end as int
+            @return bytes/None
+        """
+        child = self.__get_mp4_child(data, start, end, b"data")
+        if child is None:
+            return None
+        # Skip type and locale
+        return data[child[0] + 8:child[1]]
+
+    def __get_mp4_child(self, data, start, end, name):
+        """
+            Get first child atom with name
+            @param data as mmap.mmap
+            @param start as int
+            @param end as int
+            @param name as bytes
+            @return (int, int)/None: content start and end
+        """
+        for (atom, atom_start, atom_end) in self.__get_mp4_atoms(data,
+                                                                 start,
+                                                                 end):
+            if atom == name:
+                return (atom_start, atom_end)
+        return None
+
+    def __get_mp4_atoms(self, data, start, end):
+        """
+            Get atoms between start and end
+            @param data as mmap.mmap
+            @param start as int
+            @param end as int
+            @return generator of (bytes, int, int): name, content start/end
+        """
+        offset = start
+        while offset + 8 <= end:
+            (size, name) = unpack_from(">I4s", data, offset)
+            header = 8
+            if size == 1:
+                size = unpack_from(">Q", data, offset + 8)[0]
+                header = 16
+            elif size == 0:
+                size = end - offset
+            if size < header or offset + size > end:
+                return
+            yield (name, offset + header, offset + size)
+            offset += size
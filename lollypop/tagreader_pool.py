@@ -0,0 +1,116 @@
+# Copyright (c) 2014-2021 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import gi
+gi.require_version("Gst", "1.0")
+gi.require_version("GstPbutils", "1.0")
+from gi.repository import Gst, Gio
+
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from multiprocessing import get_context
+import locale
+import gettext
+
+from lollypop.tagreader import TagReader
+from lollypop.tagreader_file import FileDiscoverer
+from lollypop.logger import Logger
+
+# Worker process globals, see _init_worker()
+_discoverer = None
+_tagreader = None
+
+
+def _init_worker(localedir):
+    """
+        Init GStreamer and translations in worker process
+        @param localedir as str
+    """
+    global _discoverer
+    global _tagreader
+    # Spawned processes do not inherit text domain, see lollypop.in
+    locale.bindtextdomain("lollypop", localedir)
+    locale.textdomain("lollypop")
+    gettext.bindtextdomain("lollypop", localedir)
+    gettext.textdomain("lollypop")
+    Gst.init(None)
+    _discoverer = FileDiscoverer()
+    _tagreader = TagReader()
+
+
+def _read_tags(uri, advanced_artists):
+    """
+        Read tags for uri in worker process
+        @param uri as str
+        @param advanced_artists as bool
+        @return TagReader.get_file_tags() result
+    """
+    info = _discoverer.get_info(uri)
+    name = Gio.File.new_for_uri(uri).get_basename()
+    return _tagreader.get_file_tags(info, name, advanced_artists)
+
+
+class TagReaderPool:
+    """
+        Read tags in worker processes, not limited by the GIL
+        Results are plain tuples, database work stays in caller
+    """
+    # Pending reads per worker
+    __QUEUE_SIZE = 8
+
+    def __init__(self, count):
+        """
+            Init pool
+            @param count as int => worker processes
+        """
+        self.__count = count
+
+    def read(self, uris, advanced_artists):
+        """
+            Read tags for uris, at most count * __QUEUE_SIZE pending reads
+            @param uris as iterable of str
+            @param advanced_artists as bool
+            @return generator of (str, tuple/None)
+        """
+        # Same translations as this process
+        localedir = gettext.bindtextdomain("lollypop")
+        # Do not fork a threaded GTK application
+        executor = ProcessPoolExecutor(max_workers=self.__count,
+                                       mp_context=get_context("spawn"),
+                                       initializer=_init_worker,
+                                       initargs=(localedir,))
+        pending = {}
+        max_pending = self.__count * self.__QUEUE_SIZE
+        uris = iter(uris)
+        try:
+            while True:
+                for uri in uris:
+                    future = executor.submit(_read_tags, uri,
+                                             advanced_artists)
+                    pending[future] = uri
+                    if len(pending) >= max_pending:
+                        break
+                if not pending:
+                    break
+                (done, not_done) = wait(pending.keys(),
+                                        return_when=FIRST_COMPLETED)
+                for future in done:
+                    uri = pending.pop(future)
+                    try:
+                        tags = future.result()
+                    except Exception as e:
+                        Logger.error("Scanning file: %s, %s" % (uri, e))
+                        tags = None
+                    yield (uri, tags)
+        finally:
+            for future in pending.keys():
+                future.cancel()
+            executor.shutdown()
@@ -19,6 +19,7 @@ import unicodedata
 import cairo
 import time
 import re
+import json
 from hashlib import md5
 from threading import current_thread
 from functools import wraps
@@ -45,6 +46,27 @@ def make_subrequest(value, operand, count):
     return subrequest + ")"
 
 
+def make_in_subrequest(column):
+    """
+        Make a subrequest matching column against a list passed as
+        one JSON parameter, see get_sql_ids()
+        Request text does not depend on list length: sqlite statement
+        cache can reuse it
+        @param column as str => SQL
+        @return str
+    """
+    return "%s IN (SELECT value FROM json_each(?))" % column
+
+
+def get_sql_ids(ids):
+    """
+        Get SQL parameter for make_in_subrequest()
+        @param ids as [int]
+        @return str
+    """
+    return json.dumps([int(i) for i in ids])
+
+
 def ms_to_string(duration):
     """
         Convert milliseconds to a pretty string
@@ -229,6 +251,21 @@ def noaccents(string):
     return v.lower()
 
 
+def get_prefix_range(prefix):
+    """
+        Get bounds matching all strings starting with prefix,
+        allow an index to be used for prefix lookups
+        @param prefix as str
+        @return (str, str)
+    """
+    if not prefix:
+        return ("", chr(0x10FFFF))
+    last = ord(prefix[-1])
+    if last == 0x10FFFF:
+        return (prefix, prefix + chr(0x10FFFF))
+    return (prefix, prefix[:-1] + chr(last + 1))
+
+
 def sql_escape(string):
     """
         Escape string for SQL request
@@ -12,6 +12,46 @@
 
 
 from lollypop.define import App, Type
+from lollypop.objects_album import Album
+from lollypop.objects_track import Track
+
+
+def get_albums_for_ids(album_ids, genre_ids=[], artist_ids=[], skipped=True):
+    """
+        Get albums for ids, attributes are loaded in a few queries
+        @param album_ids as [int]
+        @param genre_ids as [int]
+        @param artist_ids as [int]
+        @param skipped as bool
+        @return [Album]
+    """
+    rows = App().albums.get_rows(album_ids)
+    return [Album(album_id, genre_ids, artist_ids, skipped,
+                  rows.get(album_id, None))
+            for album_id in album_ids]
+
+
+def get_tracks_for_ids(track_ids):
+    """
+        Get tracks for ids, attributes are loaded in a few queries
+        @param track_ids as [int]
+        @return [Track]
+    """
+    rows = App().tracks.get_rows(track_ids)
+    album_ids = list(set([row["album_id"] for row in rows.values()]))
+    album_rows = App().albums.get_rows(album_ids)
+    tracks = []
+    for track_id in track_ids:
+        row = rows.get(track_id, None)
+        if row is None:
+            tracks.append(Track(track_id))
+            continue
+        album_id = row["album_id"]
+        album = Album(album_id, [], [], True, album_rows.get(album_id, None))
+        track = Track(track_id, album, row)
+        album.set_tracks([track], False)
+        tracks.append(track)
+    return tracks
 
 
 def tracks_to_albums(tracks, skipped=True):
@@ -21,6 +61,24 @@ def tracks_to_albums(tracks, skipped=True):
         @param skipped as bool
         @return [Album]
     """
+    # Prefill tracks and albums attributes in a few queries, mtime is
+    # set if already prefilled, by get_tracks_for_ids() for example
+    track_ids = [track.id for track in tracks
+                 if track.id is not None and track.id >= 0 and
+                 track._mtime is None]
+    rows = App().tracks.get_rows(track_ids)
+    album_ids = set([row["album_id"] for row in rows.values()])
+    # Prefilled tracks may have an album not prefilled
+    album_ids |= set([track.album.id for track in tracks
+                      if track._mtime is not None and
+                      track.album.id is not None and
+                      track.album._mtime is None])
+    album_rows = App().albums.get_rows(list(album_ids))
+    for track in tracks:
+        if track.id in rows.keys():
+            track.set_row(rows[track.id])
+        if track.album.id in album_rows.keys():
+            track.album.set_row(album_rows[track.album.id])
     albums = []
     for track in tracks:
         if albums and albums[-1].id == track.album.id:
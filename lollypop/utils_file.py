@@ -14,6 +14,7 @@ from gi.repository import Gio, GLib
 from gi.repository.Gio import FILE_ATTRIBUTE_TIME_ACCESS
 
 from time import time
+from hashlib import blake2b
 
 from lollypop.logger import Logger
 from lollypop.define import App, FileType
@@ -123,6 +124,39 @@ def remove_oldest(path, timestamp):
         Logger.error("remove_oldest(): %s", e)
 
 
+def get_fingerprint(uri):
+    """
+        Get a cheap content fingerprint for file, used to detect moves
+        FLAC audio MD5 if set, else size and hash of sampled blocks
+        @param uri as str
+        @return str/None
+    """
+    BLOCK_SIZE = 65536
+    try:
+        f = Gio.File.new_for_uri(uri)
+        info = f.query_info("standard::size",
+                            Gio.FileQueryInfoFlags.NONE,
+                            None)
+        size = info.get_size()
+        stream = f.read(None)
+        head = stream.read_bytes(BLOCK_SIZE, None).get_data()
+        # fLaC + metadata block header + STREAMINFO, MD5 at its end
+        if head[0:4] == b"fLaC" and head[4] & 0x7F == 0 and\
+                any(head[26:42]):
+            stream.close(None)
+            return "flac:%s" % head[26:42].hex()
+        h = blake2b(head, digest_size=16)
+        for offset in [size // 2, size - BLOCK_SIZE]:
+            if offset > BLOCK_SIZE:
+                stream.seek(offset, GLib.SeekType.SET, None)
+                h.update(stream.read_bytes(BLOCK_SIZE, None).get_data())
+        stream.close(None)
+        return "%s:%s" % (size, h.hexdigest())
+    except Exception as e:
+        Logger.error("get_fingerprint(): %s", e)
+    return None
+
+
 def is_readonly(uri):
     """
         Check if uri is readonly
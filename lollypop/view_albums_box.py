@@ -24,7 +24,7 @@ from lollypop.utils import get_icon_name, get_network_available, popup_widget
 from lollypop.utils import get_title_for_genres_artists
 from lollypop.utils import remove_static
 from lollypop.utils_file import get_youtube_dl
-from lollypop.utils_album import get_album_ids_for
+from lollypop.utils_album import get_album_ids_for, get_albums_for_ids
 from lollypop.helper_signals import SignalsHelper, signals_map
 
 
@@ -92,12 +92,10 @@ class AlbumsBoxView(FlowBoxView, SignalsHelper):
                 skipped = True
             album_ids = get_album_ids_for(self._genre_ids, self._artist_ids,
                                           self.storage_type, skipped)
-            albums = []
-            for album_id in album_ids:
-                album = Album(album_id, self._genre_ids,
-                              self._artist_ids, True)
+            albums = get_albums_for_ids(album_ids, self._genre_ids,
+                                        self._artist_ids, True)
+            for album in albums:
                 album.set_storage_type(self.storage_type)
-                albums.append(album)
             return albums
 
         if albums:
@@ -416,7 +414,7 @@ class AlbumsDeviceBoxView(AlbumsBoxView):
         def load():
             album_ids = App().albums.get_synced_ids(0)
             album_ids += App().albums.get_synced_ids(self.__index)
-            return [Album(album_id) for album_id in album_ids]
+            return get_albums_for_ids(album_ids)
 
         App().task_helper.run(load, callback=(on_load,))
 
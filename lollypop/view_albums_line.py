@@ -16,6 +16,7 @@ from gettext import gettext as _
 
 from lollypop.define import App, Type, MARGIN, ViewType, StorageType
 from lollypop.objects_album import Album
+from lollypop.utils_album import get_albums_for_ids
 from lollypop.utils import get_network_available, get_default_storage_type
 from lollypop.helper_signals import signals
 from lollypop.helper_horizontal_scrolling import HorizontalScrollingHelper
@@ -158,7 +159,7 @@ class AlbumsArtistLineView(AlbumsLineView):
                     self.storage_type, True)
             if excluded_album_id in album_ids:
                 album_ids.remove(excluded_album_id)
-            return [Album(album_id) for album_id in album_ids]
+            return get_albums_for_ids(album_ids)
 
         if self.__artist_id == Type.COMPILATIONS:
             self._label.set_text(_("Others compilations"))
@@ -194,7 +195,7 @@ class AlbumsArtistAppearsOnLineView(AlbumsLineView):
                                                    self.__artist_ids,
                                                    self.storage_type,
                                                    True)
-            return [Album(album_id) for album_id in album_ids]
+            return get_albums_for_ids(album_ids)
 
         self._label.set_text(_("Appears on"))
         App().task_helper.run(load, callback=(on_load,))
@@ -225,7 +226,7 @@ class AlbumsPopularsLineView(AlbumsLineView):
             album_ids = App().albums.get_populars_at_the_moment(storage_type,
                                                                 False,
                                                                 self.ITEMS)
-            return [Album(album_id) for album_id in album_ids]
+            return get_albums_for_ids(album_ids)
 
         self._label.set_text(_("Popular albums at the moment"))
         App().task_helper.run(load, callback=(on_load,))
@@ -259,7 +260,7 @@ class AlbumsRandomGenresLineView(AlbumsLineView):
                                                  genre_id,
                                                  False,
                                                  self.ITEMS)
-            return [Album(album_id) for album_id in album_ids]
+            return get_albums_for_ids(album_ids)
 
         App().task_helper.run(load, callback=(on_load,))
 
@@ -333,7 +334,7 @@ class AlbumsStorageTypeLineView(AlbumsLineView):
 
         def load():
             album_ids = App().albums.get_for_storage_type(storage_type, 20)
-            return [Album(album_id) for album_id in album_ids]
+            return get_albums_for_ids(album_ids)
 
         App().task_helper.run(load, callback=(on_load,))
         self.__storage_type |= storage_type
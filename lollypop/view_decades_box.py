@@ -16,7 +16,7 @@ from lollypop.view_flowbox import FlowBoxView
 from lollypop.widgets_albums_decade import AlbumsDecadeWidget
 from lollypop.define import App, Type, ViewType, OrderBy
 from lollypop.utils import get_icon_name
-from lollypop.objects_album import Album
+from lollypop.utils_album import get_albums_for_ids
 
 
 class DecadesBoxView(FlowBoxView):
@@ -126,7 +126,7 @@ class DecadesBoxView(FlowBoxView):
             items += App().tracks.get_compilations_by_disc_for_year(
                 year, self.storage_type, False)
         album_ids = [item[0] for item in items]
-        albums = [Album(album_id, [], [], False) for album_id in album_ids]
+        albums = get_albums_for_ids(album_ids, [], [], False)
         if albums:
             App().player.play_album_for_albums(albums[0], albums)
 
@@ -143,7 +143,7 @@ class DecadesBoxView(FlowBoxView):
                                          False, OrderBy.YEAR_ASC)
         if not album_ids:
             return
-        albums = [Album(album_id, [], [], False) for album_id in album_ids]
+        albums = get_albums_for_ids(album_ids, [], [], False)
         if random:
             shuffle(albums)
             App().player.play_album_for_albums(albums[0], albums)
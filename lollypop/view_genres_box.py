@@ -16,7 +16,7 @@ from lollypop.view_flowbox import FlowBoxView
 from lollypop.widgets_albums_genre import AlbumsGenreWidget
 from lollypop.define import App, Type, ViewType
 from lollypop.utils import get_icon_name
-from lollypop.objects_album import Album
+from lollypop.utils_album import get_albums_for_ids
 
 
 class GenresBoxView(FlowBoxView):
@@ -108,7 +108,7 @@ class GenresBoxView(FlowBoxView):
             return
         album_ids = App().albums.get_ids([child.data], [],
                                          self.storage_type, False)
-        albums = [Album(album_id) for album_id in album_ids]
+        albums = get_albums_for_ids(album_ids)
         if albums:
             App().player.play_album_for_albums(albums[0], albums)
 
@@ -124,7 +124,7 @@ class GenresBoxView(FlowBoxView):
         album_ids = App().genres.get_album_ids(True)
         if not album_ids:
             return
-        albums = [Album(album_id) for album_id in album_ids]
+        albums = get_albums_for_ids(album_ids)
         if random:
             shuffle(albums)
             App().player.play_album_for_albums(albums[0], albums)
@@ -10,7 +10,7 @@
 # You should have received a copy of the GNU General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
-from lollypop.utils_album import tracks_to_albums
+from lollypop.utils_album import tracks_to_albums, get_tracks_for_ids
 from lollypop.utils import get_default_storage_type
 from lollypop.define import App, ViewType, MARGIN, Type, Size
 from lollypop.objects_album import Album
@@ -205,7 +205,7 @@ class PlaylistsView(AlbumsListView, SignalsHelper, SizeAllocationHelper):
                     if track_id not in track_ids:
                         track_ids.append(track_id)
             return tracks_to_albums(
-                [Track(track_id) for track_id in track_ids])
+                get_tracks_for_ids(track_ids))
 
         App().task_helper.run(load, callback=(on_load,))
 
@@ -227,7 +227,7 @@ class PlaylistsView(AlbumsListView, SignalsHelper, SizeAllocationHelper):
             split[0] += " AND tracks.storage_type&%s " % storage_type
             track_ids = App().db.execute("ORDER BY".join(split))
             return tracks_to_albums(
-                [Track(track_id) for track_id in track_ids])
+                get_tracks_for_ids(track_ids))
 
         self.banner.spinner.start()
         App().task_helper.run(load, callback=(on_load,))
@@ -15,8 +15,7 @@ from locale import strcoll
 from lollypop.view_flowbox import FlowBoxView
 from lollypop.define import App, Type, ViewType, StorageType
 from lollypop.utils import popup_widget
-from lollypop.utils_album import tracks_to_albums
-from lollypop.objects_track import Track
+from lollypop.utils_album import tracks_to_albums, get_tracks_for_ids
 from lollypop.widgets_playlist_rounded import PlaylistRoundedWidget
 from lollypop.widgets_banner_playlists import PlaylistsBannerWidget
 from lollypop.shown import ShownPlaylists
@@ -136,7 +135,7 @@ class PlaylistsManagerView(FlowBoxView, SignalsHelper):
                 track_ids = App().db.execute(request)
         else:
             track_ids = App().playlists.get_track_ids(child.data)
-        tracks = [Track(track_id) for track_id in track_ids]
+        tracks = get_tracks_for_ids(track_ids)
         albums = tracks_to_albums(tracks)
         if albums:
             App().player.play_album_for_albums(albums[0], albums)
@@ -18,6 +18,7 @@ from lollypop.widgets_row_track import TrackRow
 from lollypop.widgets_listbox import ListBox
 from lollypop.define import App, ViewType, Size, MARGIN
 from lollypop.objects_track import Track
+from lollypop.utils_album import get_tracks_for_ids
 from lollypop.helper_signals import SignalsHelper, signals
 from lollypop.helper_gestures import GesturesHelper
 
@@ -61,7 +62,7 @@ class QueueTracksView(Gtk.Bin, GesturesHelper, SignalsHelper):
             Populate with current queue
         """
         self.allow_duplicate("_on_queue_changed")
-        tracks = [Track(track_id) for track_id in App().player.queue]
+        tracks = get_tracks_for_ids(App().player.queue)
         self.__add_tracks(tracks)
 
 #######################
@@ -15,9 +15,8 @@ from gi.repository import Gtk, GLib
 from random import shuffle
 
 from lollypop.utils import get_human_duration, popup_widget
-from lollypop.utils_album import tracks_to_albums
+from lollypop.utils_album import tracks_to_albums, get_tracks_for_ids
 from lollypop.define import App, ArtSize, ViewType
-from lollypop.objects_track import Track
 from lollypop.widgets_banner import BannerWidget
 from lollypop.helper_signals import SignalsHelper, signals_map
 
@@ -134,7 +133,7 @@ class PlaylistBannerWidget(BannerWidget, SignalsHelper):
         if track_ids:
             shuffle(track_ids)
             albums = tracks_to_albums(
-                [Track(track_id) for track_id in track_ids])
+                get_tracks_for_ids(track_ids))
             App().player.play_track_for_albums(albums[0].tracks[0], albums)
 
     def _on_menu_button_clicked(self, button):
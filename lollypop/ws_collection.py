@@ -107,7 +107,7 @@ class CollectionWebService(SaveWebHelper,
                         raise Exception("cancelled")
                     self.__METHODS[storage_type](self, self.__cancellable)
                 self.clean_old_albums(storage_types)
-                App().artists.update_featuring()
+                App().artists.rebuild_featuring()
         except Exception as e:
             Logger.warning("CollectionWebService::__populate_db(): %s", e)
         self.__is_running = False
@@ -137,4 +137,5 @@ class CollectionWebService(SaveWebHelper,
             App().tracks.clean(False)
             App().albums.clean(False)
             App().artists.clean(False)
+            App().fts.clean(False)
         SqlCursor.remove(App().db)